@@ -6,14 +6,20 @@ Platypush
 """
 
 import argparse
+import copy
 import logging
 import os
+import signal
 import sys
+import threading
 
+from .bus.pool import BusWorkerPool
 from .bus.redis import RedisBus
 from .config import Config
-from .context import register_backends
-from .cron.scheduler import CronScheduler
+from .config.reload import ConfigWatcher
+from .context import register_backends, get_cron_scheduler
+from .context.metrics import metrics
+from .event.hook import EventHook
 from .event.processor import EventProcessor
 from .logger import Logger
 from .message.event import Event, StopEvent
@@ -21,6 +27,7 @@ from .message.event.application import ApplicationStartedEvent, ApplicationStopp
 from .message.request import Request
 from .message.response import Response
 from .utils import set_thread_name
+from .utils.startup import profiler, warmup_plugins
 
 
 __author__ = 'Fabio Manganiello <blacklight86@gmail.com>'
@@ -50,8 +57,12 @@ class Daemon:
     # number of executions retries before a request fails
     n_tries = 2
 
+    cron_scheduler = None
+
+    config_watcher = None
+
     def __init__(self, config_file=None, pidfile=None, requests_to_process=None,
-                 no_capture_stdout=False, no_capture_stderr=False):
+                 no_capture_stdout=False, no_capture_stderr=False, no_config_cache=False):
         """
         Constructor
         Params:
@@ -65,6 +76,9 @@ class Daemon:
                                  capture by the logging system
             no_capture_stderr -- Set to true if you want to disable the stderr
                                  capture by the logging system
+            no_config_cache -- Set to true if you want to parse the configuration
+                               and the scripts on each start instead of reusing
+                               the compiled configuration cache
         """
 
         if pidfile:
@@ -73,12 +87,17 @@ class Daemon:
                 f.write(str(os.getpid()))
 
         self.config_file = config_file
-        Config.init(self.config_file)
+        Config.init(self.config_file, use_cache=not no_config_cache)
         logging.basicConfig(**Config.get('logging'))
 
+        self.startup_conf = Config.get('startup') or {}
+        profiler.enabled = self.startup_conf.get('profile', False)
+
         self.no_capture_stdout = no_capture_stdout
         self.no_capture_stderr = no_capture_stderr
-        self.event_processor = EventProcessor()
+
+        with profiler.measure('event_hooks', 'init'):
+            self.event_processor = EventProcessor()
         self.requests_to_process = requests_to_process
         self.processed_requests = 0
 
@@ -106,11 +125,17 @@ class Daemon:
                             help="Set this flag if you have max stack depth " +
                             "exceeded errors so stderr won't be captured by " +
                             "the logging system")
+        parser.add_argument('--no-config-cache', dest='no_config_cache',
+                            required=False, action='store_true',
+                            help="Set this flag to parse the configuration " +
+                            "and the scripts on startup instead of reusing " +
+                            "the cached compiled configuration")
 
         opts, args = parser.parse_known_args(args)
         return cls(config_file=opts.config, pidfile=opts.pidfile,
                    no_capture_stdout=opts.no_capture_stdout,
-                   no_capture_stderr=opts.no_capture_stderr)
+                   no_capture_stderr=opts.no_capture_stderr,
+                   no_config_cache=opts.no_config_cache)
 
     def on_message(self):
         """
@@ -126,7 +151,11 @@ class Daemon:
 
             if isinstance(msg, Request):
                 try:
-                    msg.execute(n_tries=self.n_tries)
+                    # Buses that acknowledge a message only after its
+                    # execution (e.g. the stream bus) run the requests
+                    # synchronously, the others on the shared executor
+                    msg.execute(n_tries=self.n_tries,
+                                _async=not self.bus.ack_after_execution)
                 except PermissionError:
                     LOGGER.info('Dropped unauthorized request: {}'.format(msg))
 
@@ -148,10 +177,113 @@ class Daemon:
 
     def stop_app(self):
         """ Stops the backends and the bus """
+        if self.config_watcher:
+            self.config_watcher.stop()
+
+        Config.remove_reload_listener(self._on_config_reload)
+
+        if self.cron_scheduler:
+            self.cron_scheduler.stop()
+
         for backend in self.backends.values():
             backend.stop()
         self.bus.stop()
 
+    def reload_config(self):
+        """
+        Reloads the configuration file without restarting the application.
+        Only the backends, event hooks and cronjobs whose configuration has
+        changed are restarted or rebuilt, and the plugins whose configuration
+        has changed are initialized again.
+
+        Returns:
+            A :class:`platypush.config.reload.ConfigChanges` object
+        """
+        return Config.reload()
+
+    def _on_config_reload(self, changes):
+        if not changes:
+            LOGGER.info('Configuration reloaded, no changes')
+            return
+
+        LOGGER.info('Configuration reloaded, changes: {}'.format(changes.to_dict()))
+        self._reload_backends(changes)
+        self._reload_event_hooks(changes)
+        self._reload_cronjobs(changes)
+        self._reload_plugins(changes)
+
+        if changes.get_updated('settings') or changes.settings['removed']:
+            LOGGER.warning('The changes to the following settings require a restart: {}'.format(
+                changes.get_updated('settings') + changes.settings['removed']))
+
+    def _reload_backends(self, changes):
+        from .context import _build_backend
+
+        for name in changes.get_stale('backends'):
+            backend = self.backends.pop(name, None)
+            if backend:
+                LOGGER.info('Stopping backend {}'.format(name))
+                backend.stop()
+                backend.join(timeout=10)
+
+        for name in changes.get_updated('backends'):
+            LOGGER.info('Starting backend {}'.format(name))
+            try:
+                backend = _build_backend(name, Config.get_backends()[name], bus=self.bus)
+            except Exception as e:
+                LOGGER.warning('Could not initialize backend {}: {}'.format(name, str(e)))
+                LOGGER.exception(e)
+                continue
+
+            self.backends[name] = backend
+            backend.start()
+
+    def _reload_event_hooks(self, changes):
+        for name in changes.get_stale('event_hooks'):
+            self.event_processor.remove_hook(name)
+
+        for name in changes.get_updated('event_hooks'):
+            hook = Config.get_event_hooks()[name]
+            self.event_processor.add_hook(EventHook.build(name=name, hook=copy.deepcopy(hook)))
+
+    def _reload_cronjobs(self, changes):
+        if changes.get_updated('cronjobs') or changes.cronjobs['removed']:
+            self.cron_scheduler.update_jobs(Config.get_cronjobs(), stale=changes.get_stale('cronjobs'))
+
+    @staticmethod
+    def _reload_plugins(changes):
+        from .context import get_plugin, plugins
+
+        for name in changes.plugins['removed']:
+            plugins.pop(name, None)
+
+        for name in changes.plugins['changed']:
+            # Only the plugins already initialized need to be reconfigured,
+            # the others will pick up the new configuration upon first use
+            if name in plugins:
+                LOGGER.info('Reconfiguring plugin {}'.format(name))
+                try:
+                    if not get_plugin(name, reload=True):
+                        plugins.pop(name, None)
+                except Exception as e:
+                    LOGGER.warning('Could not reconfigure plugin {}: {}'.format(name, str(e)))
+                    plugins.pop(name, None)
+
+    def _init_config_reload(self):
+        Config.add_reload_listener(self._on_config_reload)
+
+        def _reload(*_):
+            threading.Thread(target=self.reload_config, name='ConfigReload', daemon=True).start()
+
+        if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, _reload)
+
+        reload_conf = Config.get('reload') or {}
+        if reload_conf.get('watch'):
+            self.config_watcher = ConfigWatcher(get_files=Config.get_config_files, callback=self.reload_config,
+                                                poll_seconds=reload_conf.get('poll_seconds', 2.0))
+            self.config_watcher.start()
+
     def start(self):
         """ Start the daemon """
         if not self.no_capture_stdout:
@@ -164,19 +296,44 @@ class Daemon:
         print('---- Starting platypush v.{}'.format(__version__))
 
         redis_conf = Config.get('backend.redis') or {}
-        self.bus = RedisBus(on_message=self.on_message(),
-                            **redis_conf.get('redis_args', {}))
+        bus_conf = Config.get('bus') or {}
+        pool_conf = bus_conf.get('worker_pool')
+        worker_pool = BusWorkerPool(**(pool_conf if isinstance(pool_conf, dict) else {})) \
+            if pool_conf else None
+
+        if worker_pool:
+            metrics.register_collector(worker_pool.collect_metrics)
+
+        with profiler.measure('bus', 'init'):
+            self.bus = RedisBus.build(on_message=self.on_message(), worker_pool=worker_pool,
+                                      **redis_conf.get('redis_args', {}))
 
         # Initialize the backends and link them to the bus
-        self.backends = register_backends(bus=self.bus, global_scope=True)
+        self.backends = register_backends(bus=self.bus, global_scope=True,
+                                          parallel=self.startup_conf.get('parallel_backends', False),
+                                          max_workers=self.startup_conf.get('max_workers'))
 
         # Start the backend threads
-        for backend in self.backends.values():
-            backend.start()
+        for name, backend in self.backends.items():
+            with profiler.measure('backend.' + name, 'start'):
+                backend.start()
 
         # Start the cron scheduler
-        if Config.get_cronjobs():
-            CronScheduler(jobs=Config.get_cronjobs()).start()
+        with profiler.measure('cron', 'init'):
+            self.cron_scheduler = get_cron_scheduler()
+
+        # Reload the configuration upon SIGHUP, config.reload or changes to the configuration files
+        self._init_config_reload()
+
+        # Initialize the plugins in the background rather than upon their first use
+        plugins = self.startup_conf.get('warmup_plugins')
+        if plugins:
+            if not isinstance(plugins, list):
+                plugins = list(Config.get_plugins().keys())
+
+            threading.Thread(target=warmup_plugins, args=(plugins,), name='PluginsWarmup', daemon=True).start()
+
+        profiler.log_report()
 
         self.bus.post(ApplicationStartedEvent())
 
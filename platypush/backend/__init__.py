@@ -12,7 +12,8 @@ from typing import Optional
 
 from platypush.bus import Bus
 from platypush.config import Config
-from platypush.context import get_backend
+from platypush.context import get_backend, get_redis
+from platypush.context.metrics import metrics
 from platypush.utils import set_timeout, clear_timeout, \
     get_redis_queue_name_by_message, set_thread_name
 
@@ -84,7 +85,13 @@ class Backend(Thread, EventGenerator):
             or a string/byte UTF-8 encoded string
         """
 
+        start = time.perf_counter()
         msg = Message.build(msg)
+        backend = self.__class__.__name__
+        metrics.observe('platypush_backend_deserialization_seconds', time.perf_counter() - start,
+                        backend=backend)
+        metrics.inc('platypush_backend_messages_total', backend=backend,
+                    type='event' if isinstance(msg, Event) else msg.__class__.__name__.lower())
 
         if not getattr(msg, 'target') or msg.target != self.device_id:
             return  # Not for me
@@ -280,8 +287,6 @@ class Backend(Thread, EventGenerator):
         self._stop_event.wait(timeout)
 
     def _get_redis(self):
-        import redis
-
         redis_backend = get_backend('redis')
         if not redis_backend:
             self.logger.warning('Redis backend not configured - some ' +
@@ -290,8 +295,7 @@ class Backend(Thread, EventGenerator):
         else:
             redis_args = redis_backend.redis_args
 
-        redis = redis.Redis(**redis_args)
-        return redis
+        return get_redis(**redis_args)
 
     def get_message_response(self, msg):
         try:
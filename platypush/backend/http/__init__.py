@@ -1,13 +1,23 @@
+import asyncio
+import base64
+import json
 import os
 import subprocess
 import threading
 
+from http.cookies import SimpleCookie
 from multiprocessing import Process
+from urllib.parse import parse_qs, urlparse
 
 from platypush.backend import Backend
 from platypush.backend.http.app import application
+from platypush.backend.http.app.utils import async_iter_message_responses, responses
+from platypush.config import Config
 from platypush.context import get_or_create_event_loop
+from platypush.context.metrics import metrics
+from platypush.user import UserManager
 from platypush.utils import get_ssl_server_context, set_thread_name
+from platypush.utils.websocket import WebsocketBroadcaster
 
 
 class HttpBackend(Backend):
@@ -57,6 +67,8 @@ class HttpBackend(Backend):
             the HTTP backend. However, being a Flask app, it will serve clients
             in a single thread and won't support many features of a full-blown
             web server.
+        * **aiohttp** (``pip install aiohttp``) - optional, for the asynchronous
+            ``/execute`` endpoint (see ``async_port``)
 
     Base command to run the web server over uwsgi::
 
@@ -73,7 +85,8 @@ class HttpBackend(Backend):
                  websocket_port=_DEFAULT_WEBSOCKET_PORT,
                  disable_websocket=False, dashboard=None, resource_dirs=None,
                  ssl_cert=None, ssl_key=None, ssl_cafile=None, ssl_capath=None,
-                 maps=None, run_externally=False, uwsgi_args=None, **kwargs):
+                 maps=None, run_externally=False, uwsgi_args=None, async_port=None,
+                 websocket_queue_size=100, websocket_slow_client_policy='drop_oldest', **kwargs):
         """
         :param port: Listen port for the web server (default: 8008)
         :type port: int
@@ -155,6 +168,22 @@ class HttpBackend(Backend):
                 # or Apache, to communicate with the uWSGI instance
                 ['--plugin', 'python', '--socket', '127.0.0.1:3031', '--master', '--processes', '4']
         :type uwsgi_args: list[str]
+
+        :param async_port: If set, an asynchronous server for the ``/execute``
+            endpoint will also be started on this port (see :mod:`platypush.backend.http.aio`).
+            A request waiting for its response doesn't hold a worker thread nor a Redis
+            connection on this server, so it's better suited for a high number of
+            concurrent calls. Requires **aiohttp** (``pip install aiohttp``).
+        :type async_port: int
+
+        :param websocket_queue_size: Maximum number of events queued for each websocket client. Events are
+            delivered to each client on its own queue, so a slow client doesn't delay the others (default: 100)
+        :type websocket_queue_size: int
+
+        :param websocket_slow_client_policy: What to do with the new events for a websocket client whose
+            queue is full: ``drop_oldest`` (drop the oldest queued event, default) or ``coalesce`` (replace
+            the queued event of the same type for the same device or sensor, if any). See :class:`platypush.utils.websocket.SlowClientPolicy`.
+        :type websocket_slow_client_policy: str
         """
 
         super().__init__(**kwargs)
@@ -166,6 +195,8 @@ class HttpBackend(Backend):
         self.server_proc = None
         self.disable_websocket = disable_websocket
         self.websocket_thread = None
+        self.async_port = async_port
+        self.async_server_thread = None
 
         if resource_dirs:
             self.resource_dirs = {name: os.path.abspath(
@@ -173,7 +204,9 @@ class HttpBackend(Backend):
         else:
             self.resource_dirs = {}
 
-        self.active_websockets = set()
+        self.broadcaster = WebsocketBroadcaster(name='http:{}'.format(websocket_port),
+                                                queue_size=websocket_queue_size,
+                                                policy=websocket_slow_client_policy)
         self.run_externally = run_externally
         self.uwsgi_args = uwsgi_args or []
         self.ssl_context = get_ssl_server_context(ssl_cert=ssl_cert,
@@ -189,9 +222,6 @@ class HttpBackend(Backend):
         self.local_base_url = '{proto}://localhost:{port}'.\
             format(proto=('https' if ssl_cert else 'http'), port=self.port)
 
-        self._websocket_lock_timeout = 10
-        self._websocket_lock = threading.RLock()
-        self._websocket_locks = {}
 
     def send_message(self, msg, **kwargs):
         self.logger.warning('Use cURL or any HTTP client to query the HTTP backend')
@@ -199,6 +229,7 @@ class HttpBackend(Backend):
     def on_stop(self):
         """ On backend stop """
         self.logger.info('Received STOP event on HttpBackend')
+        metrics.unregister_collector(self.broadcaster.collect_metrics)
 
         if self.server_proc:
             if isinstance(self.server_proc, subprocess.Popen):
@@ -208,60 +239,104 @@ class HttpBackend(Backend):
                 self.server_proc.terminate()
                 self.server_proc.join()
 
-    def _acquire_websocket_lock(self, ws):
-        try:
-            acquire_ok = self._websocket_lock.acquire(timeout=self._websocket_lock_timeout)
-            if not acquire_ok:
-                raise TimeoutError('Websocket lock acquire timeout')
+    def notify_web_clients(self, event):
+        """ Notify all the connected web clients (over websocket) of a new event """
+        self.broadcaster.broadcast(event)
 
-            addr = ws.remote_address
-            if addr not in self._websocket_locks:
-                self._websocket_locks[addr] = threading.RLock()
-        finally:
-            self._websocket_lock.release()
+    @staticmethod
+    def _authenticate_websocket_message(ws, path, msgs):
+        """
+        Authenticates the requests received over a websocket with the same
+        methods accepted by the HTTP routes: the token, or, if any users are
+        registered, the user credentials or a session token sent on the
+        websocket handshake.
+        """
 
-        acquire_ok = self._websocket_locks[addr].acquire(timeout=self._websocket_lock_timeout)
-        if not acquire_ok:
-            raise TimeoutError('Websocket on address {} not ready to receive data'.format(addr))
+        token = Config.get('token')
+        query = parse_qs(urlparse(path).query)
+        if token and (token in query.get('token', []) or
+                      all(isinstance(msg, dict) and msg.get('token') == token for msg in msgs)):
+            return True
 
-    def _release_websocket_lock(self, ws):
-        try:
-            acquire_ok = self._websocket_lock.acquire(timeout=self._websocket_lock_timeout)
-            if not acquire_ok:
-                raise TimeoutError('Websocket lock acquire timeout')
+        user_manager = UserManager()
+        if user_manager.get_user_count() == 0:
+            return not token
 
-            addr = ws.remote_address
-            if addr in self._websocket_locks:
-                self._websocket_locks[addr].release()
-        except Exception as e:
-            self.logger.warning('Unhandled exception while releasing websocket lock: {}'.format(str(e)))
-        finally:
-            self._websocket_lock.release()
+        headers = getattr(ws, 'request_headers', None) or {}
+        auth = headers.get('Authorization', '')
+        if auth.lower().startswith('basic '):
+            try:
+                username, password = base64.b64decode(auth[6:]).decode().split(':', 1)
+            except ValueError:
+                return False
 
-    def notify_web_clients(self, event):
-        """ Notify all the connected web clients (over websocket) of a new event """
-        import websockets
+            if user_manager.authenticate_user(username, password):
+                return True
 
-        async def send_event(ws):
-            try:
-                self._acquire_websocket_lock(ws)
-                await ws.send(str(event))
-            except Exception as e:
-                self.logger.warning('Error on websocket send_event: {}'.format(e))
-            finally:
-                self._release_websocket_lock(ws)
+        cookie = SimpleCookie(headers.get('Cookie', '')).get('session_token')
+        session_token = headers.get('X-Session-Token') or (query.get('session_token') or [None])[0] or \
+            (cookie.value if cookie else None)
 
-        loop = get_or_create_event_loop()
-        wss = self.active_websockets.copy()
+        if session_token:
+            user, _ = user_manager.authenticate_user_session(session_token)
+            return user is not None
 
-        for _ws in wss:
-            try:
-                loop.run_until_complete(send_event(_ws))
-            except websockets.exceptions.ConnectionClosed:
-                self.logger.warning('Websocket client {} connection lost'.format(_ws.remote_address))
-                self.active_websockets.remove(_ws)
-                if _ws.remote_address in self._websocket_locks:
-                    del self._websocket_locks[_ws.remote_address]
+        return False
+
+    def _on_websocket_message(self, ws, path, message, loop):
+        """
+        Executes the requests received over a websocket. A client can send
+        either a request, whose response is sent back on the websocket, or a
+        list of requests, which are executed in parallel. The responses to a
+        batch are sent back as soon as they are received, in the format
+        ``{"index": <index of the request>, "response": <response>}``.
+
+        If a token is configured, it can be passed either on the query string
+        of the websocket URL (``ws://host:8009/?token=...``) or in the
+        ``token`` field of the requests. If any users are registered, the
+        client can also authenticate with its credentials (HTTP basic auth
+        on the websocket handshake) or with a session token (``session_token``
+        on the query string or in the cookies, or ``X-Session-Token`` header).
+
+        A client can also subscribe to a subset of the events, see
+        :meth:`platypush.utils.websocket.WebsocketBroadcaster.handle_subscription`.
+        """
+
+        try:
+            msg = json.loads(message)
+        except ValueError as e:
+            self.logger.warning('Invalid message received over websocket: {}'.format(str(e)))
+            return
+
+        try:
+            if self.broadcaster.handle_subscription(ws, msg):
+                return
+        except AssertionError as e:
+            asyncio.run_coroutine_threadsafe(ws.send(json.dumps({'errors': [str(e)]})), loop)
+            return
+
+        batch = isinstance(msg, list)
+        msgs = msg if batch else [msg]
+        if not (batch or (isinstance(msg, dict) and msg.get('type') == 'request')):
+            return
+
+        # The responses are awaited on the loop, so a batch waiting for its
+        # responses doesn't hold a thread nor a worker of the executor
+        loop.create_task(self._execute_websocket_requests(ws, path, msgs, batch))
+
+    async def _execute_websocket_requests(self, ws, path, msgs, batch):
+        try:
+            # The authentication may query the users db, don't block the loop
+            if not await asyncio.get_event_loop().run_in_executor(
+                    None, self._authenticate_websocket_message, ws, path, msgs):
+                self.logger.warning('Unauthorized request over websocket from {}'.format(ws.remote_address))
+                await ws.send(json.dumps({'errors': ['Unauthorized']}))
+                return
+
+            async for i, response in async_iter_message_responses(msgs):
+                await ws.send('{{"index": {}, "response": {}}}'.format(i, str(response)) if batch else str(response))
+        except Exception as e:
+            self.logger.warning('Error while executing requests over websocket: {}'.format(str(e)))
 
     def websocket(self):
         """ Websocket main server """
@@ -273,21 +348,25 @@ class HttpBackend(Backend):
                 else '<unknown client>'
 
             self.logger.info('New websocket connection from {} on path {}'.format(address, path))
-            self.active_websockets.add(websocket)
+            self.broadcaster.add_client(websocket)
 
             try:
-                await websocket.recv()
+                async for message in websocket:
+                    self._on_websocket_message(websocket, path, message, loop)
             except websockets.exceptions.ConnectionClosed:
+                pass
+            finally:
                 self.logger.info('Websocket client {} closed connection'.format(address))
-                self.active_websockets.remove(websocket)
-                if address in self._websocket_locks:
-                    del self._websocket_locks[address]
+                self.broadcaster.remove_client(websocket)
 
         websocket_args = {}
         if self.ssl_context:
             websocket_args['ssl'] = self.ssl_context
 
         loop = get_or_create_event_loop()
+        self.broadcaster.loop = loop
+        metrics.register_collector(self.broadcaster.collect_metrics)
+        responses().start()
         loop.run_until_complete(
             websockets.serve(register_websocket, '0.0.0.0', self.websocket_port,
                              **websocket_args))
@@ -318,6 +397,15 @@ class HttpBackend(Backend):
             self.websocket_thread = threading.Thread(target=self.websocket)
             self.websocket_thread.start()
 
+        if self.async_port:
+            from platypush.backend.http.aio import run_server
+            self.logger.info('Initializing the asynchronous web server')
+            self.async_server_thread = threading.Thread(target=run_server, daemon=True, kwargs={
+                'port': self.async_port,
+                'ssl_context': self.ssl_context,
+            })
+            self.async_server_thread.start()
+
         if not self.run_externally:
             self.server_proc = Process(target=self._start_web_server(),
                                        name='WebServer')
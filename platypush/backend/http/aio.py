@@ -0,0 +1,134 @@
+"""
+Asynchronous (aiohttp) server for the ``/execute`` endpoint.
+
+Unlike the Flask endpoint, a request waiting for its response doesn't hold a
+worker thread nor a Redis connection: the responses are received through the
+response multiplexer of the web server (see
+:class:`platypush.backend.http.app.multiplexer.ResponseMultiplexer`), so it
+can serve thousands of concurrent calls from a single thread. It's enabled
+through the ``async_port`` option of :class:`platypush.backend.http.HttpBackend`.
+"""
+
+import asyncio
+import json
+import logging
+
+from platypush.config import Config
+from platypush.utils import set_thread_name
+
+logger = logging.getLogger('platyweb')
+
+
+def _authenticate(request, msg):
+    token = Config.get('token')
+    if token and token in (request.headers.get('X-Token'), request.query.get('token'), msg.get('token')):
+        return True
+
+    from platypush.user import UserManager
+    user_manager = UserManager()
+    if user_manager.get_user_count() > 0:
+        auth = request.headers.get('Authorization')
+        if auth:
+            from aiohttp import BasicAuth
+
+            try:
+                credentials = BasicAuth.decode(auth)
+            except ValueError:
+                return False
+
+            return user_manager.authenticate_user(credentials.login, credentials.password) is not None
+
+        return False
+
+    return not token
+
+
+async def execute(request):
+    """
+    Endpoint to execute commands. It accepts either a request or a list of
+    requests, with the same semantics as the ``/execute`` endpoint of the
+    web server (see :mod:`platypush.backend.http.app.routes.execute`).
+    """
+
+    from aiohttp import web
+    from platypush.backend.http.app.utils import async_iter_message_responses, responses, send_message, \
+        send_messages
+
+    try:
+        msg = json.loads(await request.text())
+        assert isinstance(msg, (dict, list)), 'The message must be a JSON object or a list of objects'
+    except Exception as e:
+        logger.error('Unable to parse JSON from request: {}'.format(str(e)))
+        raise web.HTTPBadRequest(text=str(e))
+
+    loop = asyncio.get_event_loop()
+    if not await loop.run_in_executor(None, _authenticate, request, msg if isinstance(msg, dict) else {}):
+        raise web.HTTPUnauthorized(headers={'WWW-Authenticate': 'Basic realm="Login required"'})
+
+    batch = isinstance(msg, list)
+    msgs = msg if batch else [msg]
+    timeout = float(request.query.get('timeout', 60))
+    logger.info('Received {} on the HTTP backend: {}'.format('batch' if batch else 'message', msg))
+
+    try:
+        if not responses().subscribed:
+            # The responses listener isn't subscribed, fall back to the
+            # queues of the requests on a worker thread
+            if batch:
+                results = await loop.run_in_executor(None, send_messages, msgs, timeout)
+                return web.Response(text='[' + ','.join(str(r) for r in results) + ']',
+                                    content_type='application/json')
+
+            result = await loop.run_in_executor(None, send_message, msg)
+            return web.Response(text=str(result or {}), content_type='application/json')
+
+        if not batch and msg.get('type') != 'request':
+            # Events are just posted on the bus
+            await loop.run_in_executor(None, send_message, msg)
+            return web.Response(text='{}', content_type='application/json')
+
+        if batch and request.query.get('stream'):
+            stream = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+            await stream.prepare(request)
+            async for i, result in async_iter_message_responses(msgs, timeout=timeout):
+                await stream.write('{{"index": {}, "response": {}}}\n'.format(i, str(result)).encode())
+
+            await stream.write_eof()
+            return stream
+
+        results = [None] * len(msgs)
+        async for i, result in async_iter_message_responses(msgs, timeout=timeout):
+            results[i] = result
+
+        if not batch:
+            return web.Response(text=str(results[0]), content_type='application/json')
+        return web.Response(text='[' + ','.join(str(r) for r in results) + ']', content_type='application/json')
+    except Exception as e:
+        logger.error('Error while running HTTP action: {}. Request: {}'.format(str(e), msg))
+        raise web.HTTPInternalServerError(text=str(e))
+
+
+def run_server(port, host='0.0.0.0', ssl_context=None):
+    """
+    Runs the asynchronous server in the current thread.
+
+    :param port: Listen port
+    :param host: Bind address (default: all the interfaces)
+    :param ssl_context: Optional SSL context, to serve the endpoint over HTTPS
+    """
+
+    from aiohttp import web
+    from platypush.backend.http.app.utils import responses
+
+    set_thread_name('AsyncWebServer')
+    responses().start()
+
+    app = web.Application()
+    app.router.add_post('/execute', execute)
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    logger.info('Starting the asynchronous web server on port {}'.format(port))
+    web.run_app(app, host=host, port=port, ssl_context=ssl_context, handle_signals=False, print=None)
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,158 @@
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import Future, TimeoutError
+
+from platypush.message import Message
+from platypush.utils import set_thread_name
+
+logger = logging.getLogger('platyweb')
+
+
+class ResponseMultiplexer(object):
+    """
+    Receives the responses to the requests sent by the web server over a
+    single Redis pub/sub subscription and dispatches them by id to the
+    handlers waiting for them, so the handlers don't need a blocking ``BLPOP``
+    (and a Redis connection) each.
+
+    A handler registers the id of the request before posting it on the bus,
+    and it then waits on the returned future, either synchronously
+    (:meth:`.wait`) or from an asyncio loop (``asyncio.wrap_future``).
+
+    The responses are also pushed on the queues of the requests, so the
+    responses published while the subscription was down (e.g. upon Redis
+    reconnection) are fetched from there once the listener is subscribed
+    again.
+
+    The multiplexer can be started before the process forks (e.g. in the
+    daemon, before the HTTP backend starts the web server process): its state
+    is reset in the child, where the listener is started again upon the
+    first request.
+    """
+
+    def __init__(self, redis, channel, reconnect_seconds=1.0):
+        """
+        :param redis: Redis client
+        :param channel: Pub/sub channel where the responses are published,
+            see :func:`platypush.utils.get_redis_response_channel`
+        :param reconnect_seconds: Seconds to wait before subscribing again after an error (default: 1)
+        """
+
+        self.redis = redis
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._reset()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """
+        Initializes the state of the listener. Also called in the child after
+        a fork, where the listener thread of the parent doesn't exist and the
+        lock may have been held by another thread.
+        """
+
+        # request id -> future of the response
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._subscribed = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ResponseMultiplexer', daemon=True)
+                self._thread.start()
+
+    @property
+    def subscribed(self):
+        """ True if the listener is currently subscribed to the responses channel """
+        self.start()
+        return self._subscribed.is_set()
+
+    def register(self, msg_id, timeout=5.0):
+        """
+        Registers a request before it's posted on the bus.
+
+        :param msg_id: Request id
+        :param timeout: Maximum time to wait for the subscription to be active
+        :returns: The future of the response, or None if the listener isn't
+            subscribed, in which case the caller should wait for the response
+            on the queue of the request instead.
+        """
+
+        self.start()
+        if not self._subscribed.wait(timeout):
+            return None
+
+        future = Future()
+        with self._lock:
+            self._waiters[msg_id] = future
+        return future
+
+    def unregister(self, msg_id):
+        with self._lock:
+            self._waiters.pop(msg_id, None)
+
+    def wait(self, msg_id, future, timeout=60):
+        """
+        :returns: The response to a registered request, or None if it isn't received within ``timeout`` seconds.
+        """
+
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            return None
+        finally:
+            self.unregister(msg_id)
+
+    def _dispatch(self, data):
+        try:
+            response = Message.build(data)
+        except Exception as e:
+            logger.warning('Invalid response received on {}: {}'.format(self.channel, str(e)))
+            return
+
+        with self._lock:
+            future = self._waiters.pop(response.id, None)
+
+        if future and not future.done():
+            future.set_result(response)
+
+    def _catch_up(self):
+        """ Fetches the responses published while the listener wasn't subscribed """
+        with self._lock:
+            msg_ids = list(self._waiters.keys())
+
+        for msg_id in msg_ids:
+            data = self.redis.lpop('platypush/responses/{}'.format(msg_id))
+            if data:
+                self._dispatch(data)
+
+    def _run(self):
+        set_thread_name('ResponseMultiplexer')
+
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                self._catch_up()
+
+                for item in pubsub.listen():
+                    if item.get('type') == 'message':
+                        self._dispatch(item['data'])
+            except Exception as e:
+                logger.warning('Error on the responses subscription to {}: {}. Reconnecting in {} seconds'.format(
+                    self.channel, str(e), self.reconnect_seconds))
+                time.sleep(self.reconnect_seconds)
+            finally:
+                self._subscribed.clear()
+                pubsub.close()
+
+
+# vim:sw=4:ts=4:et:
@@ -3,7 +3,8 @@ import json
 from flask import Blueprint, abort, request, Response
 
 from platypush.backend.http.app import template_folder
-from platypush.backend.http.app.utils import authenticate, logger, send_message
+from platypush.backend.http.app.utils import authenticate, logger, send_message, send_messages, \
+    iter_message_responses
 
 execute = Blueprint('execute', __name__, template_folder=template_folder)
 
@@ -13,16 +14,48 @@ __routes__ = [
 ]
 
 
+def _execute_batch(msgs):
+    """
+    Executes a list of requests in parallel. The responses are returned as a
+    list in the same order as the requests or, if the ``stream`` parameter is
+    set on the query string, streamed as newline-delimited JSON objects in the
+    format ``{"index": <index of the request>, "response": <response>}`` as
+    soon as they are received. The ``timeout`` parameter sets the maximum time
+    to wait for all the responses (default: 60 seconds).
+    """
+
+    timeout = float(request.args.get('timeout', 60))
+    logger().info('Received a batch of {} messages on the HTTP backend'.format(len(msgs)))
+
+    if request.args.get('stream'):
+        def stream():
+            for i, response in iter_message_responses(msgs, timeout=timeout):
+                yield '{{"index": {}, "response": {}}}\n'.format(i, str(response))
+
+        return Response(stream(), mimetype='application/x-ndjson')
+
+    responses = send_messages(msgs, timeout=timeout)
+    return Response('[' + ','.join(str(response) for response in responses) + ']',
+                    mimetype='application/json')
+
+
 @execute.route('/execute', methods=['POST'])
 @authenticate(skip_auth_methods=['session'])
 def execute():
-    """ Endpoint to execute commands """
+    """ Endpoint to execute commands. It accepts either a request or a list of requests. """
     try:
         msg = json.loads(request.data.decode('utf-8'))
     except Exception as e:
         logger().error('Unable to parse JSON from request {}: {}'.format(request.data, str(e)))
         return abort(400, str(e))
 
+    if isinstance(msg, list):
+        try:
+            return _execute_batch(msg)
+        except Exception as e:
+            logger().error('Error while running a batch of HTTP actions: {}'.format(str(e)))
+            return abort(500, str(e))
+
     logger().info('Received message on the HTTP backend: {}'.format(msg))
 
     try:
@@ -0,0 +1,29 @@
+from flask import Blueprint, abort, Response
+
+from platypush.backend.http.app import template_folder
+from platypush.backend.http.app.utils import authenticate, logger, send_request
+
+metrics = Blueprint('metrics', __name__, template_folder=template_folder)
+
+# Declare routes list
+__routes__ = [
+    metrics,
+]
+
+
+@metrics.route('/metrics', methods=['GET'])
+@authenticate(skip_auth_methods=['session'])
+def get_metrics():
+    """ Exposes the metrics of the application in Prometheus text format """
+    response = send_request('metrics.prometheus')
+    if not response:
+        return abort(504, 'No response from the application')
+
+    if response.is_error():
+        logger().error('Error while retrieving the metrics: {}'.format(response.errors))
+        return abort(500, str(response.errors))
+
+    return Response(response.output, mimetype='text/plain; version=0.0.4')
+
+
+# vim:sw=4:ts=4:et:
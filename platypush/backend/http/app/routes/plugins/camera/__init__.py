@@ -3,6 +3,7 @@ from platypush.plugins.camera import CameraPlugin
 
 from platypush import Config
 from platypush.backend.http.app import template_folder
+from platypush.backend.http.app.streaming import get_camera_stream
 from platypush.backend.http.app.utils import authenticate, send_request
 
 camera = Blueprint('camera', __name__, template_folder=template_folder)
@@ -26,34 +27,19 @@ def get_camera(device_id=None):
     return CameraPlugin(**camera_conf)
 
 
-def get_frame(device_id=None):
-    cam = get_camera(device_id)
-    with cam:
-        frame = None
-
-        for _ in range(cam.warmup_frames):
-            output = cam.get_stream()
+def get_stream(device_id=None):
+    device_id = get_device_id(device_id)
+    return get_camera_stream('camera:{}'.format(device_id), lambda: get_camera(device_id))
 
-            with output.ready:
-                output.ready.wait()
-                frame = output.frame
 
-        return frame
+def get_frame(device_id=None):
+    return get_stream(device_id).get_frame()
 
 
 def video_feed(device_id=None):
-    cam = get_camera(device_id)
-
-    with cam:
-        while True:
-            output = cam.get_stream()
-            with output.ready:
-                output.ready.wait()
-                frame = output.frame
-
-            if frame and len(frame):
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    for frame in get_stream(device_id).frames():
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
 
 @camera.route('/camera/<device_id>/frame', methods=['GET'])
@@ -4,6 +4,7 @@ import tempfile
 from flask import Response, Blueprint, send_from_directory
 
 from platypush.backend.http.app import template_folder
+from platypush.backend.http.app.streaming import get_camera_stream
 from platypush.backend.http.app.utils import authenticate, send_request
 from platypush.config import Config
 from platypush.plugins.camera.pi import CameraPiPlugin
@@ -16,26 +17,27 @@ __routes__ = [
 ]
 
 
-def video_feed():
+def get_camera():
     camera_conf = Config.get('camera.pi') or {}
-    camera = CameraPiPlugin(**camera_conf)
-
-    with camera:
-        while True:
-            output = camera.get_stream()
+    return CameraPiPlugin(**camera_conf)
 
-            with output.ready:
-                output.ready.wait()
-                frame = output.frame
 
-            if frame and len(frame):
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+def video_feed():
+    for frame in get_camera_stream('camera.pi', get_camera).frames():
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
 
 @camera_pi.route('/camera/pi/frame', methods=['GET'])
 @authenticate()
 def get_frame_img():
+    stream = get_camera_stream('camera.pi', get_camera)
+    if stream.viewers:
+        # The camera is already streaming, serve the latest frame
+        frame = stream.get_frame()
+        if frame:
+            return Response(frame, mimetype='image/jpeg')
+
     filename = os.path.join(tempfile.gettempdir(), 'camera_pi.jpg')
     response = send_request('camera.pi.take_picture', image_file=filename)
     frame_file = (response.output or {}).get('image_file')
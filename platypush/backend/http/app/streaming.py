@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+
+from collections import deque
+
+from platypush.utils import set_thread_name
+
+logger = logging.getLogger('platyweb')
+
+
+class CameraStream(object):
+    """
+    Shares a capture device across the HTTP viewers of a camera.
+
+    A single capture loop reads the JPEG frames from the camera and appends
+    them to a ring buffer, so the frames are captured and encoded once no
+    matter how many viewers are connected. Each viewer reads the buffer at its
+    own pace (a viewer that falls behind the buffer skips to the latest
+    frame), and the latest frame can be served as a snapshot without opening
+    the device again. The device is opened when the first viewer connects and
+    closed when the last one leaves.
+    """
+
+    def __init__(self, name, camera_factory, buffer_size=10, frame_timeout=5.0):
+        """
+        :param name: Name of the stream (e.g. ``camera:0``)
+        :param camera_factory: Function that returns the camera plugin. The
+            plugin should be a context manager that starts the capture when
+            entered, and whose ``get_stream()`` returns a
+            :class:`platypush.plugins.camera.StreamingOutput`.
+        :param buffer_size: Number of frames kept in the ring buffer (default: 10)
+        :param frame_timeout: Maximum time a viewer waits for a new frame (default: 5 seconds)
+        """
+
+        self.name = name
+        self.camera_factory = camera_factory
+        self.frame_timeout = frame_timeout
+        # (sequence number, frame)
+        self._frames = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._viewers = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
+        # Held by the capture loop while the device is open, so a new loop
+        # doesn't open the device before the previous one has released it
+        self._device_lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            self._viewers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._capture_loop, name='CameraStream', daemon=True)
+                self._thread.start()
+
+    def _release(self):
+        with self._lock:
+            self._viewers -= 1
+
+    def _should_stop(self):
+        with self._lock:
+            if self._viewers > 0:
+                return False
+
+            self._thread = None
+            self._frames.clear()
+            self._frame_ready.notify_all()
+            return True
+
+    def _push_frame(self, frame):
+        with self._lock:
+            self._seq += 1
+            self._frames.append((self._seq, frame))
+            self._frame_ready.notify_all()
+
+    def _capture_loop(self):
+        set_thread_name('CameraStream')
+
+        with self._device_lock:
+            try:
+                camera = self.camera_factory()
+                warmup_frames = getattr(camera, 'warmup_frames', 0) or 0
+                last_frame = None
+                logger.info('Opening the capture device for {}'.format(self.name))
+
+                with camera:
+                    while not self._should_stop():
+                        output = camera.get_stream()
+                        if not output:
+                            time.sleep(0.1)
+                            continue
+
+                        with output.ready:
+                            output.ready.wait(timeout=1)
+                            frame = output.frame
+
+                        if not frame or frame is last_frame:
+                            continue
+
+                        last_frame = frame
+                        if warmup_frames > 0:
+                            warmup_frames -= 1
+                            continue
+
+                        self._push_frame(frame)
+            except Exception as e:
+                logger.warning('Error on the capture loop of {}: {}'.format(self.name, str(e)))
+                with self._lock:
+                    if self._thread is threading.current_thread():
+                        self._thread = None
+                        self._frames.clear()
+                        self._frame_ready.notify_all()
+            finally:
+                logger.info('Closed the capture device for {}'.format(self.name))
+
+    def _next_frame(self, last_seq):
+        """ :returns: ``(seq, frame)`` for the first frame after ``last_seq``, or None on timeout """
+        with self._lock:
+            if not (self._frames and self._frames[-1][0] > last_seq):
+                self._frame_ready.wait(timeout=self.frame_timeout)
+                if not (self._frames and self._frames[-1][0] > last_seq):
+                    return None
+
+            oldest_seq = self._frames[0][0]
+            if last_seq < oldest_seq - 1:
+                # The viewer fell behind the buffer, skip to the latest frame
+                return self._frames[-1]
+
+            return self._frames[last_seq - oldest_seq + 1]
+
+    def frames(self):
+        """
+        Generator of the frames for a viewer. The viewer is registered until
+        the generator is closed.
+        """
+
+        self._acquire()
+
+        try:
+            last_seq = 0
+            while True:
+                item = self._next_frame(last_seq)
+                if item is None:
+                    logger.warning('No frames received from {} in {} seconds'.format(self.name, self.frame_timeout))
+                    return
+
+                last_seq, frame = item
+                yield frame
+        finally:
+            self._release()
+
+    def get_frame(self):
+        """
+        :returns: The latest frame. If the device isn't already open for
+            another viewer, it's opened until the first frame is captured.
+        """
+
+        with self._lock:
+            if self._frames:
+                return self._frames[-1][1]
+
+        self._acquire()
+
+        try:
+            item = self._next_frame(0)
+            return item[1] if item else None
+        finally:
+            self._release()
+
+    @property
+    def viewers(self):
+        return self._viewers
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_camera_stream(name, camera_factory, **kwargs):
+    """
+    :returns: The shared :class:`CameraStream` with the given name, which is
+        created upon the first call.
+    """
+
+    with _streams_lock:
+        stream = _streams.get(name)
+        if stream is None:
+            stream = _streams[name] = CameraStream(name, camera_factory, **kwargs)
+
+    return stream
+
+
+# vim:sw=4:ts=4:et:
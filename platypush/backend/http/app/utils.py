@@ -1,32 +1,52 @@
+import asyncio
 import importlib
 import logging
 import os
+import threading
+import time
+
+from concurrent.futures import TimeoutError, as_completed
 
 from functools import wraps
 from flask import abort, request, redirect, Response
-from redis import Redis
 
 # NOTE: The HTTP service will *only* work on top of a Redis bus. The default
 # internal bus service won't work as the web server will run in a different process.
 from platypush.bus.redis import RedisBus
+from platypush.backend.http.app.multiplexer import ResponseMultiplexer
 
 from platypush.config import Config
+from platypush.context import get_redis
 from platypush.message import Message
 from platypush.message.request import Request
+from platypush.message.response import Response as MessageResponse
 from platypush.user import UserManager
-from platypush.utils import get_redis_queue_name_by_message, get_ip_or_hostname
+from platypush.utils import get_redis_queue_name_by_message, get_redis_response_channel, get_ip_or_hostname
 
 _bus = None
 _logger = None
+_responses = None
+_responses_lock = threading.Lock()
 
 
 def bus():
     global _bus
     if _bus is None:
-        _bus = RedisBus()
+        _bus = RedisBus.build()
     return _bus
 
 
+def responses():
+    """ Returns the listener of the responses to the requests sent by the web server """
+    global _responses
+    if _responses is None:
+        with _responses_lock:
+            if _responses is None:
+                _responses = ResponseMultiplexer(redis=get_redis(**bus().redis_args),
+                                                 channel=get_redis_response_channel('http'))
+    return _responses
+
+
 def logger():
     global _logger
     if not _logger:
@@ -51,9 +71,9 @@ def logger():
     return _logger
 
 
-def get_message_response(msg):
-    redis = Redis(**bus().redis_args)
-    response = redis.blpop(get_redis_queue_name_by_message(msg), timeout=60)
+def get_message_response(msg, timeout=60):
+    redis = get_redis(**bus().redis_args)
+    response = redis.blpop(get_redis_queue_name_by_message(msg), timeout=timeout)
     if response and len(response) > 1:
         response = Message.build(response[1])
     else:
@@ -78,9 +98,13 @@ def get_websocket_port():
 
 def send_message(msg, wait_for_response=True):
     msg = Message.build(msg)
+    future = None
 
     if isinstance(msg, Request):
         msg.origin = 'http'
+        if wait_for_response:
+            # Register the request before posting it, so the response can't be missed
+            future = responses().register(msg.id)
 
     if Config.get('token'):
         msg.token = Config.get('token')
@@ -88,13 +112,178 @@ def send_message(msg, wait_for_response=True):
     bus().post(msg)
 
     if isinstance(msg, Request) and wait_for_response:
-        response = get_message_response(msg)
+        if future:
+            response = responses().wait(msg.id, future, timeout=60)
+        else:
+            response = get_message_response(msg)
         logger().debug('Processing response on the HTTP backend: {}'.
                        format(response))
 
         return response
 
 
+def _build_requests(msgs):
+    """
+    Parses a batch of requests and sets their origin and token.
+
+    :returns: A ``(requests, errors)`` tuple, where ``requests`` maps the
+        index of each valid request to the request and ``errors`` is a list of
+        ``(index, response)`` tuples for the messages that couldn't be parsed.
+    """
+
+    requests = {}
+    errors = []
+
+    for i, msg in enumerate(msgs):
+        try:
+            msg = Message.build(msg)
+            assert isinstance(msg, Request), 'Only requests are supported in a batch'
+        except Exception as e:
+            msg_id = msg.get('id') if isinstance(msg, dict) else getattr(msg, 'id', None)
+            errors.append((i, MessageResponse(id=msg_id, errors=[str(e)])))
+            continue
+
+        msg.origin = 'http'
+        if Config.get('token'):
+            msg.token = Config.get('token')
+
+        requests[i] = msg
+
+    return requests, errors
+
+
+def _register_requests(requests, timeout=5.0):
+    """
+    Registers a batch of requests on the responses listener before they are posted.
+
+    :returns: A map of the futures of the responses to the indices of the
+        requests. The requests that couldn't be registered must wait for their
+        responses on their queues.
+    """
+
+    futures = {}
+    for i, msg in requests.items():
+        future = responses().register(msg.id, timeout=timeout)
+        if future:
+            futures[future] = i
+
+    return futures
+
+
+def _timeout_response(msg):
+    return MessageResponse(id=msg.id, errors=['Timeout while waiting for the response'])
+
+
+def iter_message_responses(msgs, timeout=60):
+    """
+    Sends a batch of requests on the bus in a single round trip, so they are
+    executed in parallel, and yields their responses as they are received.
+
+    :param msgs: List of requests
+    :param timeout: Maximum time to wait for all the responses, in seconds (default: 60)
+    :returns: A generator of ``(index, response)`` tuples, in completion order.
+        The requests that couldn't be parsed or whose response wasn't received
+        before the timeout get a response with errors.
+    """
+
+    deadline = time.time() + timeout
+    requests, errors = _build_requests(msgs)
+    yield from errors
+
+    if not requests:
+        return
+
+    futures = _register_requests(requests)
+    bus().post_many(list(requests.values()))
+    pending = dict(requests)
+    registered = set(futures.values())
+
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline - time.time())):
+            i = futures[future]
+            del pending[i]
+            yield i, future.result()
+    except TimeoutError:
+        pass
+    finally:
+        for i in registered:
+            responses().unregister(requests[i].id)
+
+    for i, msg in pending.items():
+        response = None
+        remaining = deadline - time.time()
+        if i not in registered and remaining >= 1:
+            # The responses listener isn't subscribed, wait on the queue of the request
+            response = get_message_response(msg, timeout=int(remaining))
+
+        yield i, response or _timeout_response(msg)
+
+
+async def async_iter_message_responses(msgs, timeout=60):
+    """
+    Asynchronous version of :func:`iter_message_responses`, to be used from an
+    asyncio event loop. The responses received through the responses listener
+    are awaited on the loop without holding any thread, while the requests
+    that couldn't be registered on the listener wait for their responses on
+    their queues on the default executor of the loop.
+    """
+
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    requests, errors = _build_requests(msgs)
+    for error in errors:
+        yield error
+
+    if not requests:
+        return
+
+    registered = _register_requests(requests, timeout=0)
+    futures = {asyncio.wrap_future(future): i for future, i in registered.items()}
+    msg_ids = {i: msg.id for i, msg in requests.items()}
+    registered_ids = set(registered.values())
+
+    try:
+        await loop.run_in_executor(None, bus().post_many, list(requests.values()))
+        for i, msg in requests.items():
+            if i not in registered_ids:
+                # The responses listener isn't subscribed, wait on the queue of the request
+                futures[loop.run_in_executor(None, get_message_response, msg, max(1, int(timeout)))] = i
+
+        pending = set(futures.keys())
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0, deadline - loop.time()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+
+            for future in done:
+                i = futures[future]
+                msg = requests.pop(i)
+                yield i, future.result() or _timeout_response(msg)
+    finally:
+        for future in futures:
+            future.cancel()
+        for i in registered_ids:
+            responses().unregister(msg_ids[i])
+
+    for i, msg in requests.items():
+        yield i, _timeout_response(msg)
+
+
+def send_messages(msgs, timeout=60):
+    """
+    Sends a batch of requests (see :func:`iter_message_responses`).
+
+    :returns: The responses, in the same order as the requests.
+    """
+
+    responses_ = [None] * len(msgs)
+    for i, response in iter_message_responses(msgs, timeout=timeout):
+        responses_[i] = response
+
+    return responses_
+
+
 def send_request(action, wait_for_response=True, **kwargs):
     msg = {
         'type': 'request',
@@ -1,9 +1,7 @@
 import json
 
-from redis import Redis
-
 from platypush.backend import Backend
-from platypush.context import get_plugin
+from platypush.context import get_plugin, get_redis
 from platypush.message import Message
 
 
@@ -41,7 +39,7 @@ class RedisBackend(Backend):
                 redis_args = redis_plugin.kwargs
 
         self.redis_args = redis_args
-        self.redis = Redis(**self.redis_args)
+        self.redis = get_redis(**self.redis_args)
 
     def send_message(self, msg, queue_name=None, **kwargs):
         msg = str(msg)
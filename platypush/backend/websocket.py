@@ -1,4 +1,5 @@
 import asyncio
+import json
 import os
 import ssl
 import threading
@@ -6,10 +7,12 @@ import websockets
 
 from platypush.backend import Backend
 from platypush.context import get_plugin, get_or_create_event_loop
+from platypush.context.metrics import metrics
 from platypush.message import Message
 from platypush.message.request import Request
 from platypush.message.response import Response
 from platypush.utils import get_ssl_server_context
+from platypush.utils.websocket import WebsocketBroadcaster
 
 
 class WebsocketBackend(Backend):
@@ -29,7 +32,8 @@ class WebsocketBackend(Backend):
 
     def __init__(self, port=_default_websocket_port, bind_address='0.0.0.0',
                  ssl_cafile=None, ssl_capath=None, ssl_cert=None, ssl_key=None,
-                 client_timeout=_websocket_client_timeout, **kwargs):
+                 client_timeout=_websocket_client_timeout, queue_size=100, slow_client_policy='drop_oldest',
+                 **kwargs):
         """
         :param port: Listen port for the websocket server (default: 8765)
         :type port: int
@@ -51,6 +55,13 @@ class WebsocketBackend(Backend):
 
         :param client_timeout: Timeout without any messages being received before closing a client connection. A zero timeout keeps the websocket open until an error occurs (default: 0, no timeout)
         :type ping_timeout: int
+
+        :param queue_size: Maximum number of events queued for each client (default: 100)
+        :type queue_size: int
+
+        :param slow_client_policy: What to do with the new events for a client whose queue is full:
+            ``drop_oldest`` (default) or ``coalesce``, see :class:`platypush.utils.websocket.SlowClientPolicy`
+        :type slow_client_policy: str
         """
 
         super().__init__(**kwargs)
@@ -58,7 +69,8 @@ class WebsocketBackend(Backend):
         self.port = port
         self.bind_address = bind_address
         self.client_timeout = client_timeout
-        self.active_websockets = set()
+        self.broadcaster = WebsocketBroadcaster(name='websocket:{}'.format(port), queue_size=queue_size,
+                                                policy=slow_client_policy)
 
         self.ssl_context = get_ssl_server_context(ssl_cert=ssl_cert,
                                                   ssl_key=ssl_key,
@@ -81,28 +93,18 @@ class WebsocketBackend(Backend):
 
     def notify_web_clients(self, event):
         """ Notify all the connected web clients (over websocket) of a new event """
-        async def send_event(websocket):
-            try:
-                await websocket.send(str(event))
-            except Exception as e:
-                self.logger.warning('Error on websocket send_event: {}'.format(e))
-
-        loop = get_or_create_event_loop()
-        active_websockets = self.active_websockets.copy()
-
-        for websocket in active_websockets:
-            try:
-                loop.run_until_complete(send_event(websocket))
-            except websockets.exceptions.ConnectionClosed:
-                self.logger.info('Client connection lost')
-                self.active_websockets.remove(websocket)
+        self.broadcaster.broadcast(event)
 
+    def on_stop(self):
+        """ On backend stop """
+        super().on_stop()
+        metrics.unregister_collector(self.broadcaster.collect_metrics)
 
     def run(self):
         super().run()
 
         async def serve_client(websocket, path):
-            self.active_websockets.add(websocket)
+            self.broadcaster.add_client(websocket)
             self.logger.debug('New websocket connection from {}'.
                              format(websocket.remote_address[0]))
 
@@ -114,6 +116,15 @@ class WebsocketBackend(Backend):
                     else:
                         msg = await websocket.recv()
 
+                    try:
+                        if self.broadcaster.handle_subscription(websocket, json.loads(msg)):
+                            continue
+                    except AssertionError as e:
+                        await websocket.send(json.dumps({'errors': [str(e)]}))
+                        continue
+                    except ValueError:
+                        pass
+
                     msg = Message.build(msg)
                     self.logger.info('Received message from {}: {}'.
                                     format(websocket.remote_address[0], msg))
@@ -128,15 +139,15 @@ class WebsocketBackend(Backend):
                         await websocket.send(str(response))
 
             except websockets.exceptions.ConnectionClosed as e:
-                self.active_websockets.remove(websocket)
                 self.logger.debug('Websocket client {} closed connection'.
                                   format(websocket.remote_address[0]))
             except asyncio.TimeoutError as e:
-                self.active_websockets.remove(websocket)
                 self.logger.debug('Websocket connection to {} timed out'.
                                   format(websocket.remote_address[0]))
             except Exception as e:
                 self.logger.exception(e)
+            finally:
+                self.broadcaster.remove_client(websocket)
 
         self.logger.info('Initialized websocket backend on port {}, bind address: {}'.
                          format(self.port, self.bind_address))
@@ -146,6 +157,8 @@ class WebsocketBackend(Backend):
             websocket_args['ssl'] = self.ssl_context
 
         loop = get_or_create_event_loop()
+        self.broadcaster.loop = loop
+        metrics.register_collector(self.broadcaster.collect_metrics)
         server = websockets.serve(serve_client, self.bind_address, self.port,
                                   **websocket_args)
 
@@ -5,7 +5,8 @@ import time
 from queue import Queue
 
 from platypush.config import Config
-from platypush.message.event import StopEvent
+from platypush.context.metrics import metrics
+from platypush.message.event import Event, StopEvent
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +16,20 @@ class Bus(object):
 
     _MSG_EXPIRY_TIMEOUT = 60.0  # Consider a message on the bus as expired after one minute without being picked up
 
-    def __init__(self, on_message=None):
+    # If True, the requests read from the bus are executed synchronously by
+    # the message handler, so they are acknowledged only once completed
+    ack_after_execution = False
+
+    def __init__(self, on_message=None, worker_pool=None):
+        """
+        :param on_message: Handler invoked for each message read from the bus
+        :param worker_pool: If set, the messages will be processed by this
+            :class:`platypush.bus.pool.BusWorkerPool` instead of a new thread
+            per message
+        """
         self.bus = Queue()
         self.on_message = on_message
+        self.worker_pool = worker_pool
         self.thread_id = threading.get_ident()
 
     def post(self, msg):
@@ -36,16 +48,42 @@ class Bus(object):
 
         self.post(evt)
 
+    def ack(self, msg):
+        """
+        Acknowledges that a message has been processed. No-op by default,
+        buses that support redelivery can override it.
+        """
+        pass
+
+    def _process_message(self, msg):
+        try:
+            self.on_message(msg)
+        finally:
+            self.ack(msg)
+
     def _msg_executor(self, msg):
         def executor():
             try:
-                self.on_message(msg)
+                self._process_message(msg)
             except Exception as e:
                 logger.error('Error on processing message {}'.format(msg))
                 logger.exception(e)
 
         return executor
 
+    @staticmethod
+    def _get_msg_type(msg):
+        if isinstance(msg, Event):
+            return 'event'
+        return msg.__class__.__name__.lower()
+
+    def _dispatch(self, msg):
+        """ Hands a message over to the worker pool, or to a new thread if no pool is configured """
+        if self.worker_pool:
+            self.worker_pool.put(msg)
+        else:
+            threading.Thread(target=self._msg_executor(msg)).start()
+
     def poll(self):
         """
         Reads messages from the bus until either stop event message or KeyboardInterrupt
@@ -55,19 +93,35 @@ class Bus(object):
             logger.warning('No message handlers installed, cannot poll')
             return
 
-        stop = False
-        while not stop:
-            msg = self.get()
-            if msg.timestamp and time.time() - msg.timestamp > self._MSG_EXPIRY_TIMEOUT:
-                logger.debug('{} seconds old message on the bus expired, ignoring it: {}'.
-                             format(int(time.time()-msg.timestamp), msg))
-                continue
-
-            threading.Thread(target=self._msg_executor(msg)).start()
+        if self.worker_pool:
+            self.worker_pool.start(self._process_message, on_drop=self.ack)
 
-            if isinstance(msg, StopEvent) and msg.targets_me():
-                logger.info('Received STOP event on the bus')
-                stop = True
+        stop = False
+        try:
+            while not stop:
+                msg = self.get()
+                if msg is None:
+                    continue
+
+                msg_type = self._get_msg_type(msg)
+                wait_time = time.time() - msg.timestamp if msg.timestamp else 0
+                if wait_time > self._MSG_EXPIRY_TIMEOUT:
+                    logger.debug('{} seconds old message on the bus expired, ignoring it: {}'.
+                                 format(int(wait_time), msg))
+                    metrics.inc('platypush_bus_messages_expired_total', type=msg_type)
+                    self.ack(msg)
+                    continue
+
+                metrics.observe('platypush_bus_wait_seconds', max(wait_time, 0), type=msg_type)
+
+                self._dispatch(msg)
+
+                if isinstance(msg, StopEvent) and msg.targets_me():
+                    logger.info('Received STOP event on the bus')
+                    stop = True
+        finally:
+            if self.worker_pool:
+                self.worker_pool.stop()
 
 
 # vim:sw=4:ts=4:et:
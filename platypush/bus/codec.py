@@ -0,0 +1,73 @@
+import ast
+import logging
+
+from platypush.message import Message, loads
+
+logger = logging.getLogger(__name__)
+
+# Header byte prepended to the msgpack-encoded payloads. JSON payloads have no
+# header, so messages posted by older producers are still understood.
+MSGPACK_HEADER = b'\x01'
+
+
+class Codec(object):
+    """
+    Encodes and decodes the messages transmitted over a Redis bus.
+
+    Supported codecs:
+
+        * ``json`` (default) - plain JSON, readable by any consumer.
+        * ``msgpack`` - compact binary format, cheaper to encode and decode.
+          Requires **msgpack** (``pip install msgpack``).
+
+    Decoding is negotiated through the first byte of the payload, so
+    producers configured with different codecs can share the same queue.
+    """
+
+    def __init__(self, codec='json'):
+        self.codec = codec
+
+        if codec == 'msgpack':
+            try:
+                import msgpack
+                self._msgpack = msgpack
+            except ImportError:
+                logger.warning('msgpack is not installed, falling back to the JSON codec')
+                self.codec = 'json'
+        elif codec != 'json':
+            raise AttributeError('Unsupported codec: {}'.format(codec))
+
+        self._encoder = Message.Encoder()
+
+    def encode(self, msg):
+        """
+        :param msg: Message to encode
+        :type msg: :class:`platypush.message.Message`
+        :returns: The encoded message, as a string for the JSON codec and as bytes for binary codecs.
+        """
+
+        if self.codec == 'msgpack':
+            return MSGPACK_HEADER + self._msgpack.packb(
+                msg.to_dict(), default=self._encoder.default, use_bin_type=True)
+
+        return str(msg)
+
+    @staticmethod
+    def decode(data):
+        """
+        :param data: Raw payload read from the bus
+        :type data: bytes
+        :returns: The decoded message as a dictionary.
+        """
+
+        if data[:1] == MSGPACK_HEADER:
+            import msgpack
+            return msgpack.unpackb(data[1:], raw=False)
+
+        try:
+            return loads(data)
+        except ValueError:
+            return ast.literal_eval(data.decode('utf-8'))
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,283 @@
+import enum
+import logging
+import threading
+
+from collections import deque
+
+from platypush.context.metrics import metrics
+from platypush.message.event import Event
+
+logger = logging.getLogger(__name__)
+
+
+class Backpressure(enum.Enum):
+    """
+    Policies applied by the :class:`BusWorkerPool` when a lane is full.
+    """
+
+    # Block the poller until a worker frees a slot
+    BLOCK = 'block'
+    # Drop the oldest event waiting in the lane
+    DROP_OLDEST = 'drop_oldest'
+    # Drop the oldest queued event of one of the configured droppable types,
+    # or the incoming message if it's droppable, otherwise block
+    DROP_EVENT_TYPE = 'drop_event_type'
+
+
+class BusWorkerPool(object):
+    """
+    Fixed-size pool of worker threads that process the messages read from a
+    bus, used instead of starting a new thread for each message.
+
+    Messages are dispatched over two bounded lanes: requests and responses go
+    through the priority lane, events through the event lane. Workers always
+    drain the priority lane first, so requests are never starved behind
+    high-frequency events (e.g. sensors or MQTT messages).
+
+    Backpressure is applied per lane. The configured policy only applies to
+    the event lane: requests and responses are never dropped, and the poller
+    waits for a free slot on the priority lane when it's full. The poller
+    waiting for a slot on a full event lane is woken up as soon as a worker
+    takes an event, so a request read right after it waits at most for one
+    event to be picked up before going on the priority lane.
+
+    Example configuration::
+
+        bus:
+            worker_pool:
+                pool_size: 8
+                queue_size: 1000
+                backpressure: drop_event_type
+                drop_event_types:
+                    - platypush.message.event.sensor.SensorDataChangeEvent
+                    - platypush.message.event.camera.CameraFrameCapturedEvent
+
+    """
+
+    _default_pool_size = 8
+    _default_queue_size = 1000
+
+    PRIORITY_LANE = 0
+    EVENT_LANE = 1
+
+    def __init__(self, pool_size=_default_pool_size, queue_size=_default_queue_size,
+                 backpressure=Backpressure.BLOCK.value, drop_event_types=None):
+        """
+        :param pool_size: Number of worker threads (default: 8)
+        :type pool_size: int
+
+        :param queue_size: Maximum number of messages waiting on each lane (default: 1000)
+        :type queue_size: int
+
+        :param backpressure: Policy applied when the event lane is full. Supported values: ``block`` (default),
+            ``drop_oldest`` and ``drop_event_type``
+        :type backpressure: str
+
+        :param drop_event_types: Event types that can be dropped when ``backpressure`` is set to
+            ``drop_event_type``. Subclasses of the listed types are dropped as well.
+        :type drop_event_types: list[str]
+        """
+
+        from platypush.utils import get_event_class_by_type
+
+        assert pool_size > 0, 'pool_size must be a positive number'
+        assert queue_size > 0, 'queue_size must be a positive number'
+
+        self.pool_size = int(pool_size)
+        self.queue_size = int(queue_size)
+        self.backpressure = Backpressure(backpressure)
+        self.drop_event_types = tuple(
+            get_event_class_by_type(event_type) for event_type in (drop_event_types or [])
+        )
+
+        self._lanes = (deque(), deque())
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = (threading.Condition(self._lock), threading.Condition(self._lock))
+        self._workers = []
+        self._handler = None
+        self._on_drop = None
+        self._should_stop = False
+
+        self.processed = 0
+        self.dropped = 0
+
+    def start(self, handler, on_drop=None):
+        """
+        Start the worker threads.
+
+        :param handler: Function that will be invoked by the workers with each message as an argument
+        :param on_drop: Optional function that will be invoked with each message dropped by the backpressure policy
+        """
+
+        self._handler = handler
+        self._on_drop = on_drop
+        self._should_stop = False
+
+        for i in range(self.pool_size):
+            worker = threading.Thread(target=self._worker, name='BusWorker-{}'.format(i))
+            self._workers.append(worker)
+            worker.start()
+
+    def stop(self, wait=False):
+        """
+        Stop the workers once the messages already on the lanes have been processed.
+
+        :param wait: If True then wait for the workers to terminate (default: False)
+        """
+
+        with self._lock:
+            self._should_stop = True
+            self._not_empty.notify_all()
+            for not_full in self._not_full:
+                not_full.notify_all()
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+        self._workers = []
+
+    def _get_lane(self, msg):
+        return self.EVENT_LANE if isinstance(msg, Event) else self.PRIORITY_LANE
+
+    def _is_droppable(self, msg):
+        return isinstance(msg, self.drop_event_types)
+
+    def _drop(self, msg):
+        # Invoked with the lock held
+        self.dropped += 1
+        metrics.inc('platypush_bus_messages_dropped_total', type=msg.__class__.__name__)
+        logger.debug('Bus lane full, dropping message: {}'.format(msg))
+
+        if self._on_drop:
+            try:
+                self._on_drop(msg)
+            except Exception as e:
+                logger.warning('Error while dropping message {}: {}'.format(msg, str(e)))
+
+    def _make_room(self, lane, msg):
+        """
+        Apply the backpressure policy on a full lane. Returns True if the
+        incoming message should be enqueued, False if it should be dropped and
+        None if the caller should wait for a free slot.
+        """
+
+        if lane is self._lanes[self.PRIORITY_LANE]:
+            # Requests and responses are never dropped
+            return None
+
+        if self.backpressure == Backpressure.DROP_OLDEST:
+            self._drop(lane.popleft())
+            return True
+
+        if self.backpressure == Backpressure.DROP_EVENT_TYPE:
+            for queued_msg in lane:
+                if self._is_droppable(queued_msg):
+                    lane.remove(queued_msg)
+                    self._drop(queued_msg)
+                    return True
+
+            if self._is_droppable(msg):
+                self._drop(msg)
+                return False
+
+        return None
+
+    def put(self, msg):
+        """
+        Put a message on its lane, applying the configured backpressure policy if the lane is full.
+
+        :returns: True if the message was enqueued, False if it was dropped or the pool has been stopped.
+        """
+
+        lane_id = self._get_lane(msg)
+        lane = self._lanes[lane_id]
+        not_full = self._not_full[lane_id]
+
+        with not_full:
+            while True:
+                if self._should_stop:
+                    logger.debug('Bus worker pool stopped, discarding message: {}'.format(msg))
+                    return False
+
+                if len(lane) < self.queue_size:
+                    break
+
+                enqueue = self._make_room(lane, msg)
+                if enqueue is False:
+                    return False
+                if enqueue:
+                    break
+
+                not_full.wait()
+
+            lane.append(msg)
+            self._not_empty.notify()
+            return True
+
+    def _get(self):
+        with self._not_empty:
+            while True:
+                for lane_id, lane in enumerate(self._lanes):
+                    if lane:
+                        msg = lane.popleft()
+                        self._not_full[lane_id].notify()
+                        return msg
+
+                if self._should_stop:
+                    return None
+
+                self._not_empty.wait()
+
+    def _worker(self):
+        while True:
+            msg = self._get()
+            if msg is None:
+                break
+
+            try:
+                self._handler(msg)
+            except Exception as e:
+                logger.error('Error on processing message {}'.format(msg))
+                logger.exception(e)
+            finally:
+                with self._lock:
+                    self.processed += 1
+
+    def collect_metrics(self):
+        """ Returns the gauges of the pool, see :meth:`platypush.context.metrics.MetricsRegistry.register_collector` """
+        return [
+            ('platypush_bus_queue_depth', {'lane': 'priority'}, len(self._lanes[self.PRIORITY_LANE])),
+            ('platypush_bus_queue_depth', {'lane': 'event'}, len(self._lanes[self.EVENT_LANE])),
+            ('platypush_bus_messages_processed', {}, self.processed),
+        ]
+
+    def get_stats(self):
+        """
+        :returns: The current status of the pool, in the format::
+
+            {
+                "pool_size": 8,
+                "queue_size": 1000,
+                "backpressure": "block",
+                "priority_queue_depth": 0,
+                "event_queue_depth": 12,
+                "processed": 1024,
+                "dropped": 0
+            }
+
+        """
+
+        return {
+            'pool_size': self.pool_size,
+            'queue_size': self.queue_size,
+            'backpressure': self.backpressure.value,
+            'priority_queue_depth': len(self._lanes[self.PRIORITY_LANE]),
+            'event_queue_depth': len(self._lanes[self.EVENT_LANE]),
+            'processed': self.processed,
+            'dropped': self.dropped,
+        }
+
+
+# vim:sw=4:ts=4:et:
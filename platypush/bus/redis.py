@@ -1,50 +1,116 @@
-import ast
-import json
 import logging
 import threading
+import time
 
-from redis import Redis
+from collections import deque
 
 from platypush.bus import Bus
+from platypush.bus.codec import Codec
 from platypush.config import Config
+from platypush.context import get_redis
+from platypush.context.metrics import metrics
 from platypush.message import Message
 
 logger = logging.getLogger(__name__)
 
 
 class RedisBus(Bus):
-    """ Overrides the in-process in-memory local bus with a Redis bus """
+    """
+    Overrides the in-process in-memory local bus with a Redis bus.
+
+    By default messages are read and written one at a time. For high-throughput
+    setups you can configure a ``batch_size`` greater than 1 in the ``bus``
+    section of your configuration: up to ``batch_size`` messages will then be
+    read from the queue per round trip, and the messages posted concurrently by
+    multiple threads will be coalesced into a single ``RPUSH``. You can also
+    select a more compact ``codec`` (see :class:`platypush.bus.codec.Codec`)::
+
+        bus:
+            batch_size: 50
+            codec: msgpack
+
+    """
+
     _DEFAULT_REDIS_QUEUE = 'platypush/bus'
 
     def __init__(self, on_message=None, redis_queue=_DEFAULT_REDIS_QUEUE,
-                 *args, **kwargs):
-        super().__init__(on_message=on_message)
+                 *args, worker_pool=None, batch_size=None, codec=None, **kwargs):
+        super().__init__(on_message=on_message, worker_pool=worker_pool)
 
         if not args and not kwargs:
             kwargs = (Config.get('backend.redis') or {}).get('redis_args', {})
 
-        self.redis = Redis(*args, **kwargs)
+        bus_conf = Config.get('bus') or {}
+        self.redis = get_redis(*args, **kwargs)
         self.redis_args = kwargs
         self.redis_queue = redis_queue
         self.on_message = on_message
         self.thread_id = threading.get_ident()
+        self.batch_size = max(1, int(batch_size or bus_conf.get('batch_size', 1)))
+        self.codec = Codec(codec or bus_conf.get('codec', 'json'))
+
+        # Messages already fetched from Redis but not returned by get() yet
+        self._read_buffer = deque()
+
+        # Messages waiting to be pushed by the thread currently writing to Redis
+        self._write_buffer = []
+        self._write_lock = threading.Lock()
+        self._writing = False
+
+    @classmethod
+    def build(cls, on_message=None, worker_pool=None, *args, **kwargs):
+        """
+        Builds the Redis bus configured in the ``bus`` section of the
+        configuration - a :class:`platypush.bus.redis_stream.RedisStreamBus`
+        if ``type`` is set to ``redis_stream``, a list-based :class:`RedisBus`
+        otherwise.
+        """
+
+        bus_type = (Config.get('bus') or {}).get('type', 'redis')
+        if bus_type == 'redis_stream':
+            from platypush.bus.redis_stream import RedisStreamBus
+            return RedisStreamBus(on_message=on_message, worker_pool=worker_pool, *args, **kwargs)
+
+        assert bus_type == 'redis', 'Unsupported bus type: {}'.format(bus_type)
+        return cls(on_message=on_message, worker_pool=worker_pool, *args, **kwargs)
+
+    def _encode(self, msg):
+        start = time.perf_counter()
+        data = self.codec.encode(msg)
+        metrics.observe('platypush_bus_serialization_seconds', time.perf_counter() - start,
+                        codec=self.codec.codec)
+        return data
+
+    def _fetch(self):
+        """ Blocks until at least a message is available and reads up to batch_size messages """
+        msg = self.redis.blpop(self.redis_queue)
+        if not msg or msg[1] is None:
+            return []
+
+        msgs = [msg[1]]
+        if self.batch_size > 1:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.lrange(self.redis_queue, 0, self.batch_size - 2)
+            pipe.ltrim(self.redis_queue, self.batch_size - 1, -1)
+            msgs.extend(pipe.execute()[0])
+
+        return msgs
 
     def get(self):
         """ Reads one message from the Redis queue """
         msg = None
 
         try:
-            msg = self.redis.blpop(self.redis_queue)
-            if not msg or msg[1] is None:
+            if not self._read_buffer:
+                self._read_buffer.extend(self._fetch())
+            if not self._read_buffer:
                 return
 
-            msg = msg[1].decode('utf-8')
-            try:
-                msg = json.loads(msg)
-            except json.decoder.JSONDecodeError:
-                msg = ast.literal_eval(msg)
-
+            start = time.perf_counter()
+            msg = self.codec.decode(self._read_buffer.popleft())
             msg = Message.build(msg)
+            metrics.observe('platypush_bus_deserialization_seconds', time.perf_counter() - start,
+                            codec=self.codec.codec)
         except Exception as e:
             logger.exception(e)
 
@@ -52,7 +118,41 @@ class RedisBus(Bus):
 
     def post(self, msg):
         """ Sends a message to the Redis queue """
-        return self.redis.rpush(self.redis_queue, str(msg))
+        if self.batch_size == 1:
+            return self.redis.rpush(self.redis_queue, self._encode(msg))
+
+        return self.post_many([msg])
+
+    def post_many(self, msgs):
+        """
+        Sends a list of messages to the Redis queue in a single round trip.
+        If another thread is already writing to the queue, the messages are
+        appended to its next ``RPUSH``.
+        """
+
+        with self._write_lock:
+            self._write_buffer.extend(self._encode(msg) for msg in msgs)
+            if self._writing:
+                return
+            self._writing = True
+
+        ret = None
+        try:
+            while True:
+                with self._write_lock:
+                    batch = self._write_buffer
+                    self._write_buffer = []
+                    if not batch:
+                        self._writing = False
+                        break
+
+                ret = self.redis.rpush(self.redis_queue, *batch)
+        except Exception:
+            with self._write_lock:
+                self._writing = False
+            raise
+
+        return ret
 
 
 # vim:sw=4:ts=4:et:
@@ -0,0 +1,207 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+from collections import deque
+
+from redis.exceptions import ResponseError
+
+from platypush.bus.redis import RedisBus
+from platypush.config import Config
+from platypush.context.metrics import metrics
+from platypush.message import Message
+from platypush.message.event import StopEvent
+
+logger = logging.getLogger(__name__)
+
+
+class RedisStreamBus(RedisBus):
+    """
+    Redis bus built on top of a Redis Stream and a consumer group.
+
+    Multiple daemon processes, on one or more hosts, can share the load of the
+    same stream: each message is delivered to only one consumer of the group,
+    and it's acknowledged once it has been processed. If a consumer dies before
+    acknowledging its messages, the other consumers will reclaim them after
+    ``claim_timeout`` seconds.
+
+    Requests are executed synchronously by the thread that processes the
+    message (a bus worker if ``bus.worker_pool`` is configured), so they're
+    only acknowledged once completed. Slow actions hold that thread for their
+    whole duration: size the worker pool accordingly.
+
+    Configuration::
+
+        bus:
+            type: redis_stream
+            # Name of the stream (default: platypush/bus/stream)
+            stream: platypush/bus/stream
+            # Name of the consumer group (default: platypush)
+            consumer_group: platypush
+            # Messages pending for longer than this number of seconds on a
+            # consumer are reclaimed by the others (default: 60)
+            claim_timeout: 60
+            # Approximate maximum length of the stream (default: 10000)
+            max_len: 10000
+
+    """
+
+    _DEFAULT_STREAM = 'platypush/bus/stream'
+    _DEFAULT_CONSUMER_GROUP = 'platypush'
+    _DEFAULT_CLAIM_TIMEOUT = 60
+    _DEFAULT_MAX_LEN = 10000
+
+    # How long a read blocks on the stream before checking for local stop
+    # events and messages to reclaim
+    _block_timeout = 1.0
+
+    ack_after_execution = True
+
+    def __init__(self, on_message=None, stream=None, consumer_group=None,
+                 consumer_name=None, claim_timeout=None, max_len=None,
+                 worker_pool=None, batch_size=None, codec=None, *args, **kwargs):
+        """
+        :param on_message: Handler invoked for each message read from the bus
+        :param stream: Name of the Redis stream (default: ``platypush/bus/stream``)
+        :param consumer_group: Name of the consumer group (default: ``platypush``)
+        :param consumer_name: Name of this consumer (default: ``<hostname>-<pid>``)
+        :param claim_timeout: Reclaim the messages pending on other consumers for
+            longer than this number of seconds (default: 60)
+        :param max_len: Approximate maximum number of entries kept on the stream (default: 10000)
+        :param worker_pool: Optional :class:`platypush.bus.pool.BusWorkerPool`
+        :param batch_size: Maximum number of messages read per round trip
+        :param codec: Codec used to encode the messages (``json`` or ``msgpack``)
+        :param args: Arguments passed to the Redis constructor
+        :param kwargs: Keyword arguments passed to the Redis constructor
+        """
+
+        bus_conf = Config.get('bus') or {}
+        stream = stream or bus_conf.get('stream', self._DEFAULT_STREAM)
+        super().__init__(on_message=on_message, redis_queue=stream,
+                         worker_pool=worker_pool, batch_size=batch_size,
+                         codec=codec, *args, **kwargs)
+
+        self.stream = stream
+        self.consumer_group = consumer_group or bus_conf.get('consumer_group', self._DEFAULT_CONSUMER_GROUP)
+        self.consumer_name = consumer_name or '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.claim_timeout = float(claim_timeout if claim_timeout is not None
+                                   else bus_conf.get('claim_timeout', self._DEFAULT_CLAIM_TIMEOUT))
+        self.max_len = max_len or bus_conf.get('max_len', self._DEFAULT_MAX_LEN)
+
+        # Stop events are delivered locally, so they don't reach the other consumers
+        self._local_messages = deque()
+        self._entry_ids = {}   # id(msg) -> stream entry ID
+        self._entry_ids_lock = threading.Lock()
+        self._claim_cursor = '0-0'
+        self._last_claim_time = 0
+        self._group_created = False
+
+    def _create_group(self):
+        if self._group_created:
+            return
+
+        try:
+            self.redis.xgroup_create(self.stream, self.consumer_group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+        self._group_created = True
+
+    def _claim(self):
+        """ Reclaims the messages left pending for too long by other consumers """
+        now = time.time()
+        if now - self._last_claim_time < self.claim_timeout:
+            return []
+
+        ret = self.redis.xautoclaim(self.stream, self.consumer_group, self.consumer_name,
+                                    min_idle_time=int(self.claim_timeout * 1000),
+                                    start_id=self._claim_cursor, count=self.batch_size)
+
+        self._claim_cursor = ret[0]
+        if self._claim_cursor in (b'0-0', '0-0'):
+            # The whole pending list has been scanned
+            self._last_claim_time = now
+
+        entries = ret[1]
+        if entries:
+            logger.info('Reclaimed {} pending messages from the bus'.format(len(entries)))
+        return entries
+
+    def _fetch(self):
+        self._create_group()
+        entries = self._claim()
+        if entries:
+            return entries
+
+        ret = self.redis.xreadgroup(self.consumer_group, self.consumer_name,
+                                    {self.stream: '>'}, count=self.batch_size,
+                                    block=int(self._block_timeout * 1000))
+
+        return ret[0][1] if ret else []
+
+    def get(self):
+        """ Reads one message from the stream """
+        if self._local_messages:
+            return self._local_messages.popleft()
+
+        msg = None
+        entry_id = None
+
+        try:
+            if not self._read_buffer:
+                self._read_buffer.extend(self._fetch())
+            if not self._read_buffer:
+                return
+
+            entry_id, fields = self._read_buffer.popleft()
+            if not fields:
+                # The entry has been trimmed from the stream before being claimed
+                self.redis.xack(self.stream, self.consumer_group, entry_id)
+                return
+
+            start = time.perf_counter()
+            msg = Message.build(self.codec.decode(fields[b'msg']))
+            metrics.observe('platypush_bus_deserialization_seconds', time.perf_counter() - start,
+                            codec=self.codec.codec)
+            with self._entry_ids_lock:
+                self._entry_ids[id(msg)] = entry_id
+        except Exception as e:
+            logger.exception(e)
+            if entry_id:
+                # Unparsable message, don't redeliver it
+                self.redis.xack(self.stream, self.consumer_group, entry_id)
+
+        return msg
+
+    def ack(self, msg):
+        """ Acknowledges a processed message on the consumer group """
+        with self._entry_ids_lock:
+            entry_id = self._entry_ids.pop(id(msg), None)
+
+        if entry_id:
+            self.redis.xack(self.stream, self.consumer_group, entry_id)
+
+    def post(self, msg):
+        """ Appends a message to the stream """
+        return self.redis.xadd(self.stream, {'msg': self._encode(msg)},
+                               maxlen=self.max_len, approximate=True)
+
+    def post_many(self, msgs):
+        """ Appends a list of messages to the stream in a single round trip """
+        pipe = self.redis.pipeline(transaction=False)
+        for msg in msgs:
+            pipe.xadd(self.stream, {'msg': self._encode(msg)},
+                      maxlen=self.max_len, approximate=True)
+        return pipe.execute()
+
+    def stop(self):
+        """ Stops the local poll loop without posting the stop event on the shared stream """
+        self._local_messages.append(StopEvent(target=Config.get('device_id'),
+                                              origin=Config.get('device_id'),
+                                              thread_id=self.thread_id))
+
+
+# vim:sw=4:ts=4:et:
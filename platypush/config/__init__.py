@@ -1,3 +1,4 @@
+import copy
 import datetime
 import importlib
 import inspect
@@ -8,14 +9,20 @@ import pkgutil
 import re
 import socket
 import sys
+import threading
 from typing import Optional
 
 import yaml
 
+from platypush.config.cache import ConfigCache
+from platypush.config.reload import ConfigChanges
 from platypush.utils import get_hash, is_functional_procedure, is_functional_hook
 
 """ Config singleton instance """
 _default_config_instance = None
+_reload_lock = threading.RLock()
+
+logger = logging.getLogger(__name__)
 
 
 class Config(object):
@@ -46,15 +53,21 @@ class Config(object):
     }
 
     _workdir_location = os.path.join(os.path.expanduser('~'), '.local', 'share', 'platypush')
-    _included_files = set()
 
-    def __init__(self, cfgfile=None):
+    # Functions invoked with the ConfigChanges when the configuration is reloaded
+    _reload_listeners = []
+
+    def __init__(self, cfgfile=None, use_cache=False):
         """
         Constructor. Always use the class as a singleton (i.e. through
         Config.init), you won't probably need to call the constructor directly
         Params:
             cfgfile -- Config file path (default: retrieve the first
                        available location in _cfgfile_locations)
+            use_cache -- If set, the compiled configuration will be loaded
+                         from/stored to the configuration cache, and it will be
+                         reused as long as the configuration files and the
+                         scripts don't change (default: False)
         """
 
         if cfgfile is None:
@@ -65,7 +78,21 @@ class Config(object):
                                .format(self._cfgfile_locations))
 
         self._cfgfile = os.path.abspath(os.path.expanduser(cfgfile))
-        self._config = self._read_config_file(self._cfgfile)
+        # Files included by this configuration, collected on each (re)load
+        self._included_files = set()
+        self._cache = ConfigCache(self._cfgfile, os.path.join(self._workdir_location, 'cache')) \
+            if use_cache else None
+
+        is_cached = bool(self._cache and self._cache.load())
+        if is_cached:
+            self._raw_config = self._cache.get('config')
+            self._included_files.update(self._cache.get('included_files'))
+        else:
+            self._raw_config = self._read_config_file(self._cfgfile)
+
+        # The parsed configuration is kept as it is, so it can be cached and
+        # compared with the new configuration upon reload
+        self._config = copy.deepcopy(self._raw_config)
 
         if 'token' in self._config:
             self._config['token'] = self._config['token']
@@ -87,7 +114,8 @@ class Config(object):
         # Include scripts_dir parent in sys.path so members can be imported in scripts
         # through the `scripts` package
         scripts_parent_dir = str(pathlib.Path(self._config['scripts_dir']).absolute().parent)
-        sys.path = [scripts_parent_dir] + sys.path
+        if scripts_parent_dir not in sys.path:
+            sys.path = [scripts_parent_dir] + sys.path
 
         self._config['db'] = self._config.get('main.db', {
             'engine': 'sqlite:///' + os.path.join(
@@ -141,6 +169,12 @@ class Config(object):
         self._load_scripts()
         self._init_components()
 
+        if self._cache and not is_cached:
+            self._cache.save(files=[self._cfgfile, *self._included_files],
+                             scripts_dir=self._config['scripts_dir'],
+                             config=self._raw_config,
+                             included_files=list(self._included_files))
+
     @staticmethod
     def _is_special_token(token):
         return token == 'main.db' or \
@@ -149,7 +183,13 @@ class Config(object):
                token == 'logging' or \
                token == 'workdir' or \
                token == 'device_id' or \
-               token == 'environment'
+               token == 'environment' or \
+               token == 'bus' or \
+               token == 'executor' or \
+               token == 'startup' or \
+               token == 'reload' or \
+               token == 'cache' or \
+               token == 'redis_pool'
 
     def _read_config_file(self, cfgfile):
         cfgfile_dir = os.path.dirname(os.path.abspath(
@@ -213,6 +253,8 @@ class Config(object):
         scripts_modname = os.path.basename(scripts_dir)
         self._load_module(scripts_modname, prefix='')
 
+        # All the script modules are imported upon each start, also when the
+        # configuration is cached, as their import may have side effects
         for _, modname, _ in pkgutil.walk_packages(path=[scripts_dir], onerror=lambda x: None):
             self._load_module(modname)
 
@@ -232,6 +274,8 @@ class Config(object):
             elif key.startswith('procedure.'):
                 tokens = key.split('.')
                 _async = True if len(tokens) > 2 and tokens[1] == 'async' else False
+                # procedure.dag.<name>: run the actions as a dependency graph
+                _dag = True if len(tokens) > 2 and tokens[1] == 'dag' else False
                 procedure_name = '.'.join(tokens[2:] if len(tokens) > 2 else tokens[1:])
                 args = []
                 m = re.match(r'^([^(]+)\(([^)]+)\)\s*', procedure_name)
@@ -246,6 +290,7 @@ class Config(object):
 
                 self.procedures[procedure_name] = {
                     '_async': _async,
+                    '_dag': _dag,
                     'actions': self._config[key],
                     'args': args,
                 }
@@ -259,6 +304,34 @@ class Config(object):
         for (key, value) in self._default_constants.items():
             self.constants[key] = value
 
+    @staticmethod
+    def get_cached(key):
+        """
+        Gets an entry from the configuration cache. It returns None if the
+        cache is disabled, or if the configuration has changed since the
+        entry was stored.
+        """
+        global _default_config_instance
+        if _default_config_instance is None:
+            _default_config_instance = Config()
+
+        cache = _default_config_instance._cache
+        return cache.get(key) if cache else None
+
+    @staticmethod
+    def set_cached(key, value):
+        """
+        Stores an entry derived from the current configuration (e.g. the
+        compiled event hooks) in the configuration cache, if enabled.
+        """
+        global _default_config_instance
+        if _default_config_instance is None:
+            _default_config_instance = Config()
+
+        cache = _default_config_instance._cache
+        if cache:
+            cache.set(key, value)
+
     @staticmethod
     def get_backends():
         global _default_config_instance
@@ -334,14 +407,67 @@ class Config(object):
                 return location
 
     @staticmethod
-    def init(cfgfile=None):
+    def init(cfgfile=None, use_cache=False):
         """
         Initializes the config object singleton
         Params:
             cfgfile -- path to the config file - default: _cfgfile_locations
+            use_cache -- use the configuration cache - default: False
         """
         global _default_config_instance
-        _default_config_instance = Config(cfgfile)
+        _default_config_instance = Config(cfgfile, use_cache=use_cache)
+
+    @staticmethod
+    def get_config_files():
+        """
+        Returns the configuration file and the files it includes
+        """
+        global _default_config_instance
+        if _default_config_instance is None:
+            _default_config_instance = Config()
+        return [_default_config_instance._cfgfile, *sorted(_default_config_instance._included_files)]
+
+    @staticmethod
+    def add_reload_listener(listener):
+        """
+        Registers a function that will be invoked with the
+        :class:`platypush.config.reload.ConfigChanges` whenever the
+        configuration is reloaded
+        """
+        Config._reload_listeners.append(listener)
+
+    @staticmethod
+    def remove_reload_listener(listener):
+        if listener in Config._reload_listeners:
+            Config._reload_listeners.remove(listener)
+
+    @staticmethod
+    def reload():
+        """
+        Reloads the configuration from the same file and notifies the changes
+        to the reload listeners
+        Returns:
+            A :class:`platypush.config.reload.ConfigChanges` object
+        """
+        global _default_config_instance
+
+        with _reload_lock:
+            if _default_config_instance is None:
+                _default_config_instance = Config()
+
+            old_config = _default_config_instance
+            new_config = Config(old_config._cfgfile, use_cache=old_config._cache is not None)
+            changes = ConfigChanges(old_config._raw_config, new_config._raw_config,
+                                    is_special_token=Config._is_special_token)
+            _default_config_instance = new_config
+
+            for listener in list(Config._reload_listeners):
+                try:
+                    listener(changes)
+                except Exception as e:
+                    logger.exception(e)
+
+            return changes
 
     @staticmethod
     def get(key):
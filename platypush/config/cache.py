@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import os
+import pickle
+import socket
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigCache(object):
+    """
+    On-disk cache of the compiled configuration: the configuration parsed
+    from the YAML files and the pre-built event hooks.
+
+    The cache is bound to the configuration file, to all of its includes and
+    to all the Python files in the scripts directory. A file is considered
+    unchanged if its modification time and size are the same as the cached
+    ones, or if its content hash is still the same (e.g. the file has been
+    touched or copied). Any change invalidates the whole cache.
+
+    The cached configuration includes the access token, so the cache file is
+    only readable by its owner.
+    """
+
+    # Bump it whenever the format of the cached data changes
+    _version = 2
+
+    def __init__(self, cfgfile, cache_dir):
+        """
+        :param cfgfile: Path of the configuration file
+        :param cache_dir: Directory where the cache files are stored
+        """
+
+        self.cfgfile = cfgfile
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, 'config-{}.pickle'.format(
+            hashlib.sha256(cfgfile.encode('utf-8')).hexdigest()[:16]))
+
+        self.data = {}
+        self._files = {}
+        self._scripts_dir = None
+        self._scripts = []
+
+    def _get_key(self):
+        # The device_id defaults to the hostname, and it's stored in the requests of the pre-built hooks
+        return self._version, tuple(sys.version_info[:2]), socket.gethostname(), self.cfgfile
+
+    @staticmethod
+    def _get_file_hash(path):
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    @classmethod
+    def _get_fingerprint(cls, path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size, cls._get_file_hash(path)
+
+    @staticmethod
+    def _list_scripts(scripts_dir):
+        scripts = []
+        for root, dirs, files in os.walk(scripts_dir):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            scripts.extend(os.path.join(root, f) for f in files if f.endswith('.py'))
+
+        return sorted(scripts)
+
+    def _is_file_changed(self, path, fingerprint):
+        mtime, size, digest = fingerprint
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+
+        if st.st_mtime_ns == mtime and st.st_size == size:
+            return False
+        if st.st_size != size:
+            return True
+        return self._get_file_hash(path) != digest
+
+    def _is_valid(self):
+        if self._scripts_dir and self._list_scripts(self._scripts_dir) != self._scripts:
+            return False
+
+        for path, fingerprint in self._files.items():
+            if self._is_file_changed(path, fingerprint):
+                return False
+
+        return True
+
+    def load(self):
+        """
+        Loads the cache.
+
+        :returns: True if the cache exists and it's still valid, False otherwise.
+        """
+
+        try:
+            with open(self.path, 'rb') as f:
+                cache = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning('Could not load the configuration cache {}: {}'.format(self.path, str(e)))
+            return False
+
+        if not isinstance(cache, dict) or cache.get('key') != self._get_key():
+            return False
+
+        self._files = cache['files']
+        self._scripts_dir = cache['scripts_dir']
+        self._scripts = cache['scripts']
+
+        if not self._is_valid():
+            self._files = {}
+            self._scripts_dir = None
+            self._scripts = []
+            return False
+
+        self.data = cache['data']
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def save(self, files, scripts_dir=None, **data):
+        """
+        Replaces the content of the cache.
+
+        :param files: Configuration files the cached data depends on
+        :param scripts_dir: Scripts directory. All the Python files under it will be tracked
+        :param data: Data to be cached
+        """
+
+        self._scripts_dir = scripts_dir
+        self._scripts = self._list_scripts(scripts_dir) if scripts_dir else []
+        self._files = {
+            path: self._get_fingerprint(path)
+            for path in list(files) + self._scripts
+            if os.path.isfile(path)
+        }
+
+        self.data = data
+        self._write()
+
+    def set(self, key, value):
+        """ Adds an entry to the cache, bound to the same files as the existing entries """
+        self.data[key] = value
+        if not self._write():
+            del self.data[key]
+
+    def _write(self):
+        tmp_path = self.path + '.tmp'
+
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({
+                    'key': self._get_key(),
+                    'files': self._files,
+                    'scripts_dir': self._scripts_dir,
+                    'scripts': self._scripts,
+                    'data': self.data,
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            logger.warning('Could not write the configuration cache {}: {}'.format(self.path, str(e)))
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+            return False
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigChanges(object):
+    """
+    Differences between two versions of the configuration, grouped by
+    component type. Each group maps to the names of the ``added``,
+    ``changed`` and ``removed`` components, e.g.::
+
+        {
+            "backends": {"added": [], "changed": ["http"], "removed": []},
+            "plugins": {"added": ["light.hue"], "changed": [], "removed": []},
+            "event_hooks": {"added": [], "changed": [], "removed": ["OnPing"]},
+            "procedures": {"added": [], "changed": [], "removed": []},
+            "cronjobs": {"added": [], "changed": [], "removed": []},
+            "settings": {"added": [], "changed": ["logging"], "removed": []}
+        }
+
+    ``settings`` contains the global sections of the configuration (e.g.
+    ``logging``, ``bus`` or ``executor``), whose changes require a restart.
+    """
+
+    _prefixes = (
+        ('backend.', 'backends'),
+        ('event.hook.', 'event_hooks'),
+        ('cron.', 'cronjobs'),
+        ('procedure.', 'procedures'),
+    )
+
+    groups = ('backends', 'plugins', 'event_hooks', 'procedures', 'cronjobs', 'settings')
+
+    def __init__(self, old_config, new_config, is_special_token=None):
+        """
+        :param old_config: Previous configuration, as parsed from the configuration files
+        :param new_config: New configuration, as parsed from the configuration files
+        :param is_special_token: Function that tells whether a section is a global setting
+        """
+
+        is_special_token = is_special_token or (lambda _: False)
+        old_components = self._get_components(old_config, is_special_token)
+        new_components = self._get_components(new_config, is_special_token)
+
+        for group in self.groups:
+            old, new = old_components[group], new_components[group]
+            setattr(self, group, {
+                'added': sorted(new.keys() - old.keys()),
+                'changed': sorted(name for name in new.keys() & old.keys() if new[name] != old[name]),
+                'removed': sorted(old.keys() - new.keys()),
+            })
+
+    @classmethod
+    def _get_components(cls, config, is_special_token):
+        components = {group: {} for group in cls.groups}
+
+        for key, value in config.items():
+            for prefix, group in cls._prefixes:
+                if key.startswith(prefix):
+                    components[group][key[len(prefix):]] = value
+                    break
+            else:
+                group = 'settings' if is_special_token(key) or key in ('include', 'scripts_dir') else 'plugins'
+                components[group][key] = value
+
+        return components
+
+    def get_updated(self, group):
+        """ :returns: The names of the components of a group that have been added or changed """
+        changes = getattr(self, group)
+        return changes['added'] + changes['changed']
+
+    def get_stale(self, group):
+        """ :returns: The names of the components of a group that have been changed or removed """
+        changes = getattr(self, group)
+        return changes['changed'] + changes['removed']
+
+    def to_dict(self):
+        return {group: getattr(self, group) for group in self.groups}
+
+    def __bool__(self):
+        return any(any(getattr(self, group).values()) for group in self.groups)
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    Thread that watches the configuration files and invokes a callback when
+    any of them changes. The files are polled by modification time and size,
+    so it doesn't require any platform-specific notification mechanism, and
+    changes are notified once the files have been stable for one polling
+    interval, so editors that write a file in several steps don't trigger
+    multiple reloads.
+    """
+
+    def __init__(self, get_files, callback, poll_seconds=2.0):
+        """
+        :param get_files: Function that returns the paths of the files to be watched. It's invoked
+            after each reload, since the list of included files may change.
+        :param callback: Function invoked when the files change
+        :param poll_seconds: Polling interval, in seconds (default: 2)
+        """
+
+        super().__init__(name='ConfigWatcher', daemon=True)
+        self.get_files = get_files
+        self.callback = callback
+        self.poll_seconds = poll_seconds
+        self._should_stop = threading.Event()
+
+    @staticmethod
+    def _get_state(files):
+        state = {}
+        for path in files:
+            try:
+                st = os.stat(path)
+                state[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                state[path] = None
+
+        return state
+
+    def run(self):
+        state = self._get_state(self.get_files())
+        pending_state = None
+
+        while not self._should_stop.wait(self.poll_seconds):
+            new_state = self._get_state(state.keys())
+            if new_state == state:
+                pending_state = None
+                continue
+
+            if new_state != pending_state:
+                # Wait until the files are stable
+                pending_state = new_state
+                continue
+
+            logger.info('Configuration files changed, reloading')
+
+            try:
+                self.callback()
+            except Exception as e:
+                logger.warning('Could not reload the configuration: {}'.format(str(e)))
+                logger.exception(e)
+
+            state = self._get_state(self.get_files())
+            pending_state = None
+
+    def stop(self):
+        self._should_stop.set()
+
+
+# vim:sw=4:ts=4:et:
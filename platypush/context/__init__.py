@@ -5,6 +5,7 @@ import logging
 from threading import RLock
 
 from ..config import Config
+from ..utils.startup import profiler
 
 logger = logging.getLogger(__name__)
 
@@ -21,13 +22,55 @@ plugins_init_locks = {}
 # Reference to the main application bus
 main_bus = None
 
-def register_backends(bus=None, global_scope=False, **kwargs):
+# Thread pool used to run requests, event hooks and event handlers
+# (not named `executor`, or it would be shadowed by the executor submodule)
+main_executor = None
+main_executor_lock = RLock()
+
+# Scheduler of the cronjobs
+main_cron_scheduler = None
+main_cron_scheduler_lock = RLock()
+
+# Shared Redis clients and connection pools
+main_redis_pool = None
+main_redis_pool_lock = RLock()
+
+# Cache of the responses of the idempotent plugin actions
+main_response_cache = None
+main_response_cache_lock = RLock()
+
+def _build_backend(name, cfg, bus=None, **kwargs):
+    with profiler.measure('backend.' + name, 'import'):
+        module = importlib.import_module('platypush.backend.' + name)
+
+    # e.g. backend.pushbullet main class: PushbulletBackend
+    cls_name = ''
+    for token in module.__name__.title().split('.')[2:]:
+        cls_name += token.title()
+    cls_name += 'Backend'
+
+    try:
+        with profiler.measure('backend.' + name, 'init'):
+            return getattr(module, cls_name)(bus=bus, **cfg, **kwargs)
+    except AttributeError as e:
+        logger.warning('No such class in {}: {}'.format(
+            module.__name__, cls_name))
+        raise RuntimeError(e)
+
+
+def register_backends(bus=None, global_scope=False, parallel=False, max_workers=None, **kwargs):
     """ Initialize the backend objects based on the configuration and returns
         a name -> backend_instance map.
     Params:
         bus -- If specific (it usually should), the messages processed by the
             backends will be posted on this bus.
 
+        parallel -- If True, the backends will be imported and initialized
+            concurrently (default: False)
+
+        max_workers -- Maximum number of backends initialized concurrently
+            if parallel is set (default: number of backends)
+
         kwargs -- Any additional key-value parameters required to initialize the backends
         """
 
@@ -40,25 +83,29 @@ def register_backends(bus=None, global_scope=False, **kwargs):
     else:
         backends = {}
 
-    for (name, cfg) in Config.get_backends().items():
-        module = importlib.import_module('platypush.backend.' + name)
+    backends_conf = Config.get_backends()
 
-        # e.g. backend.pushbullet main class: PushbulletBackend
-        cls_name = ''
-        for token in module.__name__.title().split('.')[2:]:
-            cls_name += token.title()
-        cls_name += 'Backend'
+    if parallel and len(backends_conf) > 1:
+        from concurrent.futures import ThreadPoolExecutor
 
-        try:
-            b = getattr(module, cls_name)(bus=bus, **cfg, **kwargs)
-            backends[name] = b
-        except AttributeError as e:
-            logger.warning('No such class in {}: {}'.format(
-                module.__name__, cls_name))
-            raise RuntimeError(e)
+        with ThreadPoolExecutor(max_workers=max_workers or len(backends_conf),
+                                thread_name_prefix='BackendInit') as pool:
+            futures = {
+                name: pool.submit(_build_backend, name, cfg, bus=bus, **kwargs)
+                for (name, cfg) in backends_conf.items()
+            }
+
+        # Backends are registered in configuration order, and the first
+        # initialization error is raised as in sequential mode
+        for name, future in futures.items():
+            backends[name] = future.result()
+    else:
+        for (name, cfg) in backends_conf.items():
+            backends[name] = _build_backend(name, cfg, bus=bus, **kwargs)
 
     return backends
 
+
 def get_backend(name):
     """ Returns the backend instance identified by name if it exists """
 
@@ -79,7 +126,8 @@ def get_plugin(plugin_name, reload=False):
         return plugins[plugin_name]
 
     try:
-        plugin = importlib.import_module('platypush.plugins.' + plugin_name)
+        with profiler.measure('plugin.' + plugin_name, 'import'):
+            plugin = importlib.import_module('platypush.plugins.' + plugin_name)
     except ImportError as e:
         logger.warning('No such plugin: {}'.format(plugin_name))
         raise RuntimeError(e)
@@ -112,7 +160,8 @@ def get_plugin(plugin_name, reload=False):
     with plugins_init_locks[plugin_name]:
         if plugins.get(plugin_name) and not reload:
             return plugins[plugin_name]
-        plugins[plugin_name] = plugin_class(**plugin_conf)
+        with profiler.measure('plugin.' + plugin_name, 'init'):
+            plugins[plugin_name] = plugin_class(**plugin_conf)
 
     return plugins[plugin_name]
 
@@ -122,6 +171,87 @@ def get_bus():
     return main_bus
 
 
+def get_executor():
+    """ Returns the executor that runs the requests, the event hooks and the
+        event handlers, configured through the ``executor`` section of the
+        configuration (see :class:`platypush.context.executor.Executor`) """
+    global main_executor
+
+    if main_executor is None:
+        with main_executor_lock:
+            if main_executor is None:
+                from .executor import Executor
+                from .metrics import metrics
+                main_executor = Executor(**(Config.get('executor') or {}))
+                metrics.register_collector(main_executor.collect_metrics)
+
+    return main_executor
+
+
+def get_cron_scheduler():
+    """ Returns the cron scheduler, started upon the first call with the
+        cronjobs defined in the configuration and the ones created at runtime
+        and stored on the local database """
+    global main_cron_scheduler
+
+    if main_cron_scheduler is None:
+        with main_cron_scheduler_lock:
+            if main_cron_scheduler is None:
+                from platypush.cron.scheduler import CronScheduler
+
+                try:
+                    from platypush.cron.db import CronjobStore
+                    store = CronjobStore()
+                except Exception as e:
+                    logger.warning('Could not initialize the cronjobs store, the cronjobs created ' +
+                                   'at runtime will not be persisted: {}'.format(str(e)))
+                    store = None
+
+                main_cron_scheduler = CronScheduler(jobs=Config.get_cronjobs(), store=store)
+                main_cron_scheduler.start()
+
+    return main_cron_scheduler
+
+
+def get_redis(*args, **kwargs):
+    """ Returns the process-wide Redis client for the given connection
+        arguments (the ``redis_args`` of the Redis backend by default),
+        backed by a shared connection pool configured through the
+        ``redis_pool`` section of the configuration (see
+        :class:`platypush.context.redis_pool.RedisPoolManager`) """
+    global main_redis_pool
+
+    if main_redis_pool is None:
+        with main_redis_pool_lock:
+            if main_redis_pool is None:
+                from .metrics import metrics
+                from .redis_pool import RedisPoolManager
+                main_redis_pool = RedisPoolManager(**(Config.get('redis_pool') or {}))
+                metrics.register_collector(main_redis_pool.collect_metrics)
+
+    if not args and not kwargs:
+        kwargs = (Config.get('backend.redis') or {}).get('redis_args', {})
+
+    return main_redis_pool.get_redis(*args, **kwargs)
+
+
+def get_response_cache():
+    """ Returns the cache of the responses of the plugin actions, configured
+        through the ``cache`` section of the configuration (see
+        :class:`platypush.utils.cache.ResponseCache`) """
+    global main_response_cache
+
+    if main_response_cache is None:
+        with main_response_cache_lock:
+            if main_response_cache is None:
+                from platypush.utils.cache import ResponseCache
+                from .metrics import metrics
+                main_response_cache = ResponseCache(max_size=(Config.get('cache') or {}).get('max_size', 1024))
+                metrics.register_collector(main_response_cache.collect_metrics)
+
+    return main_response_cache
+
+
 def get_or_create_event_loop():
     try:
         loop = asyncio.get_event_loop()
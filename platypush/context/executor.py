@@ -0,0 +1,427 @@
+import logging
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from platypush.context.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Task(object):
+    __slots__ = ('fn', 'args', 'kwargs', 'key', 'deadline', 'future', 'has_slot')
+
+    def __init__(self, fn, args, kwargs, key=None, deadline=None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.deadline = deadline
+        self.future = Future()
+        # Set when a concurrency slot has already been reserved for the task
+        self.has_slot = False
+
+
+class Executor(object):
+    """
+    Bounded thread pool used to run the requests, the event hooks and the
+    event handlers, instead of starting a new thread for each of them.
+
+    - At most ``pool_size`` worker threads are started (lazily, as the load
+      requires them).
+    - At most ``queue_size`` tasks can wait for a worker. Submitting a task on
+      a full queue blocks the caller, unless the caller is itself a worker of
+      the pool, in which case the task is run in the caller's thread.
+    - The number of tasks running concurrently for a key (usually the name of
+      a plugin) can be limited through ``concurrency``. Tasks over the limit
+      are parked and dispatched as soon as a slot for their key is released,
+      without occupying a worker in the meantime.
+    - Tasks that are still waiting on the queue after their deadline
+      (``timeout`` seconds after being submitted) are discarded, and their
+      futures fail with :class:`TimeoutError`.
+
+    Example configuration::
+
+        executor:
+            pool_size: 16
+            queue_size: 1000
+            # Default deadline of the queued tasks, in seconds
+            timeout: 60
+            # Maximum number of concurrent calls per plugin
+            concurrency:
+                music.mpd: 1
+                serial: 1
+                http.request: 32
+
+    """
+
+    _default_pool_size = 16
+    _default_queue_size = 1000
+
+    def __init__(self, pool_size=_default_pool_size, queue_size=_default_queue_size,
+                 timeout=None, concurrency=None):
+        """
+        :param pool_size: Maximum number of worker threads (default: 16)
+        :type pool_size: int
+
+        :param queue_size: Maximum number of tasks waiting for a worker (default: 1000)
+        :type queue_size: int
+
+        :param timeout: Default deadline of the submitted tasks, in seconds (default: None, no deadline)
+        :type timeout: float
+
+        :param concurrency: Maximum number of tasks that can run concurrently for each key, as a
+            ``key -> limit`` map (default: no limits)
+        :type concurrency: dict
+        """
+
+        assert pool_size > 0, 'pool_size must be a positive number'
+        assert queue_size > 0, 'queue_size must be a positive number'
+
+        self.pool_size = int(pool_size)
+        self.queue_size = int(queue_size)
+        self.timeout = timeout
+        self.concurrency = {key: int(limit) for key, limit in (concurrency or {}).items()}
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._slot_released = threading.Condition(self._lock)
+        self._workers = set()
+        self._idle_workers = 0
+        self._should_stop = False
+        self._local = threading.local()
+
+        # key -> number of running tasks
+        self._running = {}
+        # key -> tasks waiting for a free slot
+        self._parked = {}
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.max_queue_depth = 0
+
+    def _get_limit(self, key):
+        return self.concurrency.get(key) if key is not None else None
+
+    def _is_worker(self):
+        return getattr(self._local, 'is_worker', False)
+
+    def _held_keys(self):
+        keys = getattr(self._local, 'keys', None)
+        if keys is None:
+            keys = self._local.keys = set()
+        return keys
+
+    def submit(self, fn, *args, key=None, timeout=None, **kwargs):
+        """
+        Submits a function to the pool.
+
+        :param fn: Function to run
+        :param args: Positional arguments of the function
+        :param key: Concurrency key of the task, e.g. the plugin name (default: None)
+        :param timeout: Deadline of the task, in seconds, if it's not started in time (default: the
+            ``timeout`` configured on the executor)
+        :param kwargs: Keyword arguments of the function
+        :returns: A :class:`concurrent.futures.Future` with the result of the function.
+        """
+
+        timeout = timeout if timeout is not None else self.timeout
+        task = _Task(fn, args, kwargs, key=key,
+                     deadline=time.time() + timeout if timeout else None)
+
+        with self._lock:
+            assert not self._should_stop, 'The executor has been stopped'
+            self.submitted += 1
+
+            while len(self._queue) >= self.queue_size:
+                if self._is_worker():
+                    # Run the task in the current worker rather than waiting
+                    # for a worker, or the pool may deadlock
+                    break
+                self._not_full.wait()
+            else:
+                self._queue.append(task)
+                self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+                # The idle workers notified by the previous submissions may
+                # not have picked their tasks yet, count them as taken
+                if len(self._queue) > self._idle_workers and len(self._workers) < self.pool_size:
+                    self._start_worker()
+                self._not_empty.notify()
+                return task.future
+
+        self._run_task(task, acquire=True)
+        return task.future
+
+    def _start_worker(self):
+        worker = threading.Thread(target=self._worker, daemon=True,
+                                  name='Executor-{}'.format(len(self._workers)))
+        self._workers.add(worker)
+        worker.start()
+
+    def _acquire_slot(self, key):
+        """ Tries to reserve a slot for a key. Must be called with the lock held """
+        limit = self._get_limit(key)
+        if limit is None:
+            return True
+
+        running = self._running.get(key, 0)
+        if running >= limit:
+            return False
+
+        self._running[key] = running + 1
+        return True
+
+    def _release_slot(self, key):
+        """
+        Releases a slot for a key. Must be called with the lock held.
+        Returns the next parked task for the key, if any, which will take the
+        released slot.
+        """
+
+        if self._get_limit(key) is None:
+            return
+
+        parked = self._parked.get(key)
+        if parked:
+            task = parked.popleft()
+            if not parked:
+                del self._parked[key]
+            return task
+
+        self._running[key] -= 1
+        self._slot_released.notify_all()
+
+    def _pop(self, expired):
+        """
+        Pops the next task that can run from the queue. Must be called with
+        the lock held. The expired tasks are appended to ``expired``.
+        """
+
+        while self._queue:
+            task = self._queue.popleft()
+            self._not_full.notify()
+
+            if task.deadline and time.time() > task.deadline:
+                self._expire(task, expired)
+                continue
+
+            if task.has_slot or self._acquire_slot(task.key):
+                return task
+
+            # No free slots for the key: park the task until one
+            # of the running tasks for the same key is done
+            self._parked.setdefault(task.key, deque()).append(task)
+
+    def _get(self):
+        while True:
+            expired = []
+            with self._lock:
+                while True:
+                    task = self._pop(expired)
+                    if task or expired or self._should_stop:
+                        break
+
+                    self._idle_workers += 1
+                    self._not_empty.wait()
+                    self._idle_workers -= 1
+
+            self._fail_expired(expired)
+            if task or self._should_stop:
+                return task
+
+    def _expire(self, task, expired):
+        """ Marks a task as expired. Must be called with the lock held """
+        self.expired += 1
+        expired.append(task)
+
+    @staticmethod
+    def _fail_expired(expired):
+        """
+        Fails the futures of the expired tasks. It must be called without
+        holding the lock, as it runs the done callbacks of the futures.
+        """
+
+        for task in expired:
+            metrics.inc('platypush_executor_tasks_expired_total')
+            task.future.set_exception(TimeoutError('Task expired before being executed: {}'.format(task.fn)))
+
+    def _run_task(self, task, acquire=False):
+        if not task.future.set_running_or_notify_cancel():
+            return
+
+        held_keys = self._held_keys()
+        reentrant = task.key in held_keys
+
+        if acquire and not reentrant:
+            self._wait_slot(task.key)
+
+        if task.key is not None:
+            held_keys.add(task.key)
+
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+        except BaseException as e:
+            with self._lock:
+                self.failed += 1
+            task.future.set_exception(e)
+        else:
+            with self._lock:
+                self.completed += 1
+            task.future.set_result(result)
+        finally:
+            if not reentrant:
+                held_keys.discard(task.key)
+                if acquire:
+                    self._release(task.key)
+
+    def _wait_slot(self, key):
+        with self._lock:
+            while not self._acquire_slot(key):
+                self._slot_released.wait()
+
+    def _release(self, key):
+        """ Releases a slot and hands it over to the next parked task """
+        expired = []
+        with self._lock:
+            task = self._release_slot(key)
+
+        while task:
+            if task.deadline and time.time() > task.deadline:
+                with self._lock:
+                    self._expire(task, expired)
+                    task = self._release_slot(key)
+                continue
+
+            with self._lock:
+                # The released slot is handed over to the parked task
+                task.has_slot = True
+                task.deadline = None
+                self._queue.appendleft(task)
+                self._not_empty.notify()
+            break
+
+        self._fail_expired(expired)
+
+    def _worker(self):
+        self._local.is_worker = True
+        name = threading.current_thread().name
+
+        while True:
+            task = self._get()
+            if task is None:
+                break
+
+            try:
+                self._run_task(task)
+            except Exception as e:
+                logger.exception(e)
+            finally:
+                threading.current_thread().name = name
+                if task.key is not None and self._get_limit(task.key) is not None:
+                    self._release(task.key)
+
+        with self._lock:
+            self._workers.discard(threading.current_thread())
+
+    @contextmanager
+    def limit(self, key):
+        """
+        Context manager that runs a block of code in the current thread within
+        the concurrency limit of a key, waiting for a free slot if needed::
+
+            with executor.limit('serial'):
+                plugin.run(...)
+
+        It's a no-op if the current thread is already running a task for the
+        same key.
+        """
+
+        held_keys = self._held_keys()
+        if key is None or key in held_keys or self._get_limit(key) is None:
+            yield
+            return
+
+        self._wait_slot(key)
+        held_keys.add(key)
+
+        try:
+            yield
+        finally:
+            held_keys.discard(key)
+            self._release(key)
+
+    def stop(self, wait=False):
+        """
+        Stops the workers once the tasks already queued have been processed.
+
+        :param wait: If True then wait for the workers to terminate (default: False)
+        """
+
+        with self._lock:
+            self._should_stop = True
+            workers = list(self._workers)
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+        if wait:
+            for worker in workers:
+                if worker is not threading.current_thread():
+                    worker.join()
+
+    def collect_metrics(self):
+        """ Returns the gauges of the executor, see :meth:`platypush.context.metrics.MetricsRegistry.register_collector` """
+        stats = self.get_stats()
+        return [
+            ('platypush_executor_workers', {}, stats['workers']),
+            ('platypush_executor_idle_workers', {}, stats['idle_workers']),
+            ('platypush_executor_queue_depth', {}, stats['queue_depth']),
+            *[('platypush_executor_running_tasks', {'key': key}, n) for key, n in stats['running'].items()],
+            *[('platypush_executor_parked_tasks', {'key': key}, n) for key, n in stats['parked'].items()],
+        ]
+
+    def get_stats(self):
+        """
+        :returns: The current status of the executor, in the format::
+
+            {
+                "pool_size": 16,
+                "workers": 4,
+                "idle_workers": 1,
+                "queue_size": 1000,
+                "queue_depth": 0,
+                "max_queue_depth": 12,
+                "running": {"music.mpd": 1},
+                "parked": {"music.mpd": 2},
+                "submitted": 1024,
+                "completed": 1018,
+                "failed": 1,
+                "expired": 0
+            }
+
+        """
+
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'workers': len(self._workers),
+                'idle_workers': self._idle_workers,
+                'queue_size': self.queue_size,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self.max_queue_depth,
+                'running': {key: n for key, n in self._running.items() if n},
+                'parked': {key: len(tasks) for key, tasks in self._parked.items()},
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'expired': self.expired,
+            }
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,257 @@
+import bisect
+import threading
+import time
+
+from contextlib import contextmanager
+
+# Upper bounds (in seconds) of the buckets of the latency histograms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_descriptions = {
+    'platypush_bus_wait_seconds': 'Time spent by the messages on the bus before being picked up',
+    'platypush_bus_messages_expired_total': 'Messages discarded because they expired on the bus',
+    'platypush_bus_messages_dropped_total': 'Messages dropped by the backpressure policy of the bus worker pool',
+    'platypush_bus_serialization_seconds': 'Time spent encoding the messages posted on the bus',
+    'platypush_bus_deserialization_seconds': 'Time spent decoding the messages read from the bus',
+    'platypush_backend_messages_total': 'Messages received by the backends',
+    'platypush_backend_deserialization_seconds': 'Time spent parsing the messages received by the backends',
+    'platypush_request_queue_seconds': 'Time spent by the requests waiting for an executor worker',
+    'platypush_action_duration_seconds': 'Execution time of the plugin actions',
+    'platypush_action_errors_total': 'Plugin actions that returned errors',
+    'platypush_response_send_seconds': 'Time spent serializing and delivering the responses',
+    'platypush_executor_tasks_expired_total': 'Executor tasks discarded because their deadline expired',
+    'platypush_cron_job_duration_seconds': 'Execution time of the cronjobs',
+    'platypush_cron_missed_runs_total': 'Cronjob runs missed because the scheduler was late or the job was still running',
+}
+
+
+class Histogram(object):
+    """ Histogram of observed values over fixed buckets """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def to_dict(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+            count = self.count
+
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            cumulative += n
+            buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+
+        return {
+            'buckets': buckets,
+            'sum': total,
+            'count': count,
+            'avg': total / count if count else 0.0,
+        }
+
+
+class Counter(object):
+    """ Monotonic counter """
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, value=1):
+        with self._lock:
+            self.value += value
+
+
+class MetricsRegistry(object):
+    """
+    Process-wide registry of the latency histograms and counters recorded on
+    the hot paths (bus, backends, requests and plugin actions).
+
+    Each metric is identified by its name and by a set of labels, e.g.
+    ``platypush_action_duration_seconds{action="light.hue.on"}``. Recording a
+    value only involves a dict lookup and a short critical section, so the
+    instrumentation can be left on in production.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    @staticmethod
+    def _sort_key(item):
+        (name, labels), _ = item
+        return name, str(labels)
+
+    def _get(self, metrics, key, factory):
+        metric = metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = metrics.get(key)
+                if metric is None:
+                    metric = metrics[key] = factory()
+        return metric
+
+    def observe(self, name, value, **labels):
+        """ Records a value on a histogram """
+        self._get(self._histograms, self._key(name, labels), Histogram).observe(value)
+
+    def inc(self, name, value=1, **labels):
+        """ Increments a counter """
+        self._get(self._counters, self._key(name, labels), Counter).inc(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Context manager that records the time spent in a block of code on a histogram::
+
+            with metrics.timer('platypush_action_duration_seconds', action='light.hue.on'):
+                ...
+
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_collector(self, collector):
+        """
+        Registers a function that returns the current value of some gauges
+        (e.g. queue depths) as a list of ``(name, labels, value)`` tuples. It
+        is invoked whenever the metrics are exported.
+        """
+
+        with self._lock:
+            self._collectors.append(collector)
+
+    def unregister_collector(self, collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def _collect_gauges(self):
+        gauges = []
+        for collector in list(self._collectors):
+            gauges.extend(collector())
+        return gauges
+
+    def get_stats(self):
+        """
+        :returns: The recorded metrics, in the format::
+
+            {
+                "histograms": [
+                    {
+                        "name": "platypush_action_duration_seconds",
+                        "labels": {"action": "light.hue.on"},
+                        "buckets": {"0.0005": 0, "0.001": 2, ..., "+Inf": 10},
+                        "sum": 1.2,
+                        "count": 10,
+                        "avg": 0.12
+                    }
+                ],
+                "counters": [
+                    {
+                        "name": "platypush_bus_messages_expired_total",
+                        "labels": {"type": "event"},
+                        "value": 3
+                    }
+                ],
+                "gauges": [
+                    {
+                        "name": "platypush_executor_queue_depth",
+                        "labels": {},
+                        "value": 0
+                    }
+                ]
+            }
+
+        """
+
+        return {
+            'histograms': [
+                {'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in sorted(list(self._histograms.items()), key=self._sort_key)
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': counter.value}
+                for (name, labels), counter in sorted(list(self._counters.items()), key=self._sort_key)
+            ],
+            'gauges': [
+                {'name': name, 'labels': labels, 'value': value}
+                for name, labels, value in self._collect_gauges()
+            ],
+        }
+
+    @staticmethod
+    def _format_labels(labels, **extra):
+        labels = dict(labels, **extra)
+        if not labels:
+            return ''
+
+        return '{' + ','.join(
+            '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in labels.items()
+        ) + '}'
+
+    @staticmethod
+    def _format_header(lines, name, metric_type):
+        lines.append('# HELP {} {}'.format(name, _descriptions.get(name, name)))
+        lines.append('# TYPE {} {}'.format(name, metric_type))
+
+    def to_prometheus(self):
+        """
+        :returns: The recorded metrics in the Prometheus text exposition format.
+        """
+
+        stats = self.get_stats()
+        lines = []
+        last_name = None
+
+        for histogram in stats['histograms']:
+            name, labels = histogram['name'], histogram['labels']
+            if name != last_name:
+                self._format_header(lines, name, 'histogram')
+                last_name = name
+
+            for bound, count in histogram['buckets'].items():
+                lines.append('{}_bucket{} {}'.format(name, self._format_labels(labels, le=bound), count))
+            lines.append('{}_sum{} {}'.format(name, self._format_labels(labels), histogram['sum']))
+            lines.append('{}_count{} {}'.format(name, self._format_labels(labels), histogram['count']))
+
+        for metric_type in ('counters', 'gauges'):
+            for metric in sorted(stats[metric_type], key=lambda m: m['name']):
+                name = metric['name']
+                if name != last_name:
+                    self._format_header(lines, name, 'counter' if metric_type == 'counters' else 'gauge')
+                    last_name = name
+
+                lines.append('{}{} {}'.format(name, self._format_labels(metric['labels']), metric['value']))
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,123 @@
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RedisPoolManager(object):
+    """
+    Process-wide registry of Redis clients, one per set of connection
+    arguments. Each client has its own connection pool and it's thread-safe,
+    so the bus, the backends, the plugins and the web server handlers can all
+    share the same clients instead of opening new connections on each call.
+
+    The connections that have been idle for more than ``health_check_interval``
+    seconds are checked with a ``PING`` before being used, so the connections
+    dropped by the server are transparently replaced.
+    """
+
+    def __init__(self, health_check_interval=30, max_connections=None):
+        """
+        :param health_check_interval: Interval in seconds after which an idle connection is checked before
+            being used (default: 30, 0 to disable the checks)
+        :param max_connections: Maximum number of connections per pool (default: unlimited)
+        """
+
+        self.health_check_interval = health_check_interval
+        self.max_connections = max_connections
+        # connection arguments key -> Redis client
+        self._clients = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _get_key(args, kwargs):
+        return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    def get_redis(self, *args, **kwargs):
+        """
+        :returns: The shared Redis client for the given connection arguments,
+            which are the same accepted by the ``redis.Redis`` constructor.
+        """
+
+        key = self._get_key(args, kwargs)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                from redis import Redis
+
+                kwargs = dict(kwargs)
+                if self.health_check_interval:
+                    kwargs.setdefault('health_check_interval', self.health_check_interval)
+                if self.max_connections:
+                    kwargs.setdefault('max_connections', self.max_connections)
+
+                client = self._clients[key] = Redis(*args, **kwargs)
+                logger.debug('Initialized Redis connection pool {}'.format(client.connection_pool))
+
+        return client
+
+    def close(self):
+        """ Disconnects all the pooled connections """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+
+        for client in clients:
+            client.connection_pool.disconnect()
+
+    def collect_metrics(self):
+        """ Returns the gauges of the pools, see :meth:`platypush.context.metrics.MetricsRegistry.register_collector` """
+        gauges = []
+        for pool in self.get_stats():
+            labels = {'pool': pool['pool']}
+            gauges.extend([
+                ('platypush_redis_pool_connections', labels, pool['connections']),
+                ('platypush_redis_pool_in_use_connections', labels, pool['in_use']),
+                ('platypush_redis_pool_idle_connections', labels, pool['idle']),
+            ])
+
+        return gauges
+
+    def get_stats(self):
+        """
+        :returns: The status of the connection pools, in the format::
+
+            [
+                {
+                    "pool": "localhost:6379/0",
+                    "connections": 4,
+                    "in_use": 1,
+                    "idle": 3,
+                    "max_connections": 100
+                }
+            ]
+
+        """
+
+        with self._lock:
+            clients = list(self._clients.values())
+
+        stats = []
+        for client in clients:
+            pool = client.connection_pool
+            conn_args = pool.connection_kwargs
+            name = conn_args.get('path') or '{}:{}'.format(conn_args.get('host', 'localhost'),
+                                                            conn_args.get('port', 6379))
+
+            stats.append({
+                'pool': '{}/{}'.format(name, conn_args.get('db', 0)),
+                'connections': getattr(pool, '_created_connections', 0),
+                'in_use': len(getattr(pool, '_in_use_connections', ())),
+                'idle': len(getattr(pool, '_available_connections', ())),
+                'max_connections': pool.max_connections,
+            })
+
+        return stats
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,107 @@
+import datetime
+import json
+
+from sqlalchemy import create_engine, Boolean, Column, DateTime, Float, String, Text
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.ext.declarative import declarative_base
+
+from platypush.config import Config
+
+Base = declarative_base()
+
+
+class CronjobStore:
+    """
+    Stores the cronjobs created at runtime through the :mod:`platypush.plugins.cron`
+    plugin on the local database (``main.db`` configuration section), so they
+    are scheduled again when the application restarts.
+    """
+
+    def __init__(self, engine=None):
+        """
+        :param engine: SQLAlchemy engine or engine string (default: the ``main.db`` engine)
+        """
+
+        if engine is None:
+            db = Config.get('db')
+            engine = create_engine(db['engine'], *db.get('args', []), **db.get('kwargs', {}))
+        elif isinstance(engine, str):
+            engine = create_engine(engine)
+
+        self._engine = engine
+        Base.metadata.create_all(self._engine)
+        self._session = scoped_session(sessionmaker(bind=self._engine))
+
+    def get_jobs(self):
+        """
+        :returns: The stored jobs, as a ``name -> configuration`` map.
+        """
+
+        session = self._session()
+        try:
+            return {
+                record.name: {
+                    'cron_expression': record.cron_expression,
+                    'actions': json.loads(record.actions),
+                    'missed_runs': record.missed_runs,
+                    'jitter': record.jitter or 0,
+                    'until': record.until,
+                    'paused': bool(record.paused),
+                }
+                for record in session.query(CronjobRecord)
+            }
+        finally:
+            self._session.remove()
+
+    def save_job(self, name, config, paused=False):
+        session = self._session()
+        try:
+            record = session.query(CronjobRecord).filter_by(name=name).first() or CronjobRecord(
+                name=name, created_at=datetime.datetime.utcnow())
+
+            record.cron_expression = config['cron_expression']
+            record.actions = json.dumps(config['actions'])
+            record.missed_runs = config.get('missed_runs')
+            record.jitter = config.get('jitter')
+            record.until = config.get('until')
+            record.paused = paused
+            session.add(record)
+            session.commit()
+        finally:
+            self._session.remove()
+
+    def set_paused(self, name, paused):
+        session = self._session()
+        try:
+            record = session.query(CronjobRecord).filter_by(name=name).first()
+            if record:
+                record.paused = paused
+                session.commit()
+        finally:
+            self._session.remove()
+
+    def remove_job(self, name):
+        session = self._session()
+        try:
+            session.query(CronjobRecord).filter_by(name=name).delete()
+            session.commit()
+        finally:
+            self._session.remove()
+
+
+class CronjobRecord(Base):
+    """ Models the cronjob table """
+
+    __tablename__ = 'cronjob'
+
+    name = Column(String, primary_key=True)
+    cron_expression = Column(String, nullable=False)
+    actions = Column(Text, nullable=False)
+    missed_runs = Column(String)
+    jitter = Column(Float)
+    until = Column(Float)
+    paused = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+
+
+# vim:sw=4:ts=4:et:
@@ -1,11 +1,16 @@
 import enum
+import heapq
 import logging
+import random
+import threading
 import time
 
 import croniter
 
 from threading import Thread
 
+from platypush.context import get_executor
+from platypush.context.metrics import metrics
 from platypush.procedure import Procedure
 
 logger = logging.getLogger(__name__)
@@ -19,19 +24,116 @@ class CronjobState(enum.IntEnum):
     ERROR = 4
 
 
-class Cronjob(Thread):
-    def __init__(self, name, cron_expression, actions):
-        super().__init__()
-        self.cron_expression = cron_expression
+class MissedRunsPolicy(enum.Enum):
+    # Discard the runs missed while the scheduler was late (e.g. after a
+    # system suspend) and wait for the next scheduled time
+    SKIP = 'skip'
+    # Run the job once as soon as possible if any run has been missed
+    CATCH_UP = 'catch_up'
+
+
+class Cronjob(object):
+    """
+    A job scheduled through a cron expression. The job doesn't have a thread
+    of its own: the :class:`CronScheduler` keeps track of its next run and
+    dispatches it to the executor when it's due.
+    """
+
+    # Maximum number of missed runs to be counted before skipping to the current time
+    _max_missed_runs = 10000
+
+    def __init__(self, name, cron_expression, actions, missed_runs=MissedRunsPolicy.SKIP.value, jitter=0,
+                 until=None, start_time=None):
+        """
+        :param name: Name of the job
+        :param cron_expression: Cron expression, e.g. ``*/5 * * * *``
+        :param actions: Actions to be executed
+        :param missed_runs: What to do with the runs missed because the scheduler was late, either ``skip``
+            (default) or ``catch_up``
+        :param jitter: If set, each run is delayed by a random number of seconds between 0 and ``jitter``,
+            so jobs scheduled at the same time don't all run at once. It should be shorter than the
+            interval between two runs (default: 0)
+        :param until: If set, the job won't be run after this timestamp (default: None)
+        :param start_time: Timestamp the schedule is computed from (default: now)
+        """
+
         self.name = name
+        self.cron_expression = cron_expression
         self.state = CronjobState.IDLE
         self.actions = Procedure.build(name=name + '__Cron', _async=False,
                                        requests=actions)
+        self.missed_runs = MissedRunsPolicy(missed_runs or MissedRunsPolicy.SKIP.value)
+        self.jitter = jitter or 0
+        self.until = until
+        self.paused = False
+        # Set for the jobs created at runtime and stored on the local db
+        self.persistent = False
+
+        self._cron = croniter.croniter(cron_expression, start_time or time.time())
+        # Scheduled time of the next run, and time it will actually fire at (including the jitter)
+        self.next_slot = None
+        self.next_run = None
+
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.last_run = None
+        self.last_duration = None
+        self.max_duration = None
+        self.total_duration = 0.0
+
+    def reset(self, now=None):
+        """ Restarts the schedule from the current time, e.g. when the job is resumed """
+        self._cron = croniter.croniter(self.cron_expression, now or time.time())
+
+    def schedule_next(self, now=None):
+        """
+        Computes the next run of the job, applying the missed runs policy if
+        the next scheduled time is already in the past.
+
+        :returns: The timestamp of the next run, or None if the job has expired.
+        """
+
+        now = now or time.time()
+        slot = self._cron.get_next(float)
+
+        # Runs scheduled within the jitter interval are not considered missed
+        if slot < now - self.jitter:
+            missed = 0
+            while slot < now and missed < self._max_missed_runs:
+                missed += 1
+                slot = self._cron.get_next(float)
+
+            if slot < now:
+                self._cron = croniter.croniter(self.cron_expression, now)
+                slot = self._cron.get_next(float)
+
+            self.missed += missed
+            metrics.inc('platypush_cron_missed_runs_total', missed, job=self.name)
+
+            if self.missed_runs == MissedRunsPolicy.CATCH_UP:
+                logger.info('Cronjob {} missed {} runs, running it now'.format(self.name, missed))
+                # Run now, and resume the regular schedule afterwards
+                self._cron.get_prev(float)
+                slot = now
+            else:
+                logger.info('Cronjob {} missed {} runs, next run: {}'.format(
+                    self.name, missed, time.ctime(slot)))
+
+        self.next_slot = slot
+        self.next_run = slot + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if self.until and self.next_run > self.until:
+            self.next_run = None
+            return None
+
+        if self.state != CronjobState.RUNNING:
+            self.state = CronjobState.WAIT
+        return self.next_run
 
     def run(self):
-        self.state = CronjobState.WAIT
-        self.wait()
         self.state = CronjobState.RUNNING
+        self.last_run = time.time()
+        start = time.perf_counter()
 
         try:
             logger.info('Running cronjob {}'.format(self.name))
@@ -41,49 +143,381 @@ class Cronjob(Thread):
             self.state = CronjobState.DONE
         except Exception as e:
             logger.exception(e)
+            self.errors += 1
             self.state = CronjobState.ERROR
+        finally:
+            duration = time.perf_counter() - start
+            self.runs += 1
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration or 0.0, duration)
+            self.total_duration += duration
+            metrics.observe('platypush_cron_job_duration_seconds', duration, job=self.name)
 
-    def wait(self):
-        now = int(time.time())
-        cron = croniter.croniter(self.cron_expression, now)
-        next_run = int(cron.get_next())
-        time.sleep(next_run - now)
-
-    def should_run(self):
-        now = int(time.time())
-        cron = croniter.croniter(self.cron_expression, now)
-        next_run = int(cron.get_next())
-        return now == next_run
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'cron_expression': self.cron_expression,
+            'state': self.state.name.lower(),
+            'missed_runs': self.missed_runs.value,
+            'jitter': self.jitter,
+            'until': self.until,
+            'paused': self.paused,
+            'persistent': self.persistent,
+            'next_run': self.next_run if not self.paused else None,
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'last_run': self.last_run,
+            'last_duration': self.last_duration,
+            'max_duration': self.max_duration,
+            'avg_duration': self.total_duration / self.runs if self.runs else None,
+        }
 
 
 class CronScheduler(Thread):
-    def __init__(self, jobs):
-        super().__init__()
-        self.jobs_config = jobs
+    """
+    Cron scheduler. The next runs of all the jobs are kept in a heap, and a
+    single thread sleeps until the earliest one is due, then dispatches the
+    job to the executor (see :func:`platypush.context.get_executor`) and
+    schedules its next run. A job is never run concurrently with itself: a
+    run that is due while the previous one is still in progress is counted
+    as missed.
+
+    Besides ``cron_expression`` and ``actions``, the configuration of a job
+    can specify ``missed_runs`` (``skip`` or ``catch_up``), ``jitter`` (in
+    seconds) and ``until`` (timestamp), see :class:`Cronjob`.
+
+    Jobs can also be added at runtime (see :mod:`platypush.plugins.cron`).
+    The persistent ones are saved on the local database through a
+    :class:`platypush.cron.db.CronjobStore`, and they are scheduled again
+    when the scheduler starts.
+    """
+
+    def __init__(self, jobs, store=None):
+        """
+        :param jobs: ``name -> configuration`` map of the jobs defined in the configuration
+        :param store: Store of the persistent jobs (default: None, no persistence)
+        :type store: :class:`platypush.cron.db.CronjobStore`
+        """
+
+        super().__init__(name='CronScheduler')
+        self.store = store
+        self.jobs_config = {}
         self._jobs = {}
+        # (next_run, sequence number, job) entries. Entries whose job has
+        # been removed or rescheduled are discarded when popped.
+        self._heap = []
+        self._seq = 0
+        self._scheduled = {}
+        self._cond = threading.Condition(threading.RLock())
+        self._should_stop = False
+
+        self.update_jobs(jobs)
         logger.info('Cron scheduler initialized with {} jobs'.
                     format(len(self.jobs_config.keys())))
 
-    def _get_job(self, name, config):
+    def _push(self, job):
+        """ Adds the next run of a job to the heap. Must be called with the lock held """
+        self._seq += 1
+        self._scheduled[job.name] = self._seq
+        heapq.heappush(self._heap, (job.next_run, self._seq, job))
+        self._cond.notify()
+
+    def _schedule(self, job):
+        """
+        Schedules the next run of a job, or removes it if expired. Must be
+        called with the lock held.
+
+        :returns: False if the job has expired. The caller should then remove
+            it from the store through :meth:`._remove_stored` after releasing
+            the lock.
+        """
+
+        if job.schedule_next() is None:
+            logger.info('Cronjob {} expired'.format(job.name))
+            self._scheduled.pop(job.name, None)
+            if self._jobs.get(job.name) is job:
+                del self._jobs[job.name]
+            return False
+
+        self._push(job)
+        return True
+
+    def _remove_stored(self, job):
+        """ Removes a persistent job from the store. Must be called without holding the lock """
+        if job.persistent and self.store:
+            self.store.remove_job(job.name)
+
+    def add_job(self, name, config, persistent=False):
+        """
+        Adds a job to the scheduler, replacing any existing job with the same name.
+
+        :param name: Name of the job
+        :param config: Job configuration (``cron_expression``, ``actions`` and the
+            optional ``missed_runs``, ``jitter``, ``until`` and ``paused``)
+        :param persistent: If set, the job will be saved on the store (default: False)
+        :returns: The :class:`Cronjob`.
+        """
+
+        assert not (persistent and name in self.jobs_config), \
+            'A cronjob named {} is already defined in the configuration'.format(name)
+
+        # Build the job first, so an invalid configuration is never persisted
+        job = self._build_job(name, config, persistent=persistent)
+
+        if self.store:
+            if persistent:
+                self.store.save_job(name, config, paused=config.get('paused', False))
+            else:
+                # A stored job replaced by a non-persistent one shouldn't
+                # come back after a restart
+                existing_job = self._jobs.get(name)
+                if existing_job:
+                    self._remove_stored(existing_job)
+
+        return self._register_job(job)
+
+    @staticmethod
+    def _build_job(name, config, persistent=False):
+        job = Cronjob(name=name, cron_expression=config['cron_expression'],
+                      actions=config['actions'], missed_runs=config.get('missed_runs'),
+                      jitter=config.get('jitter', 0), until=config.get('until'))
+
+        job.persistent = persistent
+        job.paused = config.get('paused', False)
+        return job
+
+    def _register_job(self, job):
+        with self._cond:
+            self._jobs[job.name] = job
+            self._scheduled.pop(job.name, None)
+            expired = not job.paused and not self._schedule(job)
+
+        if expired:
+            self._remove_stored(job)
+
+        return job
+
+    def _add_job(self, name, config, persistent=False):
+        return self._register_job(self._build_job(name, config, persistent=persistent))
+
+    def remove_job(self, name):
+        """
+        Removes a job from the scheduler. A run already in progress won't be interrupted.
+
+        :returns: The removed :class:`Cronjob`, or None if no jobs with such name exist.
+        """
+
+        with self._cond:
+            self._scheduled.pop(name, None)
+            job = self._jobs.pop(name, None)
+
+        if job:
+            self._remove_stored(job)
+
+        return job
+
+    def _get_job(self, name):
         job = self._jobs.get(name)
-        if job and job.state not in [CronjobState.DONE, CronjobState.ERROR]:
-            return job
+        assert job, 'No such cronjob: {}'.format(name)
+        return job
+
+    def pause_job(self, name):
+        """ Pauses a job. Its runs will be skipped until it's resumed """
+        with self._cond:
+            job = self._get_job(name)
+            job.paused = True
+            self._scheduled.pop(name, None)
+
+        if job.persistent and self.store:
+            self.store.set_paused(name, True)
+
+        return job
+
+    def resume_job(self, name):
+        """ Resumes a paused job. Its schedule restarts from the current time """
+        expired = False
+        with self._cond:
+            job = self._get_job(name)
+            if job.paused:
+                job.paused = False
+                job.reset()
+                expired = not self._schedule(job)
+
+        if expired:
+            self._remove_stored(job)
+        elif job.persistent and self.store:
+            self.store.set_paused(name, False)
+
+        return job
+
+    def trigger_job(self, name):
+        """
+        Runs a job now, without affecting its schedule.
+
+        :returns: False if the job is already running, True otherwise.
+        """
+        with self._cond:
+            job = self._get_job(name)
+            if not self._claim(job):
+                return False
+
+        self._dispatch(job)
+        return True
+
+    def get_job(self, name):
+        return self._jobs.get(name)
+
+    def get_jobs(self):
+        with self._cond:
+            return dict(self._jobs)
+
+    def update_jobs(self, jobs, stale=None):
+        """
+        Replaces the configured jobs, e.g. upon configuration reload.
+
+        :param jobs: New ``name -> configuration`` map of the jobs
+        :param stale: Names of the jobs that have been changed or removed. Their pending runs will be cancelled.
+        """
+
+        with self._cond:
+            # The configured jobs are never persistent: they are only
+            # removed from the scheduler, not from the store
+            for name in set(stale or []) | (self.jobs_config.keys() - jobs.keys()):
+                self._scheduled.pop(name, None)
+                self._jobs.pop(name, None)
+
+            for (name, config) in jobs.items():
+                job = self._jobs.get(name)
+                if not job or job.persistent:
+                    # The configuration takes precedence over the stored jobs
+                    if job:
+                        logger.warning('The stored cronjob {} is overridden by the configuration'.format(name))
+                    self._add_job(name, config)
+
+            self.jobs_config = jobs
+
+        logger.info('Cron scheduler updated with {} jobs'.format(len(jobs.keys())))
+
+    @staticmethod
+    def _claim(job):
+        """
+        Marks a job as running before it's dispatched, so the next run can't
+        be dispatched while this one is still waiting for a worker. Must be
+        called with the lock held.
+
+        :returns: False if the job is still running, True otherwise.
+        """
+
+        if job.state == CronjobState.RUNNING:
+            logger.warning('Cronjob {} is still running, skipping the scheduled run'.format(job.name))
+            job.missed += 1
+            metrics.inc('platypush_cron_missed_runs_total', job=job.name)
+            return False
 
-        self._jobs[name] = Cronjob(name=name, cron_expression=config['cron_expression'],
-                                   actions=config['actions'])
+        job.state = CronjobState.RUNNING
+        return True
 
-        return self._jobs[name]
+    @staticmethod
+    def _dispatch(job):
+        """
+        Submits a claimed job to the executor. It must be called without
+        holding the lock, as the submission blocks if the executor queue is
+        full.
+        """
+
+        def on_done(future):
+            # The job hasn't been run (e.g. the executor has been stopped)
+            if future.cancelled() or future.exception() is not None:
+                if job.state == CronjobState.RUNNING:
+                    job.state = CronjobState.ERROR
+
+        try:
+            # No deadline: a run waiting for a worker is never discarded
+            future = get_executor().submit(job.run, timeout=0)
+        except Exception as e:
+            job.state = CronjobState.ERROR
+            logger.warning('Could not run cronjob {}: {}'.format(job.name, str(e)))
+            logger.exception(e)
+            return
+
+        future.add_done_callback(on_done)
+
+    def _load_stored_jobs(self):
+        try:
+            jobs = self.store.get_jobs()
+        except Exception as e:
+            logger.warning('Could not load the stored cronjobs: {}'.format(str(e)))
+            return
+
+        for (name, config) in jobs.items():
+            if name in self.jobs_config:
+                logger.warning('The stored cronjob {} is overridden by the configuration'.format(name))
+                continue
+
+            try:
+                self._add_job(name, config, persistent=True)
+            except Exception as e:
+                logger.warning('Could not schedule the stored cronjob {}: {}'.format(name, str(e)))
+
+        logger.info('Loaded {} stored cronjobs'.format(len(jobs)))
 
     def run(self):
         logger.info('Running cron scheduler')
 
+        if self.store:
+            self._load_stored_jobs()
+
         while True:
-            for (job_name, job_config) in self.jobs_config.items():
-                job = self._get_job(name=job_name, config=job_config)
-                if job.state == CronjobState.IDLE:
-                    job.start()
+            with self._cond:
+                job = self._wait_next()
+                if not job:
+                    break
+
+                claimed = self._claim(job)
+                expired = self._jobs.get(job.name) is job and not job.paused \
+                    and not self._schedule(job)
+
+            if claimed:
+                self._dispatch(job)
+
+            if expired:
+                try:
+                    self._remove_stored(job)
+                except Exception as e:
+                    logger.warning('Could not remove the expired cronjob {}: {}'.format(job.name, str(e)))
+
+    def _wait_next(self):
+        """
+        Waits until the earliest job is due and pops it from the heap. Must be
+        called with the lock held.
+
+        :returns: The due job, or None if the scheduler has been stopped.
+        """
+
+        while not self._should_stop:
+            if not self._heap:
+                self._cond.wait()
+                continue
+
+            next_run, seq, job = self._heap[0]
+            if self._scheduled.get(job.name) != seq:
+                # The job has been removed or rescheduled
+                heapq.heappop(self._heap)
+                continue
+
+            delay = next_run - time.time()
+            if delay > 0:
+                self._cond.wait(delay)
+                continue
+
+            heapq.heappop(self._heap)
+            return job
 
-            time.sleep(0.5)
+    def stop(self):
+        with self._cond:
+            self._should_stop = True
+            self._cond.notify_all()
 
 
 # vim:sw=4:ts=4:et:
@@ -1,6 +1,5 @@
 import inspect
 import logging
-import threading
 
 
 class EventGenerator(object):
@@ -25,11 +24,8 @@ class EventGenerator(object):
         :type event: :class:`platypush.message.event.Event` or a subclass
         """
 
-        def hndl_thread():
-            hndl(event)
-
         from platypush.backend import Backend
-        from platypush.context import get_bus
+        from platypush.context import get_bus, get_executor
 
         bus = self.bus if isinstance(self, Backend) else get_bus()
         if not bus:
@@ -44,7 +40,7 @@ class EventGenerator(object):
                 handlers.update(self._event_handlers[cls])
 
         for hndl in handlers:
-            threading.Thread(target=hndl_thread).start()
+            get_executor().submit(hndl, event)
 
 
     def register_handler(self, event_type, callback):
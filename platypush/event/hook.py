@@ -1,11 +1,11 @@
 import copy
 import json
 import logging
-import threading
 from functools import wraps
 
 from platypush.config import Config
-from platypush.message.event import Event
+from platypush.context import get_executor
+from platypush.message.event import Event, ArgumentMatcher
 from platypush.message.request import Request
 from platypush.procedure import Procedure
 from platypush.utils import get_event_class_by_type, set_thread_name, is_functional_hook
@@ -52,6 +52,13 @@ class EventCondition(object):
             # e.g. or conditions, in, and other operators.
             self.args[key] = value
 
+        # Template arguments are compiled once, when the condition is built
+        self.matchers = {
+            key: ArgumentMatcher.build(value)
+            for (key, value) in self.args.items()
+            if isinstance(value, str)
+        }
+
     @classmethod
     def build(cls, rule):
         """ Builds a rule given either another EventRule, a dictionary or
@@ -150,19 +157,21 @@ class EventHook(object):
 
         return event.matches_condition(self.condition)
 
-    def run(self, event):
+    def run(self, event, match=None):
         """ Checks the condition of the hook against a particular event and
-            runs the hook actions if the condition is met """
+            runs the hook actions if the condition is met. If the result of
+            the match is passed through ``match`` then the condition won't
+            be evaluated again """
 
         def _thread_func(result):
             set_thread_name('Event-' + self.name)
             self.actions.execute(event=event, **result.parsed_args)
 
-        result = self.matches_event(event)
+        result = match or self.matches_event(event)
 
         if result.is_match:
             logger.info('Running hook {} triggered by an event'.format(self.name))
-            threading.Thread(target=_thread_func, name='Event-' + self.name, args=(result,)).start()
+            get_executor().submit(_thread_func, result)
 
 
 def hook(event_type=Event, **condition):
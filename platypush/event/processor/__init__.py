@@ -1,10 +1,13 @@
+import copy
 import sys
+import threading
 
 from ..hook import EventHook
 
 from platypush.config import Config
 from platypush.context import get_backend
 from platypush.message.event import Event
+from platypush.utils import is_functional_hook, preload_event_classes
 
 
 class EventProcessor(object):
@@ -18,12 +21,166 @@ class EventProcessor(object):
             named as event.hook.<hook_name> """
 
         if hooks is None:
-            hooks = Config.get_event_hooks()
+            self.hooks = self._build_config_hooks()
+        else:
+            self.hooks = []
+            for (name, hook) in hooks.items():
+                h = EventHook.build(name=name, hook=hook)
+                self.hooks.append(h)
+
+        # Event class => (hooks not indexed by argument value,
+        #                 {arg: {value: hooks}}), where each hook is stored
+        #                 together with its position in self.hooks
+        self._index = {}
+        self._index_lock = threading.RLock()
 
-        self.hooks = []
-        for (name, hook) in hooks.items():
-            h = EventHook.build(name=name, hook=hook)
-            self.hooks.append(h)
+    @staticmethod
+    def _build_config_hooks():
+        """
+        Builds the event hooks defined in the configuration. The hooks
+        compiled upon the previous start are reused if the configuration
+        hasn't changed in the meantime.
+        """
+
+        cached_hooks = Config.get_cached('event_hooks') or {}
+        compiled_hooks = {}
+        hooks = []
+        event_types = set()
+
+        for (name, hook) in Config.get_event_hooks().items():
+            if is_functional_hook(hook):
+                hooks.append(EventHook.build(name=name, hook=hook))
+                continue
+
+            if isinstance(hook, dict) and isinstance(hook.get('if'), dict) and hook['if'].get('type'):
+                event_types.add(hook['if']['type'])
+
+            h = cached_hooks.get(name)
+            if h is None:
+                h = EventHook.build(name=name, hook=copy.deepcopy(hook))
+
+            compiled_hooks[name] = h
+            hooks.append(h)
+
+        if compiled_hooks.keys() != cached_hooks.keys():
+            Config.set_cached('event_hooks', compiled_hooks)
+
+        # Register the event types referenced by the hooks under the names
+        # used in the configuration, also when the compiled hooks come from
+        # the cache, so the events received on the bus are resolved through
+        # a lookup
+        preload_event_classes(sorted(event_types))
+
+        return hooks
+
+    def add_hook(self, hook):
+        """
+        Adds an event hook to the processor.
+
+        :param hook: The event hook
+        :type hook: :class:`platypush.event.hook.EventHook`
+        """
+
+        with self._index_lock:
+            self.hooks.append(hook)
+            self._index = {}
+
+    def remove_hook(self, name):
+        """
+        Removes an event hook from the processor.
+
+        :param name: Name of the event hook
+        :returns: The removed hook, or None if no hooks with such name exist.
+        """
+
+        with self._index_lock:
+            for i, hook in enumerate(self.hooks):
+                if hook.name == name:
+                    self._index = {}
+                    return self.hooks.pop(i)
+
+    @staticmethod
+    def _get_index_arg(hook):
+        """
+        Returns the first (argument, value) pair of the condition of a hook
+        that can be matched through a lookup, i.e. whose value is hashable and
+        not a string (string values are matched against templates).
+        """
+
+        for arg, value in hook.condition.args.items():
+            if isinstance(value, str):
+                continue
+
+            try:
+                hash(value)
+            except TypeError:
+                continue
+
+            return arg, value
+
+    def _get_candidates(self, event_class):
+        """
+        Returns the hooks whose condition applies to an event class, indexed
+        by argument value where possible. The index is built upon the first
+        event of each class.
+        """
+
+        index = self._index
+        candidates = index.get(event_class)
+        if candidates is not None:
+            return candidates
+
+        with self._index_lock:
+            unindexed = []
+            indexed = {}
+
+            for i, hook in enumerate(self.hooks):
+                condition_type = hook.condition.type
+                if not (isinstance(condition_type, type) and issubclass(event_class, condition_type)):
+                    continue
+
+                index_arg = self._get_index_arg(hook)
+                if index_arg is None:
+                    unindexed.append((i, hook))
+                else:
+                    arg, value = index_arg
+                    indexed.setdefault(arg, {}).setdefault(value, []).append((i, hook))
+
+            candidates = (unindexed, indexed)
+            self._index[event_class] = candidates
+
+        return candidates
+
+    def get_candidate_hooks(self, event):
+        """
+        Returns the hooks that may match an event, in the same order as they
+        appear in ``self.hooks``.
+        """
+
+        unindexed, indexed = self._get_candidates(event.__class__)
+        if not indexed:
+            return [hook for _, hook in unindexed]
+
+        candidates = list(unindexed)
+        for arg, hooks_by_value in indexed.items():
+            if arg not in event.args:
+                continue
+
+            value = event.args[arg]
+            if isinstance(value, str):
+                # String arguments are matched by the hook condition
+                for hooks in hooks_by_value.values():
+                    candidates.extend(hooks)
+                continue
+
+            try:
+                candidates.extend(hooks_by_value.get(value, []))
+            except TypeError:
+                # Unhashable value, it can't be equal to any of the indexed values
+                pass
+
+        candidates.sort(key=lambda h: h[0])
+        return [hook for _, hook in candidates]
 
     @staticmethod
     def notify_web_clients(event):
@@ -50,9 +207,12 @@ class EventProcessor(object):
         max_score = -sys.maxsize
         max_priority = 0
 
-        for hook in self.hooks:
+        matches = {}
+
+        for hook in self.get_candidate_hooks(event):
             match = hook.matches_event(event)
             if match.is_match:
+                matches[hook] = match
                 if match.score > max_score:
                     matched_hooks = {hook}
                     max_score = match.score
@@ -66,7 +226,7 @@ class EventProcessor(object):
 
         matched_hooks.update(priority_hooks)
         for hook in matched_hooks:
-            hook.run(event)
+            hook.run(event, match=matches[hook])
 
 
 # vim:sw=4:ts=4:et:
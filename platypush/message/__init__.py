@@ -1,21 +1,89 @@
 import datetime
 import logging
-import inspect
 import json
+import sys
 import time
 
 logger = logging.getLogger(__name__)
 
+# Optional fast JSON libraries, in order of preference
+_json_backends = ['orjson', 'ujson']
+_json_backend = None
+
+
+def set_json_backend(backend=None):
+    """
+    Set the library used to serialize and deserialize messages.
+
+    :param backend: ``orjson``, ``ujson`` or ``json``. If not set (default), the
+        first available fast backend will be used, falling back on the standard
+        ``json`` module.
+    """
+
+    global _json_backend
+    backends = [backend] if backend else _json_backends
+    _json_backend = None
+
+    for name in backends:
+        if name == 'json':
+            break
+
+        try:
+            _json_backend = __import__(name)
+            break
+        except ImportError:
+            if backend:
+                logger.warning('{} is not installed, falling back to json'.format(name))
+
+
+def dumps(obj):
+    """
+    Serialize an object to a JSON string through the configured JSON backend.
+    Values that aren't natively supported (dates, sets, numpy types) are
+    converted through :class:`Message.Encoder`, and the standard ``json``
+    module is used as a fallback if the fast backend fails.
+    """
+
+    if _json_backend is not None:
+        try:
+            if _json_backend.__name__ == 'orjson':
+                return _json_backend.dumps(
+                    obj, default=_encoder.default,
+                    option=_json_backend.OPT_NON_STR_KEYS | _json_backend.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+            return _json_backend.dumps(obj, default=_encoder.default, escape_forward_slashes=False)
+        except (TypeError, ValueError, OverflowError):
+            pass
+
+    return json.dumps(obj, cls=Message.Encoder)
+
+
+def loads(s):
+    """
+    Deserialize a JSON string or bytes through the configured JSON backend.
+    """
+
+    if _json_backend is not None:
+        try:
+            return _json_backend.loads(s)
+        except ValueError:
+            pass
+
+    return json.loads(s)
+
 
 class Message(object):
     """ Message generic class """
 
+    # Message class => names of its serializable class attributes
+    _class_fields = {}
+
     class Encoder(json.JSONEncoder):
         @staticmethod
         def parse_numpy(obj):
-            try:
-                import numpy as np
-            except ImportError:
+            # If numpy hasn't been imported then obj can't be a numpy type
+            np = sys.modules.get('numpy')
+            if np is None:
                 return
 
             if isinstance(obj, np.floating):
@@ -51,18 +119,62 @@ class Message(object):
     def __init__(self, timestamp=None, *args, **kwargs):
         self.timestamp = timestamp or time.time()
 
+    def __setattr__(self, name, value):
+        # Invalidate the cached serialized message, if any
+        self.__dict__.pop('_serialized', None)
+        super().__setattr__(name, value)
+
+    def _to_json(self):
+        """
+        Returns the serialized message, caching it for the next calls. It
+        should only be used by the message classes whose instances aren't
+        modified in place once built (the cache is only invalidated when an
+        attribute is set), as the same message is usually serialized multiple
+        times (bus, web clients, logs).
+        """
+
+        serialized = self.__dict__.get('_serialized')
+        if serialized is None:
+            serialized = self.__dict__['_serialized'] = dumps(self.to_dict())
+        return serialized
+
+    @classmethod
+    def _get_class_fields(cls):
+        """
+        Returns the public, non-callable class attributes of the message class.
+        They are computed only once per class.
+        """
+
+        fields = cls._class_fields.get(cls)
+        if fields is None:
+            fields = cls._class_fields[cls] = tuple(
+                attr for attr in dir(cls)
+                if not attr.startswith('_') and not callable(getattr(cls, attr))
+            )
+
+        return fields
+
+    def to_dict(self):
+        """
+        Returns the message as a key-value dictionary, as it would be serialized
+        over the wire
+        """
+
+        msg = {attr: getattr(self, attr) for attr in self._get_class_fields()}
+        msg.update({
+            attr: value for attr, value in self.__dict__.items()
+            if not attr.startswith('_')
+        })
+
+        return msg
+
     def __str__(self):
         """
         Overrides the str() operator and converts
         the message into a UTF-8 JSON string
         """
 
-        return json.dumps({
-            attr: getattr(self, attr)
-            for attr in self.__dir__()
-            if (attr != '_timestamp' or not attr.startswith('_'))
-            and not inspect.ismethod(getattr(self, attr))
-        }, cls=self.Encoder).replace('\n', ' ')
+        return dumps(self.to_dict()).replace('\n', ' ')
 
     def __bytes__(self):
         """
@@ -87,7 +199,7 @@ class Message(object):
         if isinstance(msg, str):
             # noinspection PyBroadException
             try:
-                msg = json.loads(msg.strip())
+                msg = loads(msg.strip())
             except:
                 logger.warning('Invalid JSON message: {}'.format(msg))
 
@@ -113,6 +225,10 @@ class Message(object):
             return msgtype.build(msg)
 
 
+_encoder = Message.Encoder()
+set_json_backend()
+
+
 class Mapping(dict):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -1,5 +1,3 @@
-import copy
-import json
 import random
 import re
 import threading
@@ -8,8 +6,8 @@ import time
 from datetime import date
 
 from platypush.config import Config
-from platypush.message import Message
-from platypush.utils import get_event_class_by_type
+from platypush.message import Message, dumps
+from platypush.utils import get_event_class_by_type, register_event_class, register_message_class
 
 
 class Event(Message):
@@ -42,6 +40,12 @@ class Event(Message):
         for arg, value in self.args.items():
             self.__setattr__(arg, value)
 
+    def __init_subclass__(cls, **kwargs):
+        # Event classes are registered when they're defined, so they can be
+        # resolved by type without any import
+        super().__init_subclass__(**kwargs)
+        register_event_class(cls)
+
     @classmethod
     def build(cls, msg):
         """ Builds an event message from a JSON UTF-8 string/bytearray, a
@@ -78,12 +82,13 @@ class Event(Message):
         if not isinstance(self, condition.type):
             return result
 
+        matchers = getattr(condition, 'matchers', {})
         for (attr, value) in condition.args.items():
             if attr not in self.args:
                 return result
 
             if isinstance(self.args[attr], str):
-                arg_result = self._matches_argument(argname=attr, condition_value=value)
+                arg_result = self._matches_argument(argname=attr, condition_value=matchers.get(attr, value))
 
                 if arg_result.is_match:
                     match_scores.append(arg_result.score)
@@ -118,72 +123,161 @@ class Event(Message):
               will return EventMatchResult(is_match=False, parsed_args={})
         """
 
+        if not isinstance(condition_value, ArgumentMatcher):
+            condition_value = ArgumentMatcher.build(condition_value)
+        return condition_value.match(self.args[argname])
+
+    def to_dict(self):
+        # Dates and other non-JSON types are converted by Message.Encoder
+        # upon serialization, no need to copy and flatten the arguments
+        return {
+            'type': 'event',
+            'target': self.target,
+            'origin': self.origin if hasattr(self, 'origin') else None,
+            'id': self.id if hasattr(self, 'id') else None,
+            '_timestamp': self.timestamp,
+            'args': {
+                'type': self.type,
+                **self.args
+            },
+        }
+
+    def __str__(self):
+        """
+        Overrides the str() operator and converts
+        the message into a UTF-8 JSON string
+        """
+
+        return dumps(self.to_dict())
+
+
+register_message_class('event', Event)
+register_event_class(Event)
+
+
+class ArgumentMatcher(object):
+    """
+    Matches string event arguments against a condition template (e.g.
+    ``Turn on the ${lights} lights``). The template is split into tokens and
+    the regular expressions of its tokens are compiled only once, when the
+    matcher is built.
+    """
+
+    _whitespace_regex = re.compile(r'\s+')
+    _var_regex = re.compile(r'[^\\]*\${(.+?)}')
+
+    # Condition token => (compiled token, compiled grouped token, variable name)
+    _tokens = {}
+    _tokens_lock = threading.Lock()
+
+    # Condition template => matcher
+    _matchers = {}
+
+    def __init__(self, template):
+        """
+        :param template: Condition template
+        :type template: str
+        """
+
+        self.template = template
+        self.tokens = tuple(self._whitespace_regex.split(template.strip().lower()))
+        self._compiled_tokens = tuple(self._compile_token(token) for token in self.tokens)
+
+    @classmethod
+    def build(cls, template):
+        """ Returns the (cached) matcher for a condition template """
+        matcher = cls._matchers.get(template)
+        if matcher is None:
+            matcher = cls._matchers[template] = cls(template)
+        return matcher
+
+    @classmethod
+    def _compile_token(cls, token):
+        compiled = cls._tokens.get(token)
+        if compiled:
+            return compiled
+
+        try:
+            regex = re.compile(token)
+            group_regex = re.compile('({})'.format(token))
+        except re.error as e:
+            # The error is raised when the token is used, as it would have
+            # happened with a non-compiled regex
+            regex = group_regex = e
+
+        m = cls._var_regex.match(token)
+        compiled = (regex, group_regex, m.group(1) if m else None)
+
+        with cls._tokens_lock:
+            cls._tokens[token] = compiled
+        return compiled
+
+    @staticmethod
+    def _search(regex, value):
+        if isinstance(regex, re.error):
+            raise regex
+        return regex.search(value)
+
+    def match(self, value):
+        """
+        Matches a string against the template.
+
+        :param value: String to be matched
+        :returns: :class:`EventMatchResult` containing the match score and the
+            values of the template variables.
+        """
+
         result = EventMatchResult(is_match=False)
-        event_tokens = re.split('\s+', self.args[argname].strip().lower())
-        condition_tokens = re.split('\s+', condition_value.strip().lower())
+        event_tokens = self._whitespace_regex.split(value.strip().lower())
+        condition_tokens = self.tokens
+        compiled_tokens = self._compiled_tokens
+        n_event_tokens = len(event_tokens)
+        n_condition_tokens = len(condition_tokens)
+        i = j = 0
 
-        while event_tokens and condition_tokens:
-            event_token = event_tokens[0]
-            condition_token = condition_tokens[0]
+        while i < n_event_tokens and j < n_condition_tokens:
+            event_token = event_tokens[i]
+            condition_token = condition_tokens[j]
 
             if event_token == condition_token:
-                event_tokens.pop(0)
-                condition_tokens.pop(0)
+                i += 1
+                j += 1
                 result.score += 1.5
-            elif re.search(condition_token, event_token):
-                m = re.search('({})'.format(condition_token), event_token)
+                continue
+
+            regex, group_regex, argname = compiled_tokens[j]
+            if self._search(regex, event_token):
+                m = self._search(group_regex, event_token)
                 if m.group(1):
-                    event_tokens.pop(0)
+                    i += 1
                     result.score += 1.25
 
-                condition_tokens.pop(0)
-            else:
-                m = re.match('[^\\\]*\${(.+?)}', condition_token)
-                if m:
-                    argname = m.group(1)
-                    if argname not in result.parsed_args:
-                        result.parsed_args[argname] = event_token
-                        result.score += 1.0
-                    else:
-                        result.parsed_args[argname] += ' ' + event_token
-
-                    if (len(condition_tokens) == 1 and len(event_tokens) == 1) \
-                            or (len(event_tokens) > 1 and len(condition_tokens) > 1
-                                and event_tokens[1] == condition_tokens[1]):
-                        # Stop appending tokens to this argument, as the next
-                        # condition will be satisfied as well
-                        condition_tokens.pop(0)
-
-                    event_tokens.pop(0)
+                j += 1
+            elif argname:
+                if argname not in result.parsed_args:
+                    result.parsed_args[argname] = event_token
+                    result.score += 1.0
                 else:
-                    result.score -= 1.0
-                    event_tokens.pop(0)
+                    result.parsed_args[argname] += ' ' + event_token
+
+                remaining_event_tokens = n_event_tokens - i
+                remaining_condition_tokens = n_condition_tokens - j
+                if (remaining_condition_tokens == 1 and remaining_event_tokens == 1) \
+                        or (remaining_event_tokens > 1 and remaining_condition_tokens > 1
+                            and event_tokens[i + 1] == condition_tokens[j + 1]):
+                    # Stop appending tokens to this argument, as the next
+                    # condition will be satisfied as well
+                    j += 1
+
+                i += 1
+            else:
+                result.score -= 1.0
+                i += 1
 
         # It's a match if all the tokens in the condition string have been satisfied
-        result.is_match = len(condition_tokens) == 0
+        result.is_match = j == n_condition_tokens
         return result
 
-    def __str__(self):
-        """
-        Overrides the str() operator and converts
-        the message into a UTF-8 JSON string
-        """
-
-        args = copy.deepcopy(self.args)
-        flatten(args)
-
-        return json.dumps({
-            'type': 'event',
-            'target': self.target,
-            'origin': self.origin if hasattr(self, 'origin') else None,
-            'id': self.id if hasattr(self, 'id') else None,
-            '_timestamp': self.timestamp,
-            'args': {
-                'type': self.type,
-                **args
-            },
-        }, cls=self.Encoder)
-
 
 class EventMatchResult(object):
     """ When comparing an event against an event condition, you want to
@@ -6,14 +6,14 @@ import random
 import re
 import time
 
-from threading import Thread
-
 from platypush.config import Config
-from platypush.context import get_plugin
+from platypush.context import get_executor, get_plugin
+from platypush.context.metrics import metrics
 from platypush.message import Message
 from platypush.message.response import Response
 from platypush.utils import get_hash, get_module_and_method_from_action, get_redis_queue_name_by_message, \
-    is_functional_procedure
+    get_redis_response_channel, is_functional_procedure, register_message_class
+from platypush.utils.expression import ExpressionContext, expand_value
 
 logger = logging.getLogger(__name__)
 
@@ -67,7 +67,7 @@ class Request(Message):
 
     def _execute_procedure(self, *args, **kwargs):
         from platypush.config import Config
-        from platypush.procedure import Procedure
+        from platypush.procedure import DagProcedure, Procedure
 
         logger.info('Executing procedure request: {}'.format(self.action))
         procedures = Config.get_procedures()
@@ -85,7 +85,8 @@ class Request(Message):
 
         proc = Procedure.build(name=proc_name, requests=proc_config['actions'],
                                _async=proc_config['_async'], args=self.args,
-                               backend=self.backend, id=self.id)
+                               backend=self.backend, id=self.id,
+                               procedure_class=DagProcedure if proc_config.get('_dag') else None)
 
         return proc.execute(*args, **kwargs)
 
@@ -100,92 +101,66 @@ class Request(Message):
         for (name, value) in constants.items():
             context['constants'][name] = value
 
+        return self._expand_args(event_args, ExpressionContext(context))
+
+    @classmethod
+    def _expand_args(cls, args, context):
         keys = []
-        if isinstance(event_args, dict):
-            keys = event_args.keys()
-        elif isinstance(event_args, list):
-            keys = range(0, len(event_args))
+        if isinstance(args, dict):
+            keys = args.keys()
+        elif isinstance(args, list):
+            keys = range(0, len(args))
 
         for key in keys:
-            value = event_args[key]
+            value = args[key]
 
             if isinstance(value, str):
-                value = self.expand_value_from_context(value, **context)
+                value = expand_value(value, context, globals())
             elif isinstance(value, dict) or isinstance(value, list):
-                self._expand_context(event_args=value, **context)
+                cls._expand_args(value, context)
 
-            event_args[key] = value
+            args[key] = value
 
-        return event_args
+        return args
 
-    # noinspection PyBroadException
     @classmethod
     def expand_value_from_context(cls, _value, **context):
-        for (k, v) in context.items():
-            if isinstance(v, Message):
-                v = json.loads(str(v))
-            try:
-                exec('{}={}'.format(k, v))
-            except:
-                if isinstance(v, str):
-                    try:
-                        exec('{}="{}"'.format(k, re.sub('(^|[^\\\])"', '\1\\"', v)))
-                    except:
-                        pass
-
-        parsed_value = ''
-        if not isinstance(_value, str):
-            parsed_value = _value
-
-        while _value and isinstance(_value, str):
-            m = re.match('([^$]*)(\${\s*(.+?)\s*})(.*)', _value)
-            if m and not m.group(1).endswith('\\'):
-                prefix = m.group(1)
-                expr = m.group(2)
-                inner_expr = m.group(3)
-                _value = m.group(4)
-
-                try:
-                    context_value = eval(inner_expr)
-
-                    if callable(context_value):
-                        context_value = context_value()
-                    if isinstance(context_value, range) or isinstance(context_value, tuple):
-                        context_value = [*context_value]
-                    if isinstance(context_value, datetime.date):
-                        context_value = context_value.isoformat()
-                except Exception as e:
-                    logger.exception(e)
-                    context_value = expr
-
-                parsed_value += prefix + (
-                    json.dumps(context_value)
-                    if isinstance(context_value, list) or isinstance(context_value, dict)
-                    else str(context_value)
-                )
-            else:
-                parsed_value += _value
-                _value = ''
+        """
+        Expands the ``${expression}`` placeholders in a value. The templates
+        and their expressions are parsed and compiled only once, see
+        :mod:`platypush.utils.expression`.
+        """
 
-        try:
-            return json.loads(parsed_value)
-        except:
-            return parsed_value
+        return expand_value(_value, ExpressionContext(context), globals())
 
     def _send_response(self, response):
         response = Response.build(response)
         response.id = self.id
         response.target = self.origin
         response.origin = Config.get('device_id')
+        start = time.perf_counter()
 
         if self.backend and self.origin:
             self.backend.send_response(response=response, request=self)
+            backend = self.backend.__class__.__name__
         else:
+            backend = 'redis'
             redis = get_plugin('redis')
             if redis:
+                # The response is pushed on the queue of the request and, if the
+                # request has an origin, published on the channel of the origin
+                # (see platypush.backend.http.app.multiplexer), in a single round trip
                 queue_name = get_redis_queue_name_by_message(self)
-                redis.send_message(queue_name, response)
-                redis.expire(queue_name, 60)
+                data = str(response)
+                # noinspection PyProtectedMember
+                pipe = redis._get_redis().pipeline(transaction=False)
+                pipe.rpush(queue_name, data)
+                pipe.expire(queue_name, 60)
+                if self.origin:
+                    pipe.publish(get_redis_response_channel(self.origin), data)
+                pipe.execute()
+
+        metrics.observe('platypush_response_send_seconds', time.perf_counter() - start, backend=backend)
 
     def execute(self, n_tries=1, _async=True, **context):
         """
@@ -220,17 +195,26 @@ class Request(Message):
                 action = self.expand_value_from_context(self.action, **context)
                 (module_name, method_name) = get_module_and_method_from_action(action)
                 plugin = get_plugin(module_name)
+                # The unknown actions are recorded under a single label, or any
+                # action name sent by a client would create new metric series
+                metric_action = action if method_name in getattr(plugin, 'registered_actions', ()) else 'other'
 
             try:
                 # Run the action
                 args = self._expand_context(**context)
                 args = self.expand_value_from_context(args, **context)
-                response = plugin.run(method=method_name, **args)
+
+                # Plugin.run applies the concurrency limit of the plugin, and
+                # coalesces the concurrent identical calls of the idempotent
+                # actions. Each request gets its own response object
+                with metrics.timer('platypush_action_duration_seconds', action=metric_action):
+                    response = plugin.run(method=method_name, **args)
 
                 if not response:
                     logger.warning('Received null response from action {}'.format(action))
                 else:
                     if response.is_error():
+                        metrics.inc('platypush_action_errors_total', action=metric_action)
                         logger.warning(('Response processed with errors from ' +
                                         'action {}: {}').format(
                             action, str(response)))
@@ -238,11 +222,13 @@ class Request(Message):
                         logger.info('Processed response from action {}: {}'.
                                     format(action, str(response)))
             except AssertionError as e:
+                metrics.inc('platypush_action_errors_total', action=metric_action)
                 plugin.logger.exception(e)
                 logger.warning('Assertion error from action [{}]: {}'.format(action, str(e)))
                 response = Response(output=None, errors=[str(e)])
             except Exception as e:
                 # Retry mechanism
+                metrics.inc('platypush_action_errors_total', action=metric_action)
                 plugin.logger.exception(e)
                 logger.warning(('Uncaught exception while processing response ' +
                                 'from action [{}]: {}').format(action, str(e)))
@@ -267,17 +253,28 @@ class Request(Message):
                 raise PermissionError()
 
         if _async:
-            Thread(target=_thread_func, args=(n_tries,)).start()
+            def _on_done(future):
+                # The request expired in the queue or failed before sending a response
+                if future.exception():
+                    self._send_response(Response(output=None, errors=[str(future.exception())]))
+
+            key = None
+            if not self.action.startswith('procedure.') and self.action != 'utils.get_context':
+                key = get_module_and_method_from_action(self.action)[0]
+
+            submit_time = time.perf_counter()
+
+            def _run(_n_tries):
+                metrics.observe('platypush_request_queue_seconds', time.perf_counter() - submit_time,
+                                action=self.action)
+                return _thread_func(_n_tries)
+
+            get_executor().submit(_run, n_tries, key=key).add_done_callback(_on_done)
         else:
             return _thread_func(n_tries)
 
-    def __str__(self):
-        """
-        Overrides the str() operator and converts
-        the message into a UTF-8 JSON string
-        """
-
-        return json.dumps({
+    def to_dict(self):
+        return {
             'type': 'request',
             'target': self.target,
             'action': self.action,
@@ -286,6 +283,19 @@ class Request(Message):
             'id': self.id if hasattr(self, 'id') else None,
             'token': self.token if hasattr(self, 'token') else None,
             '_timestamp': self.timestamp,
-        })
+        }
+
+    def __str__(self):
+        """
+        Overrides the str() operator and converts
+        the message into a UTF-8 JSON string. The
+        serialized message is cached until an
+        attribute is set.
+        """
+
+        return self._to_json()
+
+
+register_message_class('request', Request)
 
 # vim:sw=4:ts=4:et:
@@ -1,7 +1,7 @@
-import json
 import time
 
-from platypush.message import Message
+from platypush.message import Message, loads
+from platypush.utils import register_message_class
 
 
 class Response(Message):
@@ -37,7 +37,7 @@ class Response(Message):
             msg = msg.decode('utf-8')
         if isinstance(msg, str):
             try:
-                msg = json.loads(msg.strip())
+                msg = loads(msg.strip())
             except ValueError:
                 pass
 
@@ -61,11 +61,7 @@ class Response(Message):
 
         return cls(**args)
 
-    def __str__(self):
-        """
-        Overrides the str() operator and converts
-        the message into a UTF-8 JSON string
-        """
+    def to_dict(self):
         output = self.output if self.output is not None else {
             'success': True if not self.errors else False
         }
@@ -85,7 +81,20 @@ class Response(Message):
         if self.disable_logging:
             response_dict['_disable_logging'] = self.disable_logging
 
-        return json.dumps(response_dict, cls=self.Encoder)
+        return response_dict
+
+    def __str__(self):
+        """
+        Overrides the str() operator and converts
+        the message into a UTF-8 JSON string. The
+        serialized message is cached until an
+        attribute is set.
+        """
+
+        return self._to_json()
+
+
+register_message_class('response', Response)
 
 
 # vim:sw=4:ts=4:et:
@@ -67,8 +67,7 @@ def generate_dockerfile(deps, ports, cfgfile, devdir, python_version):
     subprocess.call(['cp', cfgfile, cfgfile_copy])
     content += 'COPY config.yaml /etc/platypush/\n'
 
-    # noinspection PyProtectedMember
-    for include in Config._included_files:
+    for include in Config.get_config_files()[1:]:
         incdir = os.path.relpath(os.path.dirname(include), srcdir)
         destdir = os.path.join(devdir, incdir)
 
@@ -1,13 +1,39 @@
+import copy
 import logging
 
-from functools import wraps
+from functools import partial, wraps
 
+from platypush.config import Config
+from platypush.context import get_executor, get_response_cache
 from platypush.event import EventGenerator
 from platypush.message.response import Response
-from platypush.utils import get_decorators
 
 
-def action(f):
+def action(f=None, cache_ttl=None, idempotent=False):
+    """
+    Marks a plugin method as an action. It can be used either as ``@action``
+    or with arguments::
+
+        @action(cache_ttl=5)
+        def status(self):
+            ...
+
+    :param cache_ttl: If set, the responses of the action are cached for
+        ``cache_ttl`` seconds, per set of arguments. Only use it on actions
+        that don't change the state of the plugin or of the device, since
+        the cached responses of a plugin are invalidated whenever one of its
+        non-idempotent actions is executed. It can be overridden by the
+        ``cache.actions`` section of the configuration.
+    :param idempotent: Set it if the action doesn't change any state, so
+        concurrent identical calls can share the same execution even if
+        the responses of the action are not cached (implied by ``cache_ttl``).
+        Setting the TTL of the action to 0 in the ``cache.actions`` section of
+        the configuration disables both the cache and the coalescing.
+    """
+
+    if f is None:
+        return partial(action, cache_ttl=cache_ttl, idempotent=idempotent)
+
     @wraps(f)
     def _execute_action(*args, **kwargs):
         response = Response()
@@ -31,6 +57,10 @@ def action(f):
 
     # Propagate the docstring
     _execute_action.__doc__ = f.__doc__
+    # Mark the function as an action, see Plugin.get_registered_actions
+    _execute_action.action = True
+    _execute_action.cache_ttl = cache_ttl
+    _execute_action.idempotent = idempotent or bool(cache_ttl)
     return _execute_action
 
 
@@ -44,14 +74,133 @@ class Plugin(EventGenerator):
         if 'logging' in kwargs:
             self.logger.setLevel(getattr(logging, kwargs['logging'].upper()))
 
-        self.registered_actions = set(
-            get_decorators(self.__class__, climb_class_hierarchy=True).get('action', [])
-        )
+        self.registered_actions = set(self.get_registered_actions())
+        self._cache_ttl, self._idempotent_actions = self._get_cache_config()
+
+        # The plugin may have been rebuilt with a new configuration (e.g.
+        # upon configuration reload): discard the responses cached by the
+        # previous instance
+        if self._cache_ttl:
+            self.invalidate_cache()
+
+    @classmethod
+    def get_registered_actions(cls):
+        """
+        Returns the names of the methods decorated with ``@action`` in the
+        plugin class or in any of its parent classes. They are computed only
+        once per class.
+        """
+
+        actions = cls.__dict__.get('_registered_actions')
+        if actions is None:
+            actions = frozenset(
+                name
+                for target in cls.__mro__
+                for name, value in target.__dict__.items()
+                if getattr(getattr(value, '__func__', value), 'action', False) is True
+            )
+
+            cls._registered_actions = actions
+
+        return actions
+
+    @property
+    def plugin_name(self):
+        """ Name of the plugin, e.g. ``music.mpd`` """
+        module = self.__class__.__module__
+        prefix = 'platypush.plugins.'
+        return module[len(prefix):] if module.startswith(prefix) else module
+
+    def _get_cache_config(self):
+        """
+        Returns the time-to-live of the cached responses of the actions and
+        the names of the idempotent actions, as set through
+        ``@action(cache_ttl=..., idempotent=...)`` and the ``cache.actions``
+        section of the configuration, e.g.::
+
+            cache:
+                actions:
+                    music.mpd.status: 2
+                    system.cpu_percent: 0  # Disable the cache and the coalescing
+
+        """
+
+        ttl = {
+            name: getattr(getattr(self, name), 'cache_ttl', None)
+            for name in self.registered_actions
+        }
+
+        idempotent = {
+            name for name in self.registered_actions
+            if getattr(getattr(self, name), 'idempotent', False)
+        }
+
+        for action_name, action_ttl in ((Config.get('cache') or {}).get('actions') or {}).items():
+            plugin_name, _, method = action_name.rpartition('.')
+            if plugin_name == self.plugin_name and method in ttl:
+                ttl[method] = action_ttl
+                if action_ttl:
+                    idempotent.add(method)
+                else:
+                    idempotent.discard(method)
+
+        return {name: action_ttl for name, action_ttl in ttl.items() if action_ttl}, frozenset(idempotent)
+
+    def is_idempotent(self, method):
+        """
+        :returns: True if the action doesn't change any state, i.e. if it's been declared with
+            ``@action(idempotent=True)`` or if its responses are cached, and its cache hasn't been
+            disabled in the configuration.
+        """
+
+        return method in self._idempotent_actions
+
+    def invalidate_cache(self):
+        """ Removes the cached responses of the plugin actions """
+        get_response_cache().invalidate(self.plugin_name)
 
     def run(self, method, *args, **kwargs):
         assert method in self.registered_actions, '{} is not a registered action on {}'.\
             format(method, self.__class__.__name__)
-        return getattr(self, method)(*args, **kwargs)
+
+        def _run():
+            # The concurrency limit of the plugin is only acquired by the
+            # calls that actually run the action, not by the ones waiting
+            # for an identical call in progress
+            with get_executor().limit(self.plugin_name):
+                return getattr(self, method)(*args, **kwargs)
+
+        if not self.is_idempotent(method):
+            if not self._cache_ttl:
+                return _run()
+
+            # The action may change the state of the plugin, invalidate the
+            # cached responses both before (to discard the cached calls in
+            # progress) and after it's executed
+            self.invalidate_cache()
+            try:
+                return _run()
+            finally:
+                self.invalidate_cache()
+
+        # Concurrent identical calls of an idempotent action share the same
+        # execution, whose response is also cached if the action has a TTL
+        cache = get_response_cache()
+        key = cache.make_key(method, args, kwargs)
+        ttl = self._cache_ttl.get(method)
+
+        if ttl:
+            response = cache.get_or_run(self.plugin_name, key, ttl, _run,
+                                        cache_if=lambda r: not (isinstance(r, Response) and r.is_error()))
+        else:
+            response = cache.coalesce(self.plugin_name, key, _run)
+
+        # The callers may set the id and the target of the response, or
+        # change its output: each caller gets its own copy
+        response = copy.copy(response)
+        response.output = copy.deepcopy(response.output)
+        response.errors = copy.copy(response.errors)
+        return response
 
 
 # vim:sw=4:ts=4:et:
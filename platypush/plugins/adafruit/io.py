@@ -5,7 +5,7 @@ import time
 
 from threading import Thread, Lock
 
-from platypush.context import get_backend
+from platypush.context import get_backend, get_redis
 from platypush.plugins import Plugin, action
 
 data_throttler_lock = None
@@ -83,11 +83,7 @@ class AdafruitIoPlugin(Plugin):
 
     @staticmethod
     def _get_redis():
-        from redis import Redis
-
-        redis_args = get_backend('redis').redis_args
-        redis_args['socket_timeout'] = 1
-        return Redis(**redis_args)
+        return get_redis(**dict(get_backend('redis').redis_args, socket_timeout=1))
 
     def _data_throttler(self):
         from redis.exceptions import TimeoutError as QueueTimeoutError
@@ -66,7 +66,7 @@ class CalendarPlugin(Plugin, CalendarInterface):
             self.calendars.append(getattr(module, class_name)(**calendar))
 
 
-    @action
+    @action(cache_ttl=300)
     def get_upcoming_events(self, max_results=10):
         """
         Get a list of upcoming events merging all the available calendars.
@@ -58,7 +58,7 @@ class CalendarIcalPlugin(Plugin, CalendarInterface):
         }
 
 
-    @action
+    @action(cache_ttl=300)
     def get_upcoming_events(self, max_results=10, only_participating=True):
         """
         Get the upcoming events. See
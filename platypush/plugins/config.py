@@ -0,0 +1,36 @@
+from platypush.config import Config
+from platypush.plugins import Plugin, action
+
+
+class ConfigPlugin(Plugin):
+    """
+    Plugin to manage the configuration of the running application.
+    """
+
+    @action
+    def reload(self):
+        """
+        Reloads the configuration file and its includes without restarting the
+        application. Only the backends, event hooks, cronjobs and plugins whose
+        configuration has changed are restarted or reconfigured. The
+        configuration can also be reloaded by sending a ``SIGHUP`` to the
+        application, or automatically upon changes to the configuration files
+        if ``watch`` is set in the ``reload`` section of the configuration.
+
+        :returns: The changes to the configuration, in the format::
+
+            {
+                "backends": {"added": [], "changed": ["http"], "removed": []},
+                "plugins": {"added": ["light.hue"], "changed": [], "removed": []},
+                "event_hooks": {"added": [], "changed": [], "removed": ["OnPing"]},
+                "procedures": {"added": [], "changed": [], "removed": []},
+                "cronjobs": {"added": [], "changed": [], "removed": []},
+                "settings": {"added": [], "changed": [], "removed": []}
+            }
+
+        """
+
+        return Config.reload().to_dict()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,147 @@
+import time
+
+from typing import List, Optional
+
+from platypush.context import get_cron_scheduler
+from platypush.plugins import Plugin, action
+
+
+class CronPlugin(Plugin):
+    """
+    Plugin to manage the cronjobs at runtime. Besides the cronjobs defined
+    in the configuration (``cron.*`` sections), jobs can be added
+    programmatically. They are stored on the local database by default, so
+    they are scheduled again after a restart.
+
+    Example: poll a sensor every 5 seconds for the next hour::
+
+        {
+            "type": "request",
+            "action": "cron.add",
+            "args": {
+                "name": "poll_temperature",
+                "cron_expression": "* * * * * */5",
+                "duration": 3600,
+                "actions": [
+                    {"action": "gpio.sensor.dht.get_measurement"}
+                ]
+            }
+        }
+
+    Requires:
+
+        * **croniter** (``pip install croniter``)
+        * **sqlalchemy** (``pip install sqlalchemy``)
+    """
+
+    @action
+    def add(self, name: str, cron_expression: str, actions: List[dict], missed_runs: str = 'skip',
+            jitter: float = 0, until: Optional[float] = None, duration: Optional[float] = None,
+            paused: bool = False, persist: bool = True):
+        """
+        Adds a cronjob, or replaces the existing cronjob with the same name.
+
+        :param name: Name of the job
+        :param cron_expression: Cron expression. A 6th field can be added to the standard cron syntax to run
+            jobs with second granularity (e.g. ``* * * * * */5`` to run the job every 5 seconds).
+        :param actions: Actions to be executed
+        :param missed_runs: What to do with the runs missed because the scheduler was late, either ``skip``
+            (default) or ``catch_up`` (run the job once as soon as possible)
+        :param jitter: Maximum random delay applied to each run, in seconds (default: 0)
+        :param until: Timestamp after which the job will be removed (default: None)
+        :param duration: Alternative to ``until``, number of seconds after which the job will be removed
+        :param paused: Add the job in paused state (default: False)
+        :param persist: Store the job on the local database so it survives restarts (default: True)
+        :returns: The job, see :meth:`.list`.
+        """
+
+        if duration is not None:
+            until = time.time() + duration
+
+        job = get_cron_scheduler().add_job(name, {
+            'cron_expression': cron_expression,
+            'actions': actions,
+            'missed_runs': missed_runs,
+            'jitter': jitter,
+            'until': until,
+            'paused': paused,
+        }, persistent=persist)
+
+        return job.to_dict()
+
+    @action
+    def remove(self, name: str):
+        """
+        Removes a cronjob created at runtime. A run already in progress won't be interrupted.
+
+        :param name: Name of the job
+        """
+
+        scheduler = get_cron_scheduler()
+        assert name not in scheduler.jobs_config, \
+            'The cronjob {} is defined in the configuration and it cannot be removed at runtime'.format(name)
+        assert scheduler.remove_job(name), 'No such cronjob: {}'.format(name)
+
+    @action
+    def pause(self, name: str):
+        """
+        Pauses a cronjob. The pause of the jobs defined in the configuration lasts until the next restart.
+
+        :param name: Name of the job
+        """
+
+        return get_cron_scheduler().pause_job(name).to_dict()
+
+    @action
+    def resume(self, name: str):
+        """
+        Resumes a paused cronjob.
+
+        :param name: Name of the job
+        """
+
+        return get_cron_scheduler().resume_job(name).to_dict()
+
+    @action
+    def trigger(self, name: str):
+        """
+        Runs a cronjob now, without affecting its schedule.
+
+        :param name: Name of the job
+        :returns: ``{"triggered": false}`` if the job was already running.
+        """
+
+        return {'triggered': get_cron_scheduler().trigger_job(name)}
+
+    @action
+    def list(self):
+        """
+        :returns: The scheduled cronjobs, in the format::
+
+            [
+                {
+                    "name": "poll_temperature",
+                    "cron_expression": "* * * * * */5",
+                    "state": "wait",
+                    "missed_runs": "skip",
+                    "jitter": 0,
+                    "until": 1598000000.0,
+                    "paused": false,
+                    "persistent": true,
+                    "next_run": 1597996405.0,
+                    "runs": 12,
+                    "errors": 0,
+                    "missed": 0,
+                    "last_run": 1597996400.0,
+                    "last_duration": 0.021,
+                    "max_duration": 0.045,
+                    "avg_duration": 0.025
+                }
+            ]
+
+        """
+
+        return [job.to_dict() for job in get_cron_scheduler().get_jobs().values()]
+
+
+# vim:sw=4:ts=4:et:
@@ -22,7 +22,7 @@ class GoogleCalendarPlugin(GooglePlugin, CalendarInterface):
         super().__init__(scopes=self.scopes, *args, **kwargs)
 
 
-    @action
+    @action(cache_ttl=300)
     def get_upcoming_events(self, max_results=10):
         """
         Get the upcoming events. See
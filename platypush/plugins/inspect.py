@@ -14,7 +14,6 @@ from platypush.backend import Backend
 from platypush.plugins import Plugin, action
 from platypush.message.event import Event
 from platypush.message.response import Response
-from platypush.utils import get_decorators
 
 
 # noinspection PyTypeChecker
@@ -53,7 +52,7 @@ class PluginModel(Model):
         self.html_doc = html_doc
         self.doc = self.to_html(plugin.__doc__) if html_doc and plugin.__doc__ else plugin.__doc__
         self.actions = {action_name: ActionModel(getattr(plugin, action_name), html_doc=html_doc)
-                        for action_name in get_decorators(plugin, climb_class_hierarchy=True).get('action', [])}
+                        for action_name in plugin.get_registered_actions()}
 
     def __iter__(self):
         for attr in ['name', 'actions', 'doc', 'html_doc']:
@@ -4,10 +4,9 @@ import time
 
 from enum import Enum
 from threading import Thread
-from redis import Redis
 from redis.exceptions import TimeoutError as QueueTimeoutError
 
-from platypush.context import get_backend
+from platypush.context import get_backend, get_redis
 from platypush.plugins import action
 from platypush.plugins.light import LightPlugin
 from platypush.utils import set_thread_name
@@ -157,7 +156,7 @@ class LightHuePlugin(LightPlugin):
 
         return self.bridge.get_scene()
 
-    @action
+    @action(cache_ttl=2)
     def get_lights(self):
         """
         Get the configured lights.
@@ -884,9 +883,7 @@ class LightHuePlugin(LightPlugin):
 
     def _get_redis(self, socket_timeout=1.0):
         if not self.redis:
-            redis_args = get_backend('redis').redis_args
-            redis_args['socket_timeout'] = socket_timeout
-            self.redis = Redis(**redis_args)
+            self.redis = get_redis(**dict(get_backend('redis').redis_args, socket_timeout=socket_timeout))
         return self.redis
 
     def status(self):
@@ -0,0 +1,34 @@
+from platypush.context import get_executor
+from platypush.context.metrics import metrics
+from platypush.plugins import Plugin, action
+
+
+class MetricsPlugin(Plugin):
+    """
+    Exposes the latency histograms and the counters recorded by platypush on
+    the bus, the backends, the requests and the plugin actions. The metrics
+    are also available in Prometheus format on the ``/metrics`` endpoint of
+    the web server, if :mod:`platypush.backend.http` is enabled.
+    """
+
+    @action
+    def get(self):
+        """
+        :returns: The recorded metrics, see :meth:`platypush.context.metrics.MetricsRegistry.get_stats`.
+        """
+
+        # Make sure that the executor gauges are registered
+        get_executor()
+        return metrics.get_stats()
+
+    @action
+    def prometheus(self):
+        """
+        :returns: The recorded metrics in the Prometheus text exposition format.
+        """
+
+        get_executor()
+        return metrics.to_prometheus()
+
+
+# vim:sw=4:ts=4:et:
@@ -427,7 +427,7 @@ class MusicMpdPlugin(MusicPlugin):
 
         return self._exec('seekcur', '-15')
 
-    @action
+    @action(cache_ttl=1)
     def status(self):
         """
         :returns: The current state.
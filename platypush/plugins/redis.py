@@ -1,6 +1,4 @@
-from redis import Redis
-
-from platypush.context import get_backend
+from platypush.context import get_backend, get_redis
 from platypush.plugins import Plugin, action
 
 
@@ -28,7 +26,7 @@ class RedisPlugin(Plugin):
                 pass
 
     def _get_redis(self):
-        return Redis(*self.args, **self.kwargs)
+        return get_redis(*self.args, **self.kwargs)
 
     @action
     def send_message(self, queue, msg, *args, **kwargs):
@@ -50,7 +48,7 @@ class RedisPlugin(Plugin):
         """
 
         if args or kwargs:
-            redis = Redis(*args, **kwargs)
+            redis = get_redis(*args, **kwargs)
         else:
             redis = self._get_redis()
 
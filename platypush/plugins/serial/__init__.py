@@ -100,7 +100,7 @@ class SerialPlugin(SensorPlugin):
                 self.logger.warning('Error while closing serial communication: {}')
                 self.logger.exception(e)
 
-    @action
+    @action(idempotent=True)
     def get_measurement(self, device=None, baud_rate=None):
         """
         Reads JSON data from the serial device and returns it as a message
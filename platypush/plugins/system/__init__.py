@@ -95,7 +95,7 @@ class SystemPlugin(Plugin):
             guest_nice=times.guest_nice,
         )
 
-    @action
+    @action(cache_ttl=1)
     def cpu_percent(self, per_cpu: bool = False, interval: Optional[float] = None) -> Union[float, List[float]]:
         """
         Get the CPU load percentage.
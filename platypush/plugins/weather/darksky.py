@@ -46,7 +46,7 @@ class WeatherDarkskyPlugin(HttpRequestPlugin):
             format(self.darksky_token, (lat or self.lat), (long or self.long),
                    self.units)
 
-    @action
+    @action(cache_ttl=300)
     def get_current_weather(self, lat=None, long=None, **kwargs):
         """
         Get the current weather.
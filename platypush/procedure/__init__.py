@@ -1,12 +1,15 @@
 import enum
 import logging
 import re
-from functools import wraps
+from concurrent.futures import FIRST_COMPLETED, wait
+from functools import partial, wraps
 
 from queue import LifoQueue
 from ..config import Config
+from ..context import get_executor
 from ..message.request import Request
 from ..message.response import Response
+from ..utils.expression import Expression, ExpressionContext, get_variables
 
 logger = logging.getLogger(__name__)
 
@@ -269,7 +272,7 @@ class ForProcedure(LoopProcedure):
     def execute(self, _async=None, **context):
         # noinspection PyBroadException
         try:
-            iterable = eval(self.iterable)
+            iterable = Expression.build(self.iterable).evaluate(ExpressionContext(context), globals())
             assert hasattr(iterable, '__iter__'), 'Object of type {} is not iterable: {}'.\
                 format(type(iterable), iterable)
         except:
@@ -328,34 +331,15 @@ class WhileProcedure(LoopProcedure):
         super(). __init__(name=name, _async=_async, requests=requests, args=args, backend=backend)
         self.condition = condition
 
-    @staticmethod
-    def _get_context(**context):
-        for (k, v) in context.items():
-            # noinspection PyBroadException
-            try:
-                context[k] = eval(v)
-            except:
-                if isinstance(v, str):
-                    # noinspection PyBroadException
-                    try:
-                        context[k] = eval('"{}"'.format(re.sub('(^|[^\\\])"', '\1\\"', v)))
-                    except:
-                        pass
-
-        return context
-
-    # noinspection DuplicatedCode,PyBroadException
+    # noinspection DuplicatedCode
     def execute(self, _async=None, **context):
         response = Response()
-        context = self._get_context(**context)
-        for k, v in context.items():
-            try:
-                exec('{}={}'.format(k, v))
-            except:
-                pass
+        condition = Expression.build(self.condition)
+        # The context values are coerced upon their first use in the condition
+        variables = ExpressionContext(context)
 
         while True:
-            condition_true = eval(self.condition)
+            condition_true = condition.evaluate(variables, globals())
             if not condition_true:
                 break
 
@@ -377,12 +361,7 @@ class WhileProcedure(LoopProcedure):
 
             if response.output:
                 if isinstance(response.output, dict):
-                    new_context = self._get_context(**response.output)
-                    for k, v in new_context.items():
-                        try:
-                            exec('{}={}'.format(k, v))
-                        except:
-                            pass
+                    variables.update(response.output)
 
         return response
 
@@ -445,17 +424,7 @@ class IfProcedure(Procedure):
                              **kwargs)
 
     def execute(self, **context):
-        for (k, v) in context.items():
-            try:
-                exec('{}={}'.format(k, v))
-            except:
-                if isinstance(v, str):
-                    try:
-                        exec('{}="{}"'.format(k, re.sub('(^|[^\\\])"', '\1\\"', v)))
-                    except:
-                        pass
-
-        condition_true = eval(self.condition)
+        condition_true = Expression.build(self.condition).evaluate(ExpressionContext(context), globals())
         response = Response()
 
         if condition_true:
@@ -466,6 +435,189 @@ class IfProcedure(Procedure):
         return response
 
 
+class DagProcedure(Procedure):
+    """
+    Procedure whose actions are executed as a dependency graph rather than
+    in sequence. An action depends on the previous actions if it uses their
+    results, i.e. if it references ``${output}``/``${errors}`` (result of the
+    previous action) or any variable that isn't already in the context of the
+    procedure (e.g. a field of the output of a previous action). Actions that
+    only reference the procedure arguments and the context variables are run
+    concurrently on the executor, and each action waits for the actions it
+    depends on.
+
+    Conditions, loops, nested procedures and ``return``/``break``/``continue``
+    statements wait for all the previous actions and are waited by all the
+    following ones. Each action sees the results of the actions it depends on
+    merged in their declaration order, and the response of the procedure is
+    the response of its last action, so the outcome doesn't depend on the
+    completion order.
+
+    Example (the weather, the lights and the calendar events are handled
+    concurrently, ``${output}`` in the last step is the list returned by the
+    calendar, and ``${summary}`` a field of the current weather)::
+
+        procedure.dag.morning_routine:
+            - action: weather.darksky.get_current_weather
+            - action: light.hue.on
+              args:
+                  groups: ${bedroom_lights}
+            - action: calendar.get_upcoming_events
+              args:
+                  max_results: 1
+            - action: tts.say
+              args:
+                  text: It's ${summary} outside, your first event is ${output[0]['summary']}
+
+    """
+
+    @staticmethod
+    def _get_dependencies(steps, context):
+        """ Returns the indices of the steps each step depends on """
+        deps = []
+        last_barrier = None
+
+        for i, step in enumerate(steps):
+            is_barrier = not isinstance(step, Request) or \
+                step.action.startswith('procedure.') or step.action == 'utils.get_context'
+
+            if is_barrier:
+                step_deps = set(range(i))
+                last_barrier = i
+            else:
+                names = get_variables(step.action) | get_variables(step.args)
+                if names - {'output', 'errors'} - context.keys():
+                    step_deps = set(range(i))
+                elif names & {'output', 'errors'} and i > 0:
+                    step_deps = {i - 1}
+                else:
+                    step_deps = set()
+
+                if last_barrier is not None:
+                    step_deps.add(last_barrier)
+
+            deps.append(step_deps)
+
+        return deps
+
+    @staticmethod
+    def _get_ancestors(deps):
+        ancestors = []
+        for step_deps in deps:
+            step_ancestors = set(step_deps)
+            for dep in step_deps:
+                step_ancestors.update(ancestors[dep])
+            ancestors.append(step_ancestors)
+
+        return ancestors
+
+    @staticmethod
+    def _get_step_context(context, ancestors, responses):
+        step_context = dict(context)
+        response = None
+
+        for i in sorted(ancestors):
+            response = responses[i]
+            if response and isinstance(response.output, dict):
+                step_context.update(response.output)
+
+        if response:
+            step_context['output'] = response.output
+            step_context['errors'] = response.errors
+
+        return step_context
+
+    def _execute_step(self, step, n_tries, __stack__, **context):
+        if isinstance(step, Request):
+            token = Config.get('token')
+            if token:
+                step.token = token
+
+            context['_async'] = False
+            context['n_tries'] = n_tries
+            return step.execute(__stack__=list(__stack__), **context)
+
+        # Conditions, loops, statements and functional steps are run through
+        # the sequential logic, with this procedure on the stack
+        return Procedure(name=self.name, _async=False, requests=[step], backend=self.backend). \
+            execute(n_tries=n_tries, __stack__=__stack__, **context)
+
+    def execute(self, n_tries=1, __stack__=None, **context):
+        if not __stack__:
+            __stack__ = [self]
+        else:
+            __stack__.append(self)
+
+        if self.args:
+            args = self.args.copy()
+            for k, v in args.items():
+                v = Request.expand_value_from_context(v, **context)
+                args[k] = v
+                context[k] = v
+            logger.info('Executing procedure {} with arguments {}'.format(self.name, args))
+        else:
+            logger.info('Executing procedure {}'.format(self.name))
+
+        steps = self.requests
+        deps = self._get_dependencies(steps, context)
+        ancestors = self._get_ancestors(deps)
+        responses = [None] * len(steps)
+        done = set()
+        futures = {}
+        executor = get_executor()
+        should_stop = False
+
+        try:
+            while len(done) < len(steps) and not (should_stop or self._should_return):
+                for i, step in enumerate(steps):
+                    if i in done or i in futures or not deps[i] <= done:
+                        continue
+
+                    step_context = self._get_step_context(context, ancestors[i], responses)
+                    if isinstance(step, Request):
+                        # No deadline: the steps are waited for, a step expired in the queue would
+                        # abort the whole procedure. The context is bound through partial, so its
+                        # variables can't clash with the arguments of submit
+                        futures[i] = executor.submit(
+                            partial(self._execute_step, step, n_tries, __stack__, **step_context), timeout=0)
+                    else:
+                        # Barriers are run once all the previous steps are done
+                        response = self._execute_step(step, n_tries, __stack__, **step_context)
+                        if isinstance(step, Statement):
+                            # return/break/continue: stop executing the procedure
+                            should_stop = True
+                        else:
+                            responses[i] = response
+
+                        done.add(i)
+                        break
+
+                pending = [i for i in futures if i not in done]
+                if not pending:
+                    continue
+
+                # Run a step that no worker has picked up yet in the current
+                # thread rather than just waiting, so nested procedures can't
+                # exhaust the executor workers
+                stolen = next((i for i in pending if futures[i].cancel()), None)
+                if stolen is not None:
+                    step_context = self._get_step_context(context, ancestors[stolen], responses)
+                    responses[stolen] = self._execute_step(steps[stolen], n_tries, __stack__, **step_context)
+                    done.add(stolen)
+                    continue
+
+                wait([futures[i] for i in pending], return_when=FIRST_COMPLETED)
+                for i in pending:
+                    if futures[i].done():
+                        responses[i] = futures[i].result()
+                        done.add(i)
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+        return next((response for response in reversed(responses) if response), Response())
+
+
 def procedure(f):
     f.procedure = True
 
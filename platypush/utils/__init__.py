@@ -8,6 +8,7 @@ import re
 import signal
 import socket
 import ssl
+import threading
 import urllib.request
 
 logger = logging.getLogger(__name__)
@@ -23,9 +24,53 @@ def get_module_and_method_from_action(action):
     return module_name, method_name
 
 
+# Message and event type => class registries. They are populated either upon
+# pre-registration (register_message_class/register_event_class, event classes
+# are registered when they are defined, the types of the configured event hooks
+# are preloaded upon startup) or upon the first resolution of a type, so
+# deserializing messages on the hot path only involves a dict lookup.
+_message_classes = {}
+_event_classes = {}
+_classes_lock = threading.RLock()
+
+
+def register_message_class(msgtype, msgclass):
+    """
+    Registers the class associated to a message type.
+
+    :param msgtype: Message type (e.g. ``event``, ``request`` or ``response``)
+    :param msgclass: Message class
+    """
+
+    with _classes_lock:
+        _message_classes[msgtype] = msgclass
+
+
+def register_event_class(event_class, type=None):
+    """
+    Registers an event class.
+
+    :param event_class: Event class
+    :param type: Event type (default: ``<module>.<class name>``)
+    """
+
+    if type is None:
+        type = '{}.{}'.format(event_class.__module__, event_class.__name__)
+
+    with _classes_lock:
+        _event_classes[type] = event_class
+
+
 def get_message_class_by_type(msgtype):
     """ Gets the class of a message type given as string """
 
+    msgclass = _message_classes.get(msgtype)
+    if msgclass:
+        return msgclass
+
+    # The module is imported outside of the registry lock: the import lock
+    # already serializes concurrent imports, and the module may register its
+    # own classes upon import
     try:
         module = importlib.import_module('platypush.message.' + msgtype)
     except ImportError as e:
@@ -41,13 +86,39 @@ def get_message_class_by_type(msgtype):
             module.__name__, cls_name))
         raise RuntimeError(e)
 
-    return msgclass
+    with _classes_lock:
+        return _message_classes.setdefault(msgtype, msgclass)
 
 
 def get_event_class_by_type(type):
     """ Gets an event class by type name """
-    event_module = importlib.import_module('.'.join(type.split('.')[:-1]))
-    return getattr(event_module, type.split('.')[-1])
+
+    event_class = _event_classes.get(type)
+    if event_class:
+        return event_class
+
+    # Import outside of the registry lock, see get_message_class_by_type
+    module_name, cls_name = type.rsplit('.', 1)
+    event_module = importlib.import_module(module_name)
+    event_class = getattr(event_module, cls_name)
+
+    with _classes_lock:
+        return _event_classes.setdefault(type, event_class)
+
+
+def preload_event_classes(types):
+    """
+    Resolves and registers a list of event types in advance, e.g. upon startup.
+
+    :param types: Event types (e.g. ``platypush.message.event.ping.PingEvent``)
+    :type types: list[str]
+    """
+
+    for type in types:
+        try:
+            get_event_class_by_type(type)
+        except Exception as e:
+            logger.warning('Could not load event type {}: {}'.format(type, str(e)))
 
 
 def get_plugin_module_by_name(plugin_name):
@@ -149,6 +220,12 @@ def get_redis_queue_name_by_message(msg):
     return 'platypush/responses/{}'.format(msg.id) if msg.id else None
 
 
+def get_redis_response_channel(origin):
+    """ Returns the Redis pub/sub channel where the responses to the requests
+        with the given origin (e.g. ``http``) are published """
+    return 'platypush/responses/channel/{}'.format(origin)
+
+
 def _get_ssl_context(context_type=None, ssl_cert=None, ssl_key=None,
                      ssl_cafile=None, ssl_capath=None):
     if not context_type:
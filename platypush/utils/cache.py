@@ -0,0 +1,242 @@
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class SingleFlight(object):
+    """
+    Coalesces the concurrent calls of a function with the same key: the first
+    caller runs the function, while the callers that arrive before it has
+    completed wait for its result (or exception) instead of running it again.
+    """
+
+    def __init__(self):
+        # key -> future of the call in progress
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, func):
+        """
+        :param key: Key of the call (e.g. the action name and its arguments, see :meth:`ResponseCache.make_key`)
+        :param func: Function to be called
+        :returns: ``(result, shared)``, where ``shared`` is True if the result
+            comes from a call started by another thread.
+        """
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+
+        future.set_result(result)
+        return result, False
+
+
+class ResponseCache(object):
+    """
+    LRU cache of the responses of the plugin actions, with a time-to-live
+    per entry. Entries are grouped by namespace (the name of the plugin), so
+    all the cached responses of a plugin can be invalidated at once when it
+    runs an action that may change its state.
+
+    Concurrent calls for the same key that isn't cached yet are coalesced
+    (single-flight): the first caller runs the function while the others wait
+    for its result rather than running it again. The calls whose results
+    aren't cached can be coalesced as well, through :meth:`.coalesce`.
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        :param max_size: Maximum number of cached responses. The least recently
+            used entries are evicted when the cache is full (default: 1024)
+        """
+
+        self.max_size = max_size
+        # (namespace, key) -> (expiry time, value)
+        self._entries = OrderedDict()
+        self._single_flight = SingleFlight()
+        # Number of invalidations (global and per namespace), to discard the
+        # results of the calls that were in progress upon invalidation
+        self._generation = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(method, args=(), kwargs=None):
+        """
+        Builds the cache key of a call out of the method name and its
+        normalized arguments, so e.g. ``{"a": 1, "b": 2}`` and ``{"b": 2, "a": 1}``
+        map to the same entry.
+        """
+
+        return method + ':' + json.dumps([args, kwargs or {}], sort_keys=True, default=str)
+
+    def get(self, namespace, key):
+        """
+        :returns: ``(True, value)`` if the key is cached and not expired, ``(False, None)`` otherwise.
+        """
+
+        with self._lock:
+            return self._get(namespace, key)
+
+    def _get(self, namespace, key):
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return False, None
+
+        if entry[0] <= time.monotonic():
+            del self._entries[(namespace, key)]
+            return False, None
+
+        self._entries.move_to_end((namespace, key))
+        return True, entry[1]
+
+    def put(self, namespace, key, value, ttl):
+        with self._lock:
+            self._put(namespace, key, value, ttl)
+
+    def _put(self, namespace, key, value, ttl):
+        self._entries[(namespace, key)] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end((namespace, key))
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_run(self, namespace, key, ttl, func, cache_if=None):
+        """
+        Returns the cached value of a key, or runs ``func`` to compute it and
+        caches its result. If another thread is already computing the same
+        key the call waits for its result instead.
+
+        :param namespace: Namespace of the key (e.g. the plugin name)
+        :param key: Cache key, see :meth:`.make_key`
+        :param ttl: Time-to-live of the cached value, in seconds
+        :param func: Function that computes the value
+        :param cache_if: Optional predicate on the value, which isn't cached if it returns False
+        """
+
+        with self._lock:
+            found, value = self._get(namespace, key)
+            if found:
+                self.hits += 1
+                return value
+
+        def _run():
+            with self._lock:
+                generation = self._get_generation(namespace)
+
+            result = func()
+            with self._lock:
+                if self._get_generation(namespace) == generation and (cache_if is None or cache_if(result)):
+                    self._put(namespace, key, result, ttl)
+
+            return result
+
+        value, shared = self._single_flight.run((namespace, key), _run)
+        with self._lock:
+            if shared:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+
+        return value
+
+    def coalesce(self, namespace, key, func):
+        """
+        Runs ``func`` without caching its result, unless another thread is
+        already computing the same key, in which case the call waits for its
+        result instead.
+
+        :param namespace: Namespace of the key (e.g. the plugin name)
+        :param key: Key of the call, see :meth:`.make_key`
+        :param func: Function that computes the value
+        """
+
+        value, shared = self._single_flight.run((namespace, key), func)
+        if shared:
+            with self._lock:
+                self.coalesced += 1
+
+        return value
+
+    def _get_generation(self, namespace):
+        return self._generation, self._generations.get(namespace, 0)
+
+    def invalidate(self, namespace=None):
+        """
+        Removes the cached entries of a namespace, or all the entries if no
+        namespace is specified. The results of the calls in progress on the
+        namespace won't be cached either.
+        """
+
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._generation += 1
+                return
+
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+
+    def collect_metrics(self):
+        """ Returns the gauges of the cache, see :meth:`platypush.context.metrics.MetricsRegistry.register_collector` """
+        stats = self.get_stats()
+        return [
+            ('platypush_response_cache_entries', {}, stats['entries']),
+            ('platypush_response_cache_hits', {}, stats['hits']),
+            ('platypush_response_cache_misses', {}, stats['misses']),
+            ('platypush_response_cache_coalesced', {}, stats['coalesced']),
+            ('platypush_response_cache_evictions', {}, stats['evictions']),
+        ]
+
+    def get_stats(self):
+        """
+        :returns: The statistics of the cache, in the format::
+
+            {
+                "max_size": 1024,
+                "entries": 12,
+                "hits": 530,
+                "misses": 44,
+                "coalesced": 8,
+                "evictions": 0
+            }
+
+        """
+
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+            }
+
+
+# vim:sw=4:ts=4:et:
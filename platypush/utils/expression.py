@@ -0,0 +1,254 @@
+import ast
+import builtins
+import datetime
+import functools
+import json
+import logging
+import re
+
+from platypush.message import Message
+
+logger = logging.getLogger(__name__)
+
+_template_regex = re.compile('([^$]*)(\\${\\s*(.+?)\\s*})(.*)')
+
+# Characters that a string value should start with to be a Python literal
+_literal_prefixes = frozenset('-+.0123456789[{(\'"')
+_literal_names = {'True': True, 'False': False, 'None': None}
+_builtin_names = frozenset(dir(builtins))
+
+
+def coerce_value(value):
+    """
+    Converts a context value into the object that will be exposed to the
+    expressions: messages are converted to dictionaries and strings that
+    represent Python literals (e.g. ``'42'``, ``'[1, 2]'``, ``'True'``) are
+    converted to the respective objects. Any other value is returned as it is.
+    """
+
+    if isinstance(value, Message):
+        return json.loads(str(value))
+    if not isinstance(value, str):
+        return value
+
+    stripped = value.strip()
+    if stripped in _literal_names:
+        return _literal_names[stripped]
+    if not stripped or stripped[0] not in _literal_prefixes:
+        return value
+
+    try:
+        return ast.literal_eval(stripped)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return value
+
+
+class ExpressionContext(object):
+    """
+    Mapping of the variables that can be used in an expression. Values are
+    coerced through :func:`coerce_value` upon the first access, so variables
+    that aren't used by an expression have no cost.
+    """
+
+    def __init__(self, context=None, **kwargs):
+        self._context = dict(context or {}, **kwargs)
+        self._values = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        value = self._values[name] = coerce_value(self._context[name])
+        return value
+
+    def __setitem__(self, name, value):
+        self._context[name] = value
+        self._values.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._context
+
+    def update(self, context):
+        for name, value in context.items():
+            self[name] = value
+
+
+class Expression(object):
+    """
+    Python expression compiled once and evaluated against a context.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._code = compile(source.strip(), '<expression>', 'eval')
+        self._names = None
+
+    @property
+    def names(self):
+        """ Names of the variables referenced by the expression """
+        if self._names is None:
+            self._names = frozenset(
+                node.id for node in ast.walk(ast.parse(self.source.strip(), mode='eval'))
+                if isinstance(node, ast.Name)
+            )
+
+        return self._names
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def build(cls, source):
+        """ Returns the (cached) compiled expression for a source string """
+        return cls(source)
+
+    def evaluate(self, context=None, globals=None):
+        """
+        :param context: Variables available to the expression
+        :type context: :class:`ExpressionContext` or dict
+        :param globals: Global namespace of the expression (default: the builtins)
+        :type globals: dict
+        """
+
+        if not isinstance(context, ExpressionContext):
+            context = ExpressionContext(context)
+
+        if globals is None:
+            globals = {'__builtins__': builtins}
+        return eval(self._code, globals, context)
+
+
+class Template(object):
+    """
+    String containing ``${expression}`` placeholders. The string is parsed and
+    the expressions are compiled once, upon the first use of the template.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        # List of (prefix, placeholder, expression)
+        self.parts = []
+        self.suffix = ''
+        self._parse(template)
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def build(cls, template):
+        """ Returns the (cached) parsed template for a string """
+        return cls(template)
+
+    def _parse(self, value):
+        while value:
+            m = _template_regex.match(value)
+            if m and not m.group(1).endswith('\\'):
+                prefix, placeholder, source, value = m.groups()
+                try:
+                    expression = Expression.build(source)
+                except Exception as e:
+                    # The error will be reported when the template is expanded
+                    expression = e
+
+                self.parts.append((prefix, placeholder, expression))
+            else:
+                self.suffix = value
+                value = ''
+
+    @staticmethod
+    def _evaluate(placeholder, expression, context, globals):
+        try:
+            if isinstance(expression, Exception):
+                raise expression
+
+            value = expression.evaluate(context, globals)
+            if callable(value):
+                value = value()
+            if isinstance(value, range) or isinstance(value, tuple):
+                value = [*value]
+            if isinstance(value, datetime.date):
+                value = value.isoformat()
+        except Exception as e:
+            logger.exception(e)
+            value = placeholder
+
+        return value
+
+    def expand(self, context=None, globals=None):
+        """
+        Replaces the placeholders with the values of their expressions. If the
+        resulting string is valid JSON then its parsed value is returned.
+
+        :param context: Variables available to the expressions
+        :type context: :class:`ExpressionContext` or dict
+        :param globals: Global namespace of the expressions (default: the builtins)
+        :type globals: dict
+        """
+
+        if not isinstance(context, ExpressionContext):
+            context = ExpressionContext(context)
+
+        value = ''
+        for prefix, placeholder, expression in self.parts:
+            expr_value = self._evaluate(placeholder, expression, context, globals)
+            value += prefix + (
+                json.dumps(expr_value)
+                if isinstance(expr_value, list) or isinstance(expr_value, dict)
+                else str(expr_value)
+            )
+
+        value += self.suffix
+
+        # noinspection PyBroadException
+        try:
+            return json.loads(value)
+        except Exception:
+            return value
+
+
+def get_variables(value):
+    """
+    Returns the names of the variables referenced by the ``${expression}``
+    placeholders in a value, including the strings nested in lists and
+    dictionaries. Builtins are not included.
+    """
+
+    names = set()
+    if isinstance(value, dict):
+        for item in value.values():
+            names.update(get_variables(item))
+    elif isinstance(value, list):
+        for item in value:
+            names.update(get_variables(item))
+    elif isinstance(value, str) and '$' in value:
+        for _, _, expression in Template.build(value).parts:
+            if not isinstance(expression, Exception):
+                names.update(expression.names)
+
+    return names - _builtin_names
+
+
+def expand_value(value, context=None, globals=None):
+    """
+    Expands the ``${expression}`` placeholders in a value against a context.
+    Values that aren't strings are returned as they are.
+
+    :param value: Value to be expanded
+    :param context: Variables available to the expressions
+    :type context: :class:`ExpressionContext` or dict
+    :param globals: Global namespace of the expressions (default: the builtins)
+    :type globals: dict
+    """
+
+    if not isinstance(value, str):
+        return value
+
+    if '$' not in value:
+        # noinspection PyBroadException
+        try:
+            return json.loads(value)
+        except Exception:
+            return value
+
+    return Template.build(value).expand(context, globals)
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler(object):
+    """
+    Records how long the components of the application (backends, plugins,
+    event hooks, bus, cron scheduler etc.) take to be imported and
+    initialized upon startup, and formats the timings into a report.
+
+    Import times include the time spent importing the dependencies of each
+    component module, as ``python -X importtime`` does for cumulative times,
+    but the report only covers the platypush component tree.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.start_time = time.time()
+        # component -> {phase -> seconds}
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, component, phase):
+        """
+        Measures the time spent in a block of code::
+
+            with profiler.measure('backend.http', 'import'):
+                importlib.import_module('platypush.backend.http')
+
+        :param component: Component name (e.g. ``backend.http`` or ``plugin.light.hue``)
+        :param phase: Startup phase (e.g. ``import`` or ``init``)
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                phases = self.timings.setdefault(component, {})
+                phases[phase] = phases.get(phase, 0) + elapsed
+
+    def report(self, title='Startup timings'):
+        """
+        :returns: The timings of the components as a table, sorted by total time.
+        """
+
+        with self._lock:
+            timings = {component: dict(phases) for component, phases in self.timings.items()}
+
+        phases = []
+        for component_phases in timings.values():
+            for phase in component_phases:
+                if phase not in phases:
+                    phases.append(phase)
+
+        rows = sorted(timings.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        width = max([len(component) for component in timings] + [len('component')])
+
+        lines = [
+            '{} (elapsed since start: {:.3f}s)'.format(title, time.time() - self.start_time),
+            '  '.join(['{:<{}}'.format('component', width)] +
+                      ['{:>10}'.format(phase) for phase in phases] + ['{:>10}'.format('total')]),
+        ]
+
+        for component, component_phases in rows:
+            lines.append('  '.join(
+                ['{:<{}}'.format(component, width)] +
+                ['{:>9.3f}s'.format(component_phases[phase]) if phase in component_phases else '{:>10}'.format('-')
+                 for phase in phases] +
+                ['{:>9.3f}s'.format(sum(component_phases.values()))]
+            ))
+
+        return '\n'.join(lines)
+
+    def log_report(self, title='Startup timings'):
+        if not self.enabled:
+            return
+
+        for line in self.report(title=title).split('\n'):
+            logger.info(line)
+
+
+# Profiler of the current application, if startup profiling is enabled
+profiler = StartupProfiler(enabled=False)
+
+
+def warmup_plugins(plugins):
+    """
+    Initializes a list of plugins, so the first request to each of them won't
+    pay for its import and initialization.
+
+    :param plugins: Names of the plugins
+    :type plugins: list[str]
+    """
+
+    from platypush.context import get_plugin
+
+    for plugin in plugins:
+        # noinspection PyBroadException
+        try:
+            get_plugin(plugin)
+        except Exception as e:
+            logger.warning('Could not initialize plugin {}: {}'.format(plugin, str(e)))
+
+    logger.info('Plugins warmup completed')
+    profiler.log_report(title='Plugins warmup timings')
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,377 @@
+import asyncio
+import enum
+import fnmatch
+import logging
+import threading
+import time
+
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class SlowClientPolicy(enum.Enum):
+    """ What to do with the messages for a client whose send queue is full """
+
+    # Drop the oldest queued message
+    DROP_OLDEST = 'drop_oldest'
+    # Replace the queued message of the same kind (e.g. the previous event of
+    # the same type for the same device or sensor), or drop the oldest one if
+    # there's none
+    COALESCE = 'coalesce'
+
+
+class EventFilter(object):
+    """
+    Filter on the events sent to a websocket client. It matches the events
+    whose type (or any of the parent types) matches a glob pattern, and
+    whose arguments match the specified values. The string values can also
+    be glob patterns. Examples::
+
+        # All the music events
+        {"type": "platypush.message.event.music.*"}
+
+        # The package prefix can be omitted
+        {"type": "music.*"}
+
+        # Sensor events for the temperature
+        {"type": "sensor.*", "args": {"name": "temperature"}}
+
+    """
+
+    _event_package = 'platypush.message.event.'
+
+    # event class -> types of the class and of its parent event classes
+    _types = {}
+
+    def __init__(self, type='*', args=None):
+        """
+        :param type: Glob pattern on the event type (default: any event)
+        :param args: Values or glob patterns that the arguments of the event must match
+        """
+
+        if not type.startswith(self._event_package):
+            type = self._event_package + type
+
+        self.type = type
+        self.args = args or {}
+
+    @classmethod
+    def build(cls, event_filter):
+        """
+        Builds a filter out of a dictionary in the format ``{"type": <pattern>, "args": {...}}``,
+        or out of a string with the type pattern.
+        """
+
+        if isinstance(event_filter, cls):
+            return event_filter
+        if isinstance(event_filter, str):
+            return cls(type=event_filter)
+
+        assert isinstance(event_filter, dict), 'Invalid event filter: {}'.format(event_filter)
+        return cls(type=event_filter.get('type', '*'), args=event_filter.get('args'))
+
+    @classmethod
+    def _get_types(cls, event_class):
+        types = cls._types.get(event_class)
+        if types is None:
+            types = cls._types[event_class] = [
+                '{}.{}'.format(c.__module__, c.__name__)
+                for c in event_class.__mro__
+                if c.__module__.startswith('platypush.message.event')
+            ]
+
+        return types
+
+    def matches(self, event):
+        if not any(fnmatch.fnmatchcase(t, self.type) for t in self._get_types(event.__class__)):
+            return False
+
+        event_args = getattr(event, 'args', {})
+        for name, value in self.args.items():
+            if name not in event_args:
+                return False
+
+            if isinstance(value, str):
+                if not fnmatch.fnmatchcase(str(event_args[name]), value):
+                    return False
+            elif event_args[name] != value:
+                return False
+
+        return True
+
+
+class _Client(object):
+    def __init__(self, ws, queue_size):
+        self.ws = ws
+        # host:port, so multiple clients on the same host are told apart
+        remote_address = getattr(ws, 'remote_address', None)
+        self.address = '{}:{}'.format(*remote_address[:2]) if remote_address else '<unknown client {}>'.format(id(ws))
+        # (key, data, enqueue time)
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.ready = asyncio.Event()
+        # None to receive all the messages
+        self.filters = None
+        self.task = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+
+class WebsocketBroadcaster(object):
+    """
+    Fans out messages (e.g. events) to the clients connected to a websocket
+    server. It runs on the event loop of the server: each message is
+    serialized once, appended to a bounded send queue per client, and sent by
+    a task per client, so a slow or stuck client doesn't delay the other
+    clients nor the thread that broadcasts the message.
+
+    Clients can subscribe to a subset of the events (see :meth:`.subscribe`),
+    so they don't receive, and the server doesn't serialize, the events they
+    are not interested in.
+
+    When the queue of a client is full the messages are either dropped or
+    coalesced, see :class:`SlowClientPolicy`, and a client that doesn't
+    receive a message within ``send_timeout`` seconds is disconnected.
+    """
+
+    # Event arguments that identify the entity (device, sensor, player...) an
+    # event refers to, so the events for different entities aren't coalesced
+    _entity_args = ('id', 'device', 'device_id', 'host', 'port', 'address', 'name', 'source', 'plugin',
+                    'player', 'reader', 'group', 'node', 'topic', 'tag_id')
+
+    def __init__(self, name=None, queue_size=100, policy=SlowClientPolicy.DROP_OLDEST, send_timeout=10.0):
+        """
+        :param name: Name of the websocket server (e.g. ``http:8009``), used to label its metrics
+            when multiple servers run in the same process (default: None)
+        :param queue_size: Maximum number of messages queued for each client (default: 100)
+        :param policy: What to do with the messages for a client whose queue is full,
+            ``drop_oldest`` (default) or ``coalesce``, see :class:`SlowClientPolicy`
+        :param send_timeout: Timeout in seconds for a message to be sent to a client before
+            the client is disconnected (default: 10)
+        """
+
+        self.name = name
+        self.queue_size = queue_size
+        self.policy = SlowClientPolicy(policy)
+        self.send_timeout = send_timeout
+        self.loop = None
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def add_client(self, ws):
+        """ Registers a client. It must be called from the event loop of the websocket server. """
+        if self.loop is None:
+            self.loop = asyncio.get_event_loop()
+
+        client = _Client(ws, self.queue_size)
+        client.task = asyncio.ensure_future(self._send_loop(client))
+        with self._lock:
+            self._clients[ws] = client
+
+    def remove_client(self, ws):
+        """ Unregisters a client. It must be called from the event loop of the websocket server. """
+        with self._lock:
+            client = self._clients.pop(ws, None)
+
+        if client and client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def subscribe(self, ws, filters=None):
+        """
+        Sets the events that a client will receive.
+
+        :param ws: Client websocket
+        :param filters: List of :class:`EventFilter` objects or their definitions, or None to
+            receive all the events (default)
+        """
+
+        filters = [EventFilter.build(f) for f in filters] if filters is not None else None
+        with self._lock:
+            client = self._clients.get(ws)
+            if client:
+                client.filters = filters
+
+    def handle_subscription(self, ws, msg):
+        """
+        Handles the subscription messages sent by a client, in the format::
+
+            # Receive only the music events and the temperature sensor events
+            {
+                "type": "subscribe",
+                "events": [
+                    {"type": "music.*"},
+                    {"type": "sensor.*", "args": {"name": "temperature"}}
+                ]
+            }
+
+            # Receive all the events again
+            {"type": "unsubscribe"}
+
+        :param ws: Client websocket
+        :param msg: Message received from the client (parsed JSON)
+        :returns: True if the message was a subscription message
+        """
+
+        if not isinstance(msg, dict) or msg.get('type') not in ('subscribe', 'unsubscribe'):
+            return False
+
+        if msg['type'] == 'subscribe':
+            self.subscribe(ws, msg.get('events') or [])
+        else:
+            self.subscribe(ws, None)
+
+        return True
+
+    def get_clients(self):
+        with self._lock:
+            return list(self._clients.keys())
+
+    def broadcast(self, msg, key=None):
+        """
+        Sends a message to all the connected clients. It can be called from any thread.
+
+        :param msg: Message (e.g. an event, or any object that can be converted to string)
+        :param key: Kind of the message, used to coalesce the messages for the slow clients
+            (default: the type of the message plus the arguments that identify the entity
+            it refers to, if any, e.g. ``device`` or ``source``)
+        """
+
+        if self.loop is None:
+            return
+
+        with self._lock:
+            clients = list(self._clients.values())
+
+        # The filters only apply to the events
+        is_event = hasattr(msg, 'args') and msg.__class__.__module__.startswith('platypush.message.event')
+        clients = [
+            client for client in clients
+            if client.filters is None or not is_event or any(f.matches(msg) for f in client.filters)
+        ]
+
+        if not clients:
+            return
+
+        if key is None:
+            key = self._get_key(msg)
+
+        self.loop.call_soon_threadsafe(self._enqueue, clients, str(msg), key, time.time())
+
+    @classmethod
+    def _get_key(cls, msg):
+        key = '{}.{}'.format(msg.__class__.__module__, msg.__class__.__name__)
+        args = getattr(msg, 'args', None)
+        if isinstance(args, dict):
+            entity = ['{}={}'.format(arg, args[arg]) for arg in cls._entity_args if arg in args]
+            if entity:
+                key += '[' + ','.join(entity) + ']'
+
+        return key
+
+    def _enqueue(self, clients, data, key, timestamp):
+        for client in clients:
+            if client.task is None or client.task.done():
+                # The client has disconnected in the meantime
+                continue
+
+            if len(client.queue) >= client.queue_size:
+                replaced = False
+                if self.policy == SlowClientPolicy.COALESCE:
+                    for i, (queued_key, _, _) in enumerate(client.queue):
+                        if queued_key == key:
+                            del client.queue[i]
+                            client.coalesced += 1
+                            replaced = True
+                            break
+
+                if not replaced:
+                    client.queue.popleft()
+                    client.dropped += 1
+
+            client.queue.append((key, data, timestamp))
+            client.ready.set()
+
+    async def _send_loop(self, client):
+        while True:
+            await client.ready.wait()
+            client.ready.clear()
+
+            while client.queue:
+                _, data, timestamp = client.queue.popleft()
+                try:
+                    await asyncio.wait_for(client.ws.send(data), timeout=self.send_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.info('Disconnecting websocket client {}: {}'.format(
+                        client.address, str(e) or e.__class__.__name__))
+                    self.remove_client(client.ws)
+                    await client.ws.close()
+                    return
+
+                client.sent += 1
+                client.lag = time.time() - timestamp
+                client.max_lag = max(client.max_lag, client.lag)
+
+    def collect_metrics(self):
+        """ Returns the gauges of the clients, see :meth:`platypush.context.metrics.MetricsRegistry.register_collector` """
+        stats = self.get_stats()
+        labels = {'server': self.name} if self.name else {}
+        return [
+            ('platypush_websocket_clients', labels, len(stats)),
+            *[('platypush_websocket_client_queue_depth', {**labels, 'client': s['address']}, s['queued'])
+              for s in stats],
+            *[('platypush_websocket_client_lag_seconds', {**labels, 'client': s['address']}, s['lag'])
+              for s in stats],
+        ]
+
+    def get_stats(self):
+        """
+        :returns: The status of the connected clients, in the format::
+
+            [
+                {
+                    "address": "192.168.1.10:51234",
+                    "queued": 0,
+                    "sent": 1024,
+                    "dropped": 12,
+                    "coalesced": 0,
+                    "lag": 0.002,
+                    "max_lag": 1.5
+                }
+            ]
+
+        """
+
+        with self._lock:
+            clients = list(self._clients.values())
+
+        now = time.time()
+        stats = []
+
+        for client in clients:
+            lag = client.lag
+            try:
+                # The lag of a client with queued messages is the age of the oldest one
+                lag = max(lag, now - client.queue[0][2])
+            except IndexError:
+                pass
+
+            stats.append({
+                'address': client.address,
+                'queued': len(client.queue),
+                'sent': client.sent,
+                'dropped': client.dropped,
+                'coalesced': client.coalesced,
+                'lag': lag,
+                'max_lag': max(client.max_lag, lag),
+            })
+
+        return stats
+
+
+# vim:sw=4:ts=4:et:
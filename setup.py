@@ -149,6 +149,8 @@ setup(
     ],
 
     extras_require={
+        # Support for the msgpack codec on the Redis bus
+        'msgpack': ['msgpack'],
         # Support for thread custom name
         'threadname': ['python-prctl'],
         # Support for Kafka backend and plugin
@@ -159,6 +161,8 @@ setup(
         'http': ['flask', 'python-dateutil', 'tz', 'frozendict', 'bcrypt'],
         # Support for uWSGI HTTP backend
         'uwsgi': ['flask', 'python-dateutil', 'tz', 'frozendict', 'uwsgi', 'bcrypt'],
+        # Support for the asynchronous /execute endpoint of the HTTP backend
+        'http-async': ['aiohttp'],
         # Support for database
         'db': ['sqlalchemy'],
         # Support for MQTT backends
@@ -0,0 +1,93 @@
+"""
+Compares the throughput (messages/sec) and the peak RSS of the main bus when
+processing each message in a new thread versus processing them over a
+:class:`platypush.bus.pool.BusWorkerPool`.
+
+Each mode is measured in a separate process, as the peak RSS can't be reset.
+Usage::
+
+    python -m tests.benchmarks.bench_bus [--messages 20000] [--handler-time 0.001]
+
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from ..context import platypush
+
+from platypush.bus import Bus
+from platypush.bus.pool import BusWorkerPool
+from platypush.message.event.ping import PingEvent
+
+
+def run(mode, n_messages, handler_time, pool_size):
+    processed = 0
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def on_message(msg):
+        nonlocal processed
+        if not isinstance(msg, PingEvent):
+            return
+
+        # Simulate some I/O-bound processing
+        time.sleep(handler_time)
+        with lock:
+            processed += 1
+            if processed == n_messages:
+                done.set()
+
+    worker_pool = BusWorkerPool(pool_size=pool_size, queue_size=n_messages) if mode == 'pool' else None
+    bus = Bus(on_message=on_message, worker_pool=worker_pool)
+    messages = [PingEvent(message=str(i)) for i in range(n_messages)]
+
+    start = time.time()
+    for msg in messages:
+        bus.post(msg)
+
+    bus.stop()
+    bus.poll()
+    done.wait()
+    elapsed = time.time() - start
+
+    return {
+        'mode': mode,
+        'messages': n_messages,
+        'elapsed': elapsed,
+        'messages_per_sec': n_messages / elapsed,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=['thread', 'pool'], default=None)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--handler-time', type=float, default=0.001)
+    parser.add_argument('--pool-size', type=int, default=16)
+    opts = parser.parse_args()
+
+    if opts.mode:
+        print(json.dumps(run(opts.mode, opts.messages, opts.handler_time, opts.pool_size)))
+        return
+
+    for mode in ['thread', 'pool']:
+        output = subprocess.check_output([
+            sys.executable, '-m', __spec__.name, '--mode', mode,
+            '--messages', str(opts.messages), '--handler-time', str(opts.handler_time),
+            '--pool-size', str(opts.pool_size)])
+
+        result = json.loads(output.decode().strip().split('\n')[-1])
+        print('{mode:>6}: {messages_per_sec:10.1f} msg/s, peak RSS {peak_rss_kb} kB'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,103 @@
+"""
+Measures how many events per second the :class:`platypush.event.processor.EventProcessor`
+can match against a large number of event hooks, with the indexed dispatch
+compared to a linear scan of all the hooks.
+
+Usage::
+
+    python -m tests.benchmarks.bench_event_processor [--hooks 1000] [--events 10000]
+
+"""
+
+import argparse
+import random
+import time
+
+from ..context import platypush
+
+from platypush.event.hook import EventHook
+from platypush.event.processor import EventProcessor
+from platypush.message.event.ping import PingEvent
+from platypush.message.event.sensor import SensorDataChangeEvent
+from platypush.message.event.stt import SpeechDetectedEvent
+
+
+class LinearEventProcessor(EventProcessor):
+    """ Event processor that evaluates all the hooks against each event """
+
+    def get_candidate_hooks(self, event):
+        return self.hooks
+
+
+def build_hooks(n_hooks):
+    hooks = {}
+    for i in range(n_hooks):
+        if i % 10 == 0:
+            condition = {
+                'type': 'platypush.message.event.stt.SpeechDetectedEvent',
+                'speech': 'turn on the ${{room}} lights {}'.format(i),
+            }
+        elif i % 2:
+            condition = {
+                'type': 'platypush.message.event.sensor.SensorDataChangeEvent',
+                'data': i,
+            }
+        else:
+            condition = {
+                'type': 'platypush.message.event.ping.PingEvent',
+                'message': i,
+            }
+
+        hooks['hook_{}'.format(i)] = {
+            'if': condition,
+            'then': {'action': 'shell.exec', 'args': {'cmd': 'true'}},
+        }
+
+    return hooks
+
+
+def build_events(n_events, n_hooks):
+    events = []
+    for i in range(n_events):
+        value = random.randint(0, n_hooks)
+        if i % 100 == 0:
+            event = SpeechDetectedEvent(speech='turn on the living room lights {}'.format(value))
+        elif i % 2:
+            event = SensorDataChangeEvent(data=value)
+        else:
+            event = PingEvent(message=value)
+
+        event.disable_web_clients_notification = True
+        events.append(event)
+
+    return events
+
+
+def run(processor, events):
+    start = time.time()
+    for event in events:
+        processor.process_event(event)
+    return len(events) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hooks', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=10000)
+    opts = parser.parse_args()
+
+    # Only measure the dispatch, not the execution of the hooks
+    EventHook.run = lambda *_, **__: None
+
+    events = build_events(opts.events, opts.hooks)
+    linear = run(LinearEventProcessor(hooks=build_hooks(opts.hooks)), events)
+    indexed = run(EventProcessor(hooks=build_hooks(opts.hooks)), events)
+    print(' linear: {:10.1f} events/s'.format(linear))
+    print('indexed: {:10.1f} events/s'.format(indexed))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim:sw=4:ts=4:et:
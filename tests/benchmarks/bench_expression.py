@@ -0,0 +1,150 @@
+"""
+Compares the expansion of the ``${expression}`` placeholders in the requests
+and the evaluation of the procedure conditions through the compiled
+expression engine against the previous ``exec``/``eval`` implementation.
+
+Usage::
+
+    python -m tests.benchmarks.bench_expression [--iterations 20000]
+
+"""
+
+import argparse
+import datetime
+import json
+import re
+import time
+
+from ..context import platypush
+
+from platypush.message import Message
+from platypush.message.request import Request
+from platypush.utils.expression import Expression, ExpressionContext
+
+
+# noinspection PyBroadException
+def legacy_expand_value_from_context(_value, **context):
+    for (k, v) in context.items():
+        if isinstance(v, Message):
+            v = json.loads(str(v))
+        try:
+            exec('{}={}'.format(k, v))
+        except:
+            if isinstance(v, str):
+                try:
+                    exec('{}="{}"'.format(k, re.sub('(^|[^\\\\])"', '\1\\"', v)))
+                except:
+                    pass
+
+    parsed_value = ''
+    if not isinstance(_value, str):
+        parsed_value = _value
+
+    while _value and isinstance(_value, str):
+        m = re.match('([^$]*)(\\${\\s*(.+?)\\s*})(.*)', _value)
+        if m and not m.group(1).endswith('\\'):
+            prefix = m.group(1)
+            expr = m.group(2)
+            inner_expr = m.group(3)
+            _value = m.group(4)
+
+            try:
+                context_value = eval(inner_expr)
+
+                if callable(context_value):
+                    context_value = context_value()
+                if isinstance(context_value, range) or isinstance(context_value, tuple):
+                    context_value = [*context_value]
+                if isinstance(context_value, datetime.date):
+                    context_value = context_value.isoformat()
+            except Exception:
+                context_value = expr
+
+            parsed_value += prefix + (
+                json.dumps(context_value)
+                if isinstance(context_value, list) or isinstance(context_value, dict)
+                else str(context_value)
+            )
+        else:
+            parsed_value += _value
+            _value = ''
+
+    try:
+        return json.loads(parsed_value)
+    except:
+        return parsed_value
+
+
+# noinspection PyBroadException
+def legacy_eval_condition(condition, **context):
+    for (k, v) in context.items():
+        try:
+            exec('{}={}'.format(k, v))
+        except:
+            if isinstance(v, str):
+                try:
+                    exec('{}="{}"'.format(k, re.sub('(^|[^\\\\])"', '\1\\"', v)))
+                except:
+                    pass
+
+    return eval(condition)
+
+
+context = {
+    'output': {'temperature': 18.5, 'sensors': [{'name': 'kitchen'}, {'name': 'bedroom'}]},
+    'errors': [],
+    'name': 'living room',
+    'threshold': '20',
+    'enabled': 'True',
+    'constants': {'max_brightness': 255},
+}
+
+templates = [
+    '${output["temperature"]}',
+    'Turn on the ${name} lights',
+    '${output["sensors"][0]["name"]}',
+    '${int(threshold) + 1}',
+    '${constants["max_brightness"]}',
+    'plain value',
+]
+
+conditions = [
+    'output["temperature"] < int(threshold)',
+    'enabled and name == "living room"',
+    'len(output["sensors"]) > 1',
+]
+
+
+def run(iterations, expand, evaluate):
+    start = time.time()
+    for _ in range(iterations):
+        for template in templates:
+            expand(template, **context)
+        for condition in conditions:
+            evaluate(condition, **context)
+    return iterations / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=20000)
+    opts = parser.parse_args()
+
+    def evaluate(condition, **ctx):
+        return Expression.build(condition).evaluate(ExpressionContext(ctx))
+
+    for template in templates:
+        assert legacy_expand_value_from_context(template, **context) == \
+            Request.expand_value_from_context(template, **context), template
+
+    legacy = run(opts.iterations, legacy_expand_value_from_context, legacy_eval_condition)
+    compiled = run(opts.iterations, Request.expand_value_from_context, evaluate)
+    print('  legacy: {:10.1f} iterations/s'.format(legacy))
+    print('compiled: {:10.1f} iterations/s'.format(compiled))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,76 @@
+"""
+Measures the throughput of :meth:`platypush.message.Message.build` when the
+message and event types are resolved through the class registry, compared to
+the previous behaviour of importing the module of the type on each call.
+
+Usage::
+
+    python -m tests.benchmarks.bench_message_build [--messages 50000]
+
+"""
+
+import argparse
+import importlib
+import time
+
+from ..context import platypush
+
+import platypush.message.event as event_module
+import platypush.utils as utils
+
+from platypush.message import Message
+from platypush.message.event.ping import PingEvent
+from platypush.message.request import Request
+from platypush.message.response import Response
+
+
+def legacy_get_message_class_by_type(msgtype):
+    module = importlib.import_module('platypush.message.' + msgtype)
+    return getattr(module, msgtype[0].upper() + msgtype[1:])
+
+
+def legacy_get_event_class_by_type(type):
+    event_module = importlib.import_module('.'.join(type.split('.')[:-1]))
+    return getattr(event_module, type.split('.')[-1])
+
+
+def run(messages):
+    start = time.time()
+    for msg in messages:
+        Message.build(msg)
+    return len(messages) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=50000)
+    opts = parser.parse_args()
+
+    templates = [
+        str(PingEvent(message='ping')),
+        str(Request.build({'type': 'request', 'target': 'localhost', 'action': 'ping.ping'})),
+        str(Response(output={'status': 'ok'})),
+    ]
+
+    messages = [templates[i % len(templates)] for i in range(opts.messages)]
+    registry = (utils.get_message_class_by_type, utils.get_event_class_by_type,
+                event_module.get_event_class_by_type)
+
+    try:
+        utils.get_message_class_by_type = legacy_get_message_class_by_type
+        utils.get_event_class_by_type = event_module.get_event_class_by_type = legacy_get_event_class_by_type
+        before = run(messages)
+    finally:
+        utils.get_message_class_by_type, utils.get_event_class_by_type, \
+            event_module.get_event_class_by_type = registry
+
+    after = run(messages)
+    print(' before: {:10.1f} msg/s'.format(before))
+    print('  after: {:10.1f} msg/s'.format(after))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,106 @@
+from .context import platypush
+
+import threading
+import unittest
+
+from platypush.bus.pool import BusWorkerPool
+from platypush.message.event.ping import PingEvent
+from platypush.message.event.sensor import SensorDataChangeEvent
+from platypush.message.request import Request
+
+
+class TestBusWorkerPool(unittest.TestCase):
+    """ Tests the lanes and the backpressure policies of the bus worker pool """
+
+    def test_requests_before_events(self):
+        pool = BusWorkerPool(pool_size=1, queue_size=10)
+        event = PingEvent(message='ping')
+        request = Request(target='localhost', action='shell.exec')
+
+        pool.put(event)
+        pool.put(request)
+        self.assertIs(pool._get(), request)
+        self.assertIs(pool._get(), event)
+
+    def test_drop_oldest(self):
+        pool = BusWorkerPool(pool_size=1, queue_size=2, backpressure='drop_oldest')
+        events = [PingEvent(message=str(i)) for i in range(3)]
+        for event in events:
+            self.assertTrue(pool.put(event))
+
+        self.assertEqual(pool.dropped, 1)
+        self.assertIs(pool._get(), events[1])
+        self.assertIs(pool._get(), events[2])
+
+    def test_drop_event_type(self):
+        pool = BusWorkerPool(pool_size=1, queue_size=2, backpressure='drop_event_type',
+                             drop_event_types=['platypush.message.event.sensor.SensorDataChangeEvent'])
+
+        ping = PingEvent(message='ping')
+        sensor_events = [SensorDataChangeEvent(data=i) for i in range(2)]
+        pool.put(ping)
+        pool.put(sensor_events[0])
+
+        # The queued sensor event is dropped to make room
+        self.assertTrue(pool.put(sensor_events[1]))
+        self.assertEqual(pool.dropped, 1)
+
+        # Lane full of non-droppable events: the incoming droppable event is discarded
+        pool = BusWorkerPool(pool_size=1, queue_size=1, backpressure='drop_event_type',
+                             drop_event_types=['platypush.message.event.sensor.SensorDataChangeEvent'])
+        pool.put(ping)
+        self.assertFalse(pool.put(sensor_events[0]))
+
+    def test_requests_never_dropped(self):
+        pool = BusWorkerPool(pool_size=1, queue_size=1, backpressure='drop_oldest')
+        requests = [Request(target='localhost', action='shell.exec') for _ in range(2)]
+        pool.put(requests[0])
+
+        # The priority lane is full: the second request waits for a free slot
+        producer = threading.Thread(target=pool.put, args=(requests[1],))
+        producer.start()
+        producer.join(0.1)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(pool.dropped, 0)
+
+        self.assertIs(pool._get(), requests[0])
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertIs(pool._get(), requests[1])
+
+    def test_full_event_lane_does_not_block_requests(self):
+        pool = BusWorkerPool(pool_size=1, queue_size=1)
+        pool.put(PingEvent(message='ping'))
+        self.assertTrue(pool.put(Request(target='localhost', action='shell.exec')))
+
+    def test_reject_after_stop(self):
+        pool = BusWorkerPool(pool_size=1, queue_size=1)
+        pool.put(PingEvent(message='ping'))
+        pool.stop()
+        self.assertFalse(pool.put(PingEvent(message='pong')))
+        self.assertEqual(len(pool._lanes[pool.EVENT_LANE]), 1)
+
+    def test_process_messages(self):
+        processed = []
+        done = threading.Event()
+
+        def handler(msg):
+            processed.append(msg)
+            if len(processed) == 10:
+                done.set()
+
+        pool = BusWorkerPool(pool_size=4, queue_size=2)
+        pool.start(handler)
+        for i in range(10):
+            pool.put(PingEvent(message=str(i)))
+
+        self.assertTrue(done.wait(5))
+        pool.stop(wait=True)
+        self.assertEqual(len(processed), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# vim:sw=4:ts=4:et:
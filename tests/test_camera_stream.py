@@ -0,0 +1,85 @@
+from .context import platypush
+
+import threading
+import time
+import unittest
+
+from platypush.backend.http.app.streaming import CameraStream
+
+
+class MockOutput:
+    def __init__(self):
+        self.frame = None
+        self.ready = threading.Condition()
+
+
+class MockCamera:
+    opened = 0
+    closed = 0
+
+    def __init__(self):
+        self.warmup_frames = 2
+        self._output = None
+        self._running = False
+        self._thread = None
+
+    def _capture(self):
+        i = 0
+        while self._running:
+            with self._output.ready:
+                self._output.frame = 'frame-{}'.format(i).encode()
+                self._output.ready.notify_all()
+            i += 1
+            time.sleep(0.01)
+
+    def get_stream(self):
+        return self._output
+
+    def __enter__(self):
+        MockCamera.opened += 1
+        self._output = MockOutput()
+        self._running = True
+        self._thread = threading.Thread(target=self._capture)
+        self._thread.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._running = False
+        self._thread.join()
+        MockCamera.closed += 1
+
+
+class TestCameraStream(unittest.TestCase):
+    """ Tests the sharing of a capture device across several viewers """
+
+    def test_shared_capture(self):
+        stream = CameraStream('test', MockCamera, buffer_size=5)
+        viewers = [stream.frames(), stream.frames()]
+
+        frames = [[next(viewer) for _ in range(10)] for viewer in viewers]
+        self.assertEqual(MockCamera.opened, 1)
+        # The warmup frames are discarded
+        self.assertNotIn(b'frame-0', frames[0] + frames[1])
+
+        # The latest frame is served without opening the device again
+        self.assertTrue(stream.get_frame().startswith(b'frame-'))
+        self.assertEqual(MockCamera.opened, 1)
+        self.assertEqual(stream.viewers, 2)
+
+        for viewer in viewers:
+            viewer.close()
+
+        time.sleep(0.5)
+        self.assertEqual(stream.viewers, 0)
+        self.assertEqual(MockCamera.closed, 1)
+
+        # A snapshot with no viewers opens and closes the device
+        self.assertTrue(stream.get_frame().startswith(b'frame-'))
+        time.sleep(0.5)
+        self.assertEqual(MockCamera.opened, 2)
+        self.assertEqual(MockCamera.closed, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,111 @@
+from .context import platypush
+
+import os
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from unittest.mock import patch
+
+from platypush.config import Config
+
+
+class TestConfigCache(unittest.TestCase):
+    """ Tests the reuse and the invalidation of the compiled configuration cache """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.workdir = os.path.join(self.tmpdir.name, 'workdir')
+        self.cfgfile = os.path.join(self.tmpdir.name, 'config.yaml')
+        self.include = os.path.join(self.tmpdir.name, 'include.yaml')
+        scripts_dir = os.path.join(self.tmpdir.name, 'scripts')
+
+        os.makedirs(scripts_dir)
+        self._write(os.path.join(scripts_dir, 'cached_procedures.py'), '''
+            from platypush.procedure import procedure
+
+            @procedure
+            def cached_procedure(**context):
+                return True
+        ''')
+
+        # Script without procedures nor hooks, imported for its side effects
+        self._write(os.path.join(scripts_dir, 'side_effects.py'), '''
+            import os
+            os.environ['PLATYPUSH_TEST_SIDE_EFFECTS'] = '1'
+        ''')
+
+        self._write(self.cfgfile, '''
+            include: include.yaml
+            workdir: {}
+
+            procedure.greet:
+                - action: shell.exec
+                  args:
+                      cmd: echo hello
+        '''.format(self.workdir))
+
+        self._write(self.include, '''
+            event.hook.OnPing:
+                if:
+                    type: platypush.message.event.ping.PingEvent
+                then:
+                    - action: shell.exec
+                      args:
+                          cmd: echo ping
+        ''')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        sys.modules.pop('side_effects', None)
+        os.environ.pop('PLATYPUSH_TEST_SIDE_EFFECTS', None)
+
+    @staticmethod
+    def _write(path, content):
+        with open(path, 'w') as f:
+            f.write(textwrap.dedent(content))
+
+    def _load(self):
+        with patch.object(Config, '_workdir_location', self.workdir):
+            return Config(self.cfgfile, use_cache=True)
+
+    def test_cache(self):
+        config = self._load()
+        self.assertIn('cached_procedures.cached_procedure', config.procedures)
+        self.assertIn('OnPing', config.event_hooks)
+
+        # The cached configuration contains the token: only the owner can read it
+        self.assertEqual(os.stat(config._cache.path).st_mode & 0o777, stat.S_IRUSR | stat.S_IWUSR)
+
+        sys.modules.pop('side_effects', None)
+        os.environ.pop('PLATYPUSH_TEST_SIDE_EFFECTS', None)
+
+        with patch.object(Config, '_read_config_file', side_effect=AssertionError('Cache not used')):
+            cached_config = self._load()
+
+        self.assertEqual(cached_config.procedures.keys(), config.procedures.keys())
+        self.assertEqual(cached_config.event_hooks, config.event_hooks)
+        # All the script modules are imported, also on a cache hit
+        self.assertEqual(os.environ.get('PLATYPUSH_TEST_SIDE_EFFECTS'), '1')
+
+        self._write(self.include, '''
+            event.hook.OnPong:
+                if:
+                    type: platypush.message.event.ping.PingEvent
+                then:
+                    - action: shell.exec
+                      args:
+                          cmd: echo pong
+        ''')
+
+        config = self._load()
+        self.assertNotIn('OnPing', config.event_hooks)
+        self.assertIn('OnPong', config.event_hooks)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,95 @@
+from .context import platypush
+
+import os
+import tempfile
+import textwrap
+import unittest
+
+import platypush.config
+
+from platypush import Daemon
+from platypush.config import Config
+from platypush.event.processor import EventProcessor
+
+
+class TestConfigReload(unittest.TestCase):
+    """ Tests the detection of the configuration changes upon reload """
+
+    config = '''
+        backend.http:
+            port: 8123
+
+        shell:
+            timeout: 10
+
+        event.hook.OnPing:
+            if:
+                type: platypush.message.event.ping.PingEvent
+            then:
+                action: shell.exec
+                args:
+                    cmd: echo ping
+    '''
+
+    def setUp(self):
+        self.default_config = platypush.config._default_config_instance
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cfgfile = os.path.join(self.tmpdir.name, 'config.yaml')
+        self._write(self.config)
+        Config.init(self.cfgfile)
+
+    def tearDown(self):
+        platypush.config._default_config_instance = self.default_config
+        self.tmpdir.cleanup()
+
+    def _write(self, content):
+        with open(self.cfgfile, 'w') as f:
+            f.write(textwrap.dedent(content))
+
+    def test_reload(self):
+        daemon = Daemon.__new__(Daemon)
+        daemon.event_processor = EventProcessor()
+        Config.add_reload_listener(daemon._reload_event_hooks)
+
+        self._write(self.config.replace('timeout: 10', 'timeout: 20').replace('echo ping', 'echo pong') + '''
+        event.hook.OnPong:
+            if:
+                type: platypush.message.event.ping.PingEvent
+            then:
+                action: shell.exec
+        ''')
+
+        try:
+            changes = Config.reload()
+        finally:
+            Config.remove_reload_listener(daemon._reload_event_hooks)
+
+        self.assertEqual(changes.plugins['changed'], ['shell'])
+        self.assertEqual(changes.event_hooks, {'added': ['OnPong'], 'changed': ['OnPing'], 'removed': []})
+        self.assertFalse(any(changes.backends.values()))
+        self.assertEqual(Config.get_plugins()['shell'], {'timeout': 20})
+        self.assertEqual(sorted(hook.name for hook in daemon.event_processor.hooks), ['OnPing', 'OnPong'])
+
+        hook = [h for h in daemon.event_processor.hooks if h.name == 'OnPing'][0]
+        self.assertEqual(hook.actions.requests[0].args, {'cmd': 'echo pong'})
+        self.assertFalse(Config.reload())
+
+    def test_reload_included_files(self):
+        include_file = os.path.join(self.tmpdir.name, 'include.yaml')
+        with open(include_file, 'w') as f:
+            f.write('ping:\n    enabled: True\n')
+
+        self._write(self.config + '\n        include: include.yaml\n')
+        Config.reload()
+        self.assertEqual(Config.get_config_files(), [self.cfgfile, include_file])
+
+        # The files that are no longer included aren't reported anymore
+        self._write(self.config)
+        Config.reload()
+        self.assertEqual(Config.get_config_files(), [self.cfgfile])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
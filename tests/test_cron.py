@@ -0,0 +1,150 @@
+from .context import platypush
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest.mock import patch
+
+from platypush.context.executor import Executor
+from platypush.cron.db import CronjobStore
+from platypush.cron.scheduler import CronScheduler, Cronjob, CronjobState
+from platypush.procedure import Procedure
+
+
+class TestCron(unittest.TestCase):
+    """ Tests the cron scheduler and the missed runs policies """
+
+    def test_scheduler(self):
+        runs = []
+
+        with patch.object(Procedure, 'execute', lambda proc, **_: runs.append(proc.name)):
+            scheduler = CronScheduler(jobs={
+                'job_{}'.format(i): {'cron_expression': '* * * * * *', 'actions': []}
+                for i in range(100)
+            })
+
+            scheduler.start()
+            time.sleep(1.5)
+            scheduler.stop()
+            scheduler.join()
+
+        self.assertGreaterEqual(len(runs), 100)
+        self.assertGreaterEqual(scheduler.get_job('job_0').runs, 1)
+        self.assertIsNotNone(scheduler.get_job('job_0').last_duration)
+
+    def test_missed_runs(self):
+        now = time.time()
+        job = Cronjob('skip', '* * * * *', [], start_time=now - 3600)
+        self.assertGreater(job.schedule_next(now=now), now)
+        self.assertEqual(job.missed, 60)
+
+        job = Cronjob('catch_up', '* * * * *', [], missed_runs='catch_up', start_time=now - 3600)
+        self.assertEqual(job.schedule_next(now=now), now)
+        self.assertEqual(job.missed, 60)
+        self.assertGreater(job.schedule_next(now=now), now)
+
+    def test_queued_run(self):
+        # The only worker is busy for longer than the executor deadline
+        executor = Executor(pool_size=1, timeout=0.05)
+        started = threading.Event()
+        release = threading.Event()
+        executor.submit(lambda: started.set() or release.wait())
+        started.wait()
+
+        with patch('platypush.cron.scheduler.get_executor', return_value=executor), \
+                patch.object(Procedure, 'execute', lambda proc, **_: None):
+            scheduler = CronScheduler(jobs={'job': {'cron_expression': '* * * * *', 'actions': []}})
+            job = scheduler.get_job('job')
+            self.assertTrue(scheduler.trigger_job('job'))
+            time.sleep(0.1)
+            release.set()
+            executor.stop(wait=True)
+
+        # The queued run isn't discarded after the deadline
+        self.assertEqual(job.runs, 1)
+        self.assertEqual(job.state, CronjobState.DONE)
+
+    def test_failed_dispatch(self):
+        executor = Executor(pool_size=1)
+        executor.stop()
+
+        with patch('platypush.cron.scheduler.get_executor', return_value=executor):
+            scheduler = CronScheduler(jobs={'job': {'cron_expression': '* * * * *', 'actions': []}})
+            scheduler.trigger_job('job')
+
+        # The job isn't left in running state if it can't be submitted
+        self.assertEqual(scheduler.get_job('job').state, CronjobState.ERROR)
+        self.assertEqual(scheduler.get_job('job').missed, 0)
+
+    def test_stored_jobs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = CronjobStore('sqlite:///' + os.path.join(tmpdir, 'cron.db'))
+            scheduler = CronScheduler(jobs={}, store=store)
+            scheduler.add_job('poll', {
+                'cron_expression': '* * * * * */5',
+                'actions': [{'action': 'shell.exec', 'args': {'cmd': 'echo poll'}}],
+                'until': time.time() + 3600,
+            }, persistent=True)
+
+            scheduler.add_job('expired', {
+                'cron_expression': '* * * * *',
+                'actions': [],
+                'until': time.time() - 1,
+            }, persistent=True)
+
+            scheduler.pause_job('poll')
+            self.assertIsNone(scheduler.get_job('expired'))
+            self.assertEqual(list(store.get_jobs().keys()), ['poll'])
+
+            # A new scheduler loads the stored jobs, including their state
+            scheduler = CronScheduler(jobs={}, store=store)
+            scheduler._load_stored_jobs()
+            job = scheduler.get_job('poll')
+            self.assertTrue(job.paused and job.persistent)
+            self.assertIsNone(job.to_dict()['next_run'])
+
+            scheduler.resume_job('poll')
+            self.assertGreater(job.to_dict()['next_run'], time.time() - 1)
+            self.assertFalse(store.get_jobs()['poll']['paused'])
+
+            scheduler.remove_job('poll')
+            self.assertEqual(store.get_jobs(), {})
+
+    def test_stored_job_overrides(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = CronjobStore('sqlite:///' + os.path.join(tmpdir, 'cron.db'))
+            scheduler = CronScheduler(jobs={}, store=store)
+            for name in ['job', 'transient']:
+                scheduler.add_job(name, {'cron_expression': '* * * * *', 'actions': []}, persistent=True)
+
+            # Replacing a stored job with a non-persistent one removes it from the store
+            scheduler.add_job('transient', {'cron_expression': '*/5 * * * *', 'actions': []})
+            self.assertEqual(list(store.get_jobs().keys()), ['job'])
+
+            # A configured job replaces the stored job with the same name
+            scheduler.update_jobs({'job': {'cron_expression': '*/2 * * * *', 'actions': []}})
+            job = scheduler.get_job('job')
+            self.assertEqual(job.cron_expression, '*/2 * * * *')
+            self.assertFalse(job.persistent)
+
+    def test_invalid_job(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = CronjobStore('sqlite:///' + os.path.join(tmpdir, 'cron.db'))
+            scheduler = CronScheduler(jobs={}, store=store)
+            scheduler.add_job('job', {'cron_expression': '* * * * *', 'actions': []}, persistent=True)
+
+            # An invalid job doesn't replace the stored job with the same name
+            with self.assertRaises(Exception):
+                scheduler.add_job('job', {'cron_expression': 'not a cron', 'actions': []}, persistent=True)
+
+            self.assertEqual(store.get_jobs()['job']['cron_expression'], '* * * * *')
+            self.assertEqual(scheduler.get_job('job').cron_expression, '* * * * *')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -25,6 +25,20 @@ class TestEventParse(unittest.TestCase):
         result = event.matches_condition(self.condition)
         self.assertFalse(result.is_match)
 
+    def test_multi_token_argument(self):
+        condition = EventCondition.build({
+            'type': 'platypush.message.event.ping.PingEvent',
+            'message': 'Turn on the ${lights} lights'
+        })
+
+        event = PingEvent(message='Hey dude turn on the living room lights')
+        result = event.matches_condition(condition)
+        self.assertTrue(result.is_match)
+        self.assertEqual(result.score, 5.0)
+        self.assertEqual(result.parsed_args['lights'], 'living room')
+        # The parsed arguments are also available on the event
+        self.assertEqual(event.args['lights'], 'living room')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+from .context import platypush
+
+import unittest
+
+from platypush.event.hook import EventHook
+from platypush.event.processor import EventProcessor
+from platypush.message.event import Event
+from platypush.message.event.ping import PingEvent
+from platypush.message.event.sensor import SensorDataChangeEvent
+
+
+class TestEventProcessor(unittest.TestCase):
+    def setUp(self):
+        self.processor = EventProcessor(hooks={
+            'on_any_event': {
+                'if': {'type': 'platypush.message.event.Event'},
+                'then': {'action': 'shell.exec', 'args': {'cmd': 'true'}},
+            },
+            'on_ping_1': {
+                'if': {'type': 'platypush.message.event.ping.PingEvent', 'message': 1},
+                'then': {'action': 'shell.exec', 'args': {'cmd': 'true'}},
+            },
+            'on_ping_2': {
+                'if': {'type': 'platypush.message.event.ping.PingEvent', 'message': 2},
+                'then': {'action': 'shell.exec', 'args': {'cmd': 'true'}},
+            },
+            'on_ping_text': {
+                'if': {'type': 'platypush.message.event.ping.PingEvent', 'message': 'hello ${name}'},
+                'then': {'action': 'shell.exec', 'args': {'cmd': 'true'}},
+            },
+        })
+
+    def get_candidates(self, event):
+        return [hook.name for hook in self.processor.get_candidate_hooks(event)]
+
+    def test_candidates_by_event_class(self):
+        self.assertEqual(self.get_candidates(SensorDataChangeEvent(data=1)), ['on_any_event'])
+        self.assertEqual(self.get_candidates(Event()), ['on_any_event'])
+
+    def test_candidates_by_argument_value(self):
+        self.assertEqual(self.get_candidates(PingEvent(message=2)),
+                         ['on_any_event', 'on_ping_2', 'on_ping_text'])
+        self.assertEqual(self.get_candidates(PingEvent(message=3)),
+                         ['on_any_event', 'on_ping_text'])
+        self.assertEqual(self.get_candidates(PingEvent(message='hello')),
+                         ['on_any_event', 'on_ping_1', 'on_ping_2', 'on_ping_text'])
+
+    def test_add_remove_hook(self):
+        hook = EventHook.build(name='on_sensor', hook={
+            'if': {'type': 'platypush.message.event.sensor.SensorDataChangeEvent'},
+            'then': {'action': 'shell.exec', 'args': {'cmd': 'true'}},
+        })
+
+        self.processor.add_hook(hook)
+        self.assertEqual(self.get_candidates(SensorDataChangeEvent(data=1)), ['on_any_event', 'on_sensor'])
+        self.assertIs(self.processor.remove_hook('on_sensor'), hook)
+        self.assertEqual(self.get_candidates(SensorDataChangeEvent(data=1)), ['on_any_event'])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
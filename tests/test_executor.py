@@ -0,0 +1,113 @@
+from .context import platypush
+
+import threading
+import time
+import unittest
+
+from platypush.context.executor import Executor
+
+
+class TestExecutor(unittest.TestCase):
+    """ Tests the concurrency limits and the deadlines of the executor """
+
+    def test_submit(self):
+        executor = Executor(pool_size=2)
+        futures = [executor.submit(lambda x: x * 2, i) for i in range(10)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [i * 2 for i in range(10)])
+        self.assertLessEqual(executor.get_stats()['workers'], 2)
+        executor.stop(wait=True)
+
+    def test_idle_worker_taken(self):
+        executor = Executor(pool_size=4)
+        executor.submit(lambda: None).result(timeout=5)
+        while not executor.get_stats()['idle_workers']:
+            time.sleep(0.01)
+
+        # The second task must not wait for the idle worker woken by the first one
+        start = time.time()
+        executor.submit(time.sleep, 1)
+        started = executor.submit(time.time).result(timeout=5)
+        self.assertLess(started - start, 0.5)
+        self.assertEqual(executor.get_stats()['workers'], 2)
+        executor.stop(wait=True)
+
+    def test_concurrency_limit(self):
+        executor = Executor(pool_size=8, concurrency={'serial': 1})
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+
+        def task():
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        futures = [executor.submit(task, key='serial') for _ in range(10)]
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(max_running, 1)
+        self.assertEqual(executor.get_stats()['running'], {})
+        self.assertEqual(executor.get_stats()['parked'], {})
+        executor.stop(wait=True)
+
+    def test_reentrant_limit(self):
+        executor = Executor(pool_size=2, concurrency={'serial': 1})
+
+        def task():
+            with executor.limit('serial'):
+                return True
+
+        self.assertTrue(executor.submit(task, key='serial').result(timeout=5))
+        executor.stop(wait=True)
+
+    def test_deadline(self):
+        executor = Executor(pool_size=1, concurrency={'serial': 1})
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_task():
+            started.set()
+            release.wait()
+
+        executor.submit(blocking_task, key='serial')
+        started.wait()
+        future = executor.submit(lambda: None, key='serial', timeout=0.01)
+        time.sleep(0.05)
+        release.set()
+
+        self.assertRaises(TimeoutError, future.result, 5)
+        self.assertEqual(executor.get_stats()['expired'], 1)
+        executor.stop(wait=True)
+
+    def test_expired_callbacks_run_without_lock(self):
+        executor = Executor(pool_size=1)
+        started = threading.Event()
+        release = threading.Event()
+        stats = []
+
+        def blocking_task():
+            started.set()
+            release.wait()
+
+        executor.submit(blocking_task)
+        started.wait()
+        future = executor.submit(lambda: None, timeout=0.01)
+        # A callback calling back into the executor must not deadlock
+        future.add_done_callback(lambda _: stats.append(executor.get_stats()))
+        time.sleep(0.05)
+        release.set()
+
+        self.assertRaises(TimeoutError, future.result, 5)
+        self.assertEqual(stats[0]['expired'], 1)
+        executor.stop(wait=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
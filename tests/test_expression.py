@@ -0,0 +1,42 @@
+from .context import platypush
+
+import unittest
+
+from platypush.message.request import Request
+from platypush.utils.expression import Expression, ExpressionContext, Template
+
+
+class TestExpression(unittest.TestCase):
+    context = {
+        'output': {'temperature': 18.5, 'sensors': ['kitchen', 'bedroom']},
+        'name': 'living room',
+        'threshold': '20',
+        'enabled': 'True',
+    }
+
+    def test_expand_value(self):
+        self.assertEqual(Request.expand_value_from_context('${output["temperature"]}', **self.context), 18.5)
+        self.assertEqual(Request.expand_value_from_context('${output["sensors"]}', **self.context),
+                         ['kitchen', 'bedroom'])
+        self.assertEqual(Request.expand_value_from_context('Turn on the ${name} lights', **self.context),
+                         'Turn on the living room lights')
+        self.assertEqual(Request.expand_value_from_context('${threshold + 1}', **self.context), 21)
+        self.assertEqual(Request.expand_value_from_context('\\${name}', **self.context), '\\${name}')
+        self.assertEqual(Request.expand_value_from_context('${range(2)}', **self.context), [0, 1])
+
+    def test_condition(self):
+        self.assertTrue(Expression.build('output["temperature"] < threshold').evaluate(self.context))
+        self.assertTrue(Expression.build('enabled and name == "living room"').evaluate(self.context))
+
+    def test_cached_template(self):
+        self.assertIs(Template.build('Hello ${name}'), Template.build('Hello ${name}'))
+        context = ExpressionContext(self.context)
+        self.assertEqual(Template.build('Hello ${name}').expand(context), 'Hello living room')
+        context['name'] = 'kitchen'
+        self.assertEqual(Template.build('Hello ${name}').expand(context), 'Hello kitchen')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,63 @@
+from .context import platypush
+
+import base64
+import unittest
+
+from unittest.mock import patch
+
+from platypush.backend.http import HttpBackend
+from platypush.backend.http.app import application
+from platypush.config import Config
+
+
+class TestHttpAuth(unittest.TestCase):
+    """ Tests the authentication of the HTTP routes """
+
+    def setUp(self):
+        get_config = Config.get
+        token_patcher = patch('platypush.backend.http.app.utils.Config.get',
+                              side_effect=lambda key: 'secret' if key == 'token' else get_config(key))
+        user_manager_patcher = patch('platypush.backend.http.app.utils.UserManager')
+
+        token_patcher.start()
+        user_manager = user_manager_patcher.start().return_value
+        self.addCleanup(token_patcher.stop)
+        self.addCleanup(user_manager_patcher.stop)
+
+        user_manager.get_user_count.return_value = 1
+        user_manager.authenticate_user.return_value = None
+
+    def test_authentication_required(self):
+        response = application.test_client().post('/execute', json={'type': 'request', 'action': 'shell.exec'})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response.headers)
+
+    def test_websocket_user_authentication(self):
+        class Websocket:
+            def __init__(self, **headers):
+                self.request_headers = headers
+
+        msgs = [{'type': 'request', 'action': 'shell.exec'}]
+        credentials = 'Basic ' + base64.b64encode(b'user:password').decode()
+
+        with patch('platypush.backend.http.Config.get', return_value=None), \
+                patch('platypush.backend.http.UserManager') as user_manager:
+            user_manager = user_manager.return_value
+            user_manager.get_user_count.return_value = 1
+            user_manager.authenticate_user.side_effect = \
+                lambda username, password: username if password == 'password' else None
+            user_manager.authenticate_user_session.side_effect = \
+                lambda session_token: ('user', None) if session_token == 'session' else (None, None)
+
+            self.assertTrue(HttpBackend._authenticate_websocket_message(Websocket(Authorization=credentials), '/', msgs))
+            self.assertTrue(HttpBackend._authenticate_websocket_message(Websocket(), '/?session_token=session', msgs))
+            self.assertTrue(HttpBackend._authenticate_websocket_message(
+                Websocket(Cookie='session_token=session'), '/', msgs))
+            self.assertFalse(HttpBackend._authenticate_websocket_message(Websocket(), '/?session_token=invalid', msgs))
+            self.assertFalse(HttpBackend._authenticate_websocket_message(Websocket(), '/', msgs))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,33 @@
+from .context import platypush
+
+import json
+import unittest
+
+from platypush.message import Message
+from platypush.message.request import Request
+from platypush.message.response import Response
+
+
+class TestMessage(unittest.TestCase):
+    """ Tests the serialization of the messages """
+
+    def test_serialized_cache(self):
+        request = Message.build({'type': 'request', 'target': 'localhost', 'action': 'shell.exec'})
+        self.assertIsInstance(request, Request)
+        self.assertIs(str(request), str(request))
+
+        # The cached serialization is invalidated when an attribute is set
+        request.token = 'secret'
+        self.assertEqual(json.loads(str(request))['token'], 'secret')
+
+        response = Response(id=request.id, output={'value': 1})
+        serialized = str(response)
+        response.errors = ['error']
+        self.assertNotEqual(str(response), serialized)
+        self.assertEqual(Message.build(str(response)).errors, ['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,53 @@
+from .context import platypush
+
+import unittest
+
+from unittest.mock import patch
+
+from platypush.context.metrics import MetricsRegistry
+from platypush.message.request import Request
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram(self):
+        metrics = MetricsRegistry()
+        for value in (0.002, 0.02, 2):
+            metrics.observe('platypush_action_duration_seconds', value, action='ping.ping')
+
+        histogram = metrics.get_stats()['histograms'][0]
+        self.assertEqual(histogram['labels'], {'action': 'ping.ping'})
+        self.assertEqual(histogram['count'], 3)
+        self.assertEqual(histogram['buckets']['0.0025'], 1)
+        self.assertEqual(histogram['buckets']['0.025'], 2)
+        self.assertEqual(histogram['buckets']['+Inf'], 3)
+
+    def test_prometheus(self):
+        metrics = MetricsRegistry()
+        metrics.observe('platypush_action_duration_seconds', 0.1, action='ping.ping')
+        metrics.inc('platypush_bus_messages_expired_total', type='event')
+        metrics.register_collector(lambda: [('platypush_executor_queue_depth', {}, 4)])
+
+        text = metrics.to_prometheus()
+        self.assertIn('# TYPE platypush_action_duration_seconds histogram', text)
+        self.assertIn('platypush_action_duration_seconds_bucket{action="ping.ping",le="0.1"} 1', text)
+        self.assertIn('platypush_action_duration_seconds_count{action="ping.ping"} 1', text)
+        self.assertIn('platypush_bus_messages_expired_total{type="event"} 1', text)
+        self.assertIn('platypush_executor_queue_depth 4', text)
+
+    def test_unknown_actions(self):
+        metrics = MetricsRegistry()
+        with patch('platypush.message.request.metrics', metrics), \
+                patch.object(Request, '_send_response'):
+            for action in ('shell.exec', 'shell.foo', 'shell.bar'):
+                request = Request.build({'type': 'request', 'target': 'localhost', 'action': action,
+                                         'args': {'cmd': 'true'}})
+                request.execute(_async=False)
+
+        labels = [histogram['labels']['action'] for histogram in metrics.get_stats()['histograms']]
+        self.assertEqual(sorted(labels), ['other', 'shell.exec'])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,85 @@
+from .context import platypush
+
+import threading
+import time
+import unittest
+
+from unittest.mock import patch
+
+from platypush.context.executor import Executor
+from platypush.message.request import Request
+from platypush.message.response import Response
+from platypush.procedure import DagProcedure
+
+
+class TestDagProcedure(unittest.TestCase):
+    """ Tests the dependency graph and the parallel execution of the DAG procedures """
+
+    requests = [
+        {'action': 'weather.get_current_weather'},
+        {'action': 'calendar.get_upcoming_events', 'args': {'max_results': '${n}'}},
+        {'action': 'tts.say', 'args': {'text': '${summary}, ${len(events)} events'}},
+        {'action': 'shell.exec', 'args': {'cmd': 'echo ${output}'}},
+    ]
+
+    def _build(self):
+        return DagProcedure.build(name='test', _async=False, requests=self.requests,
+                                  args={'n': 3}, procedure_class=DagProcedure)
+
+    def test_dependencies(self):
+        proc = self._build()
+        self.assertEqual(DagProcedure._get_dependencies(proc.requests, {'n': 3}),
+                         [set(), set(), {0, 1}, {2}])
+
+    def test_execute(self):
+        running = set()
+        overlaps = []
+        lock = threading.Lock()
+
+        def execute(request, **context):
+            args = {k: Request.expand_value_from_context(v, **context) for k, v in request.args.items()}
+            with lock:
+                running.add(request.action)
+                overlaps.append(set(running))
+
+            time.sleep(0.2)
+            with lock:
+                running.discard(request.action)
+
+            if request.action == 'weather.get_current_weather':
+                return Response(output={'summary': 'Clear'})
+            if request.action == 'calendar.get_upcoming_events':
+                return Response(output={'events': [None] * int(args['max_results'])})
+            return Response(output=args.get('text', args.get('cmd')))
+
+        with patch.object(Request, 'execute', execute):
+            response = self._build().execute()
+
+        self.assertIn({'weather.get_current_weather', 'calendar.get_upcoming_events'}, overlaps)
+        self.assertEqual(response.output, 'echo Clear, 3 events')
+
+    def test_queued_steps(self):
+        # A single worker and a deadline shorter than the steps: the queued
+        # steps are waited for, not expired
+        executor = Executor(pool_size=1, timeout=0.01)
+        executor.submit(time.sleep, 0.08)
+        requests = [{'action': 'shell.exec', 'args': {'cmd': 'echo {}'.format(i)}} for i in range(4)]
+
+        def execute(request, **context):
+            time.sleep(0.05)
+            return Response(output=request.args['cmd'])
+
+        with patch.object(Request, 'execute', execute), \
+                patch('platypush.procedure.get_executor', return_value=executor):
+            response = DagProcedure.build(name='test', _async=False, requests=requests,
+                                          procedure_class=DagProcedure).execute()
+
+        self.assertEqual(response.output, 'echo 3')
+        self.assertEqual(executor.get_stats()['expired'], 0)
+        executor.stop(wait=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,77 @@
+from .context import platypush
+
+import unittest
+
+from unittest import mock
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from platypush.bus.redis_stream import RedisStreamBus
+from platypush.message.event import StopEvent
+from platypush.message.event.ping import PingEvent
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestRedisStreamBus(unittest.TestCase):
+    """ Tests the delivery, acknowledgement and reclaim of messages on the Redis Streams bus """
+
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        patcher = mock.patch('platypush.bus.redis.get_redis',
+                             lambda *args, **kwargs: fakeredis.FakeRedis(server=server))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _get_bus(consumer_name, **kwargs):
+        bus = RedisStreamBus(consumer_name=consumer_name, **kwargs)
+        bus._block_timeout = 0.01
+        return bus
+
+    def test_consumers_share_the_stream(self):
+        bus1 = self._get_bus('worker-1', batch_size=2)
+        bus2 = self._get_bus('worker-2', batch_size=2)
+
+        for i in range(4):
+            bus1.post(PingEvent(message=str(i)))
+
+        msgs = [bus1.get(), bus2.get(), bus1.get(), bus2.get()]
+        self.assertEqual(sorted(msg.args['message'] for msg in msgs), ['0', '1', '2', '3'])
+        self.assertIsNone(bus2.get())
+
+        for msg in msgs[::2]:
+            bus1.ack(msg)
+        for msg in msgs[1::2]:
+            bus2.ack(msg)
+
+        self.assertEqual(bus1.redis.xpending(bus1.stream, bus1.consumer_group)['pending'], 0)
+
+    def test_reclaim_pending_messages(self):
+        crashed = self._get_bus('crashed')
+        crashed.post(PingEvent(message='ping'))
+        self.assertEqual(crashed.get().args['message'], 'ping')
+
+        # The message was never acknowledged: another consumer reclaims it
+        survivor = self._get_bus('survivor', claim_timeout=0)
+        msg = survivor.get()
+        self.assertEqual(msg.args['message'], 'ping')
+        survivor.ack(msg)
+        self.assertEqual(survivor.redis.xpending(survivor.stream, survivor.consumer_group)['pending'], 0)
+
+    def test_stop_is_local(self):
+        bus1 = self._get_bus('worker-1')
+        bus2 = self._get_bus('worker-2')
+        bus1.stop()
+
+        self.assertIsInstance(bus1.get(), StopEvent)
+        self.assertIsNone(bus2.get())
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# vim:sw=4:ts=4:et:
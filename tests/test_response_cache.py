@@ -0,0 +1,122 @@
+from .context import platypush
+
+import threading
+import time
+import unittest
+
+from unittest.mock import patch
+
+from platypush.message.request import Request
+from platypush.plugins import Plugin, action
+
+
+class MockPlugin(Plugin):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.volume = 50
+
+    @action(cache_ttl=60)
+    def status(self, **_):
+        self.calls += 1
+        time.sleep(0.1)
+        return {'volume': self.volume}
+
+    @action(idempotent=True)
+    def get_volume(self):
+        self.calls += 1
+        time.sleep(0.1)
+        return self.volume
+
+    @action
+    def set_volume(self, volume):
+        self.volume = volume
+
+
+class TestResponseCache(unittest.TestCase):
+    """ Tests the cache of the responses of the plugin actions """
+
+    def test_cache(self):
+        plugin = MockPlugin()
+        responses = []
+        threads = [
+            threading.Thread(target=lambda: responses.append(plugin.run('status', a=1, b=2)))
+            for _ in range(10)
+        ]
+
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Concurrent calls are coalesced, and each caller gets its own response
+        self.assertEqual(plugin.calls, 1)
+        self.assertEqual(len({id(response) for response in responses}), 10)
+        self.assertEqual(plugin.run('status', b=2, a=1).output, {'volume': 50})
+        self.assertEqual(plugin.calls, 1)
+
+        plugin.run('status', a=2)
+        self.assertEqual(plugin.calls, 2)
+
+        # Mutating actions invalidate the cached responses of the plugin
+        plugin.run('set_volume', volume=80)
+        self.assertEqual(plugin.run('status', a=1, b=2).output, {'volume': 80})
+        self.assertEqual(plugin.calls, 3)
+
+    def test_invalidation(self):
+        plugin = MockPlugin()
+        plugin.run('status').output['volume'] = 0
+
+        # Idempotent actions don't invalidate the cache, and the callers can't
+        # change the cached output
+        plugin.run('get_volume')
+        self.assertEqual(plugin.run('status').output, {'volume': 50})
+        self.assertEqual(plugin.calls, 2)
+
+        # A new instance of the plugin (e.g. after a reconfiguration) doesn't
+        # reuse the responses cached by the previous one
+        plugin = MockPlugin()
+        plugin.volume = 80
+        self.assertEqual(plugin.run('status').output, {'volume': 80})
+
+    def test_coalesced_requests(self):
+        plugin = MockPlugin()
+        requests = [Request(target='localhost', action='mock.get_volume') for _ in range(10)]
+        responses = {}
+
+        def send_response(request, response):
+            responses[request.id] = response
+
+        with patch('platypush.message.request.get_plugin', lambda name, **_: plugin if name == 'mock' else None), \
+                patch.object(Request, '_send_response', send_response):
+            threads = [threading.Thread(target=request.execute, kwargs={'_async': False}) for request in requests]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(plugin.calls, 1)
+        self.assertEqual(len({id(response) for response in responses.values()}), 10)
+        self.assertEqual(set(responses.keys()), {request.id for request in requests})
+        self.assertTrue(all(response.output == 50 for response in responses.values()))
+
+    def test_disabled_coalescing(self):
+        cache_config = {'actions': {MockPlugin.__module__ + '.get_volume': 0}}
+        with patch('platypush.plugins.Config.get', lambda key, *_: cache_config if key == 'cache' else None):
+            plugin = MockPlugin()
+
+        # A TTL of 0 in the configuration disables both the cache and the coalescing
+        self.assertFalse(plugin.is_idempotent('get_volume'))
+        threads = [threading.Thread(target=plugin.run, args=('get_volume',)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(plugin.calls, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,169 @@
+from .context import platypush
+
+import asyncio
+import os
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+import platypush.backend.http.app.utils
+
+from platypush.backend.http.app.multiplexer import ResponseMultiplexer
+from platypush.message.response import Response
+from platypush.utils import get_redis_response_channel
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestResponseMultiplexer(unittest.TestCase):
+    """ Tests the dispatch of the responses received over pub/sub to the waiting requests """
+
+    def test_dispatch(self):
+        server = fakeredis.FakeServer()
+        redis = fakeredis.FakeRedis(server=server)
+        channel = get_redis_response_channel('http')
+        multiplexer = ResponseMultiplexer(redis=fakeredis.FakeRedis(server=server), channel=channel)
+
+        futures = {str(i): multiplexer.register(str(i)) for i in range(50)}
+        results = {}
+
+        def wait(msg_id):
+            results[msg_id] = multiplexer.wait(msg_id, futures[msg_id], timeout=5)
+
+        threads = [threading.Thread(target=wait, args=(msg_id,)) for msg_id in futures]
+        for t in threads:
+            t.start()
+        for i in reversed(range(1, 50)):
+            redis.publish(channel, str(Response(id=str(i), output=i)))
+
+        # Response published while the listener wasn't subscribed, fetched from
+        # the queue of the request upon reconnection
+        redis.rpush('platypush/responses/0', str(Response(id='0', output=0)))
+        multiplexer._catch_up()
+
+        for t in threads:
+            t.join()
+
+        self.assertEqual({msg_id: response.output for msg_id, response in results.items()},
+                         {str(i): i for i in range(50)})
+        self.assertIsNone(multiplexer.wait('missing', multiplexer.register('missing'), timeout=0.1))
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'os.fork is not available')
+    def test_fork(self):
+        server = fakeredis.FakeServer()
+        redis = fakeredis.FakeRedis(server=server)
+        channel = get_redis_response_channel('http')
+        multiplexer = ResponseMultiplexer(redis=fakeredis.FakeRedis(server=server), channel=channel)
+        multiplexer.start()
+        self.assertTrue(multiplexer.subscribed or multiplexer._subscribed.wait(5))
+
+        pid = os.fork()
+        if pid == 0:
+            # The listener of the parent doesn't exist in the child: a new one is started
+            try:
+                future = multiplexer.register('0')
+                redis.publish(channel, str(Response(id='0', output=0)))
+                response = multiplexer.wait('0', future, timeout=5)
+                os._exit(0 if response and response.output == 0 else 1)
+            except BaseException:
+                os._exit(2)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+
+    def test_batch(self):
+        server = fakeredis.FakeServer()
+        redis = fakeredis.FakeRedis(server=server)
+        channel = get_redis_response_channel('http')
+        multiplexer = ResponseMultiplexer(redis=fakeredis.FakeRedis(server=server), channel=channel)
+
+        class Bus:
+            @staticmethod
+            def post_many(msgs):
+                # Respond in reverse order, and never respond to slow.action
+                def respond():
+                    for msg in reversed(msgs):
+                        if msg.action != 'slow.action':
+                            time.sleep(0.01)
+                            redis.publish(channel, str(Response(id=msg.id, output=msg.action)))
+
+                threading.Thread(target=respond).start()
+
+        msgs = [{'type': 'request', 'target': 'localhost', 'action': 'test.action_{}'.format(i)} for i in range(5)]
+        msgs += [{'type': 'request', 'target': 'localhost', 'action': 'slow.action'}, {'invalid': True}]
+
+        with mock.patch.object(platypush.backend.http.app.utils, 'responses', lambda: multiplexer), \
+                mock.patch.object(platypush.backend.http.app.utils, 'bus', lambda: Bus()):
+            responses = platypush.backend.http.app.utils.send_messages(msgs, timeout=1)
+
+        self.assertEqual([response.output for response in responses[:5]],
+                         ['test.action_{}'.format(i) for i in range(5)])
+        self.assertEqual(responses[5].errors, ['Timeout while waiting for the response'])
+        self.assertTrue(responses[6].is_error())
+
+    def test_async_batch(self):
+        server = fakeredis.FakeServer()
+        redis = fakeredis.FakeRedis(server=server)
+        channel = get_redis_response_channel('http')
+        multiplexer = ResponseMultiplexer(redis=fakeredis.FakeRedis(server=server), channel=channel)
+        multiplexer.start()
+        self.assertTrue(multiplexer._subscribed.wait(5))
+
+        class Bus:
+            @staticmethod
+            def post_many(msgs):
+                for msg in msgs:
+                    if msg.action != 'slow.action':
+                        redis.publish(channel, str(Response(id=msg.id, output=msg.action)))
+
+        async def run():
+            return [(i, response) async for i, response in
+                    platypush.backend.http.app.utils.async_iter_message_responses(msgs, timeout=1)]
+
+        msgs = [{'type': 'request', 'target': 'localhost', 'action': 'test.action_{}'.format(i)} for i in range(5)]
+        msgs += [{'type': 'request', 'target': 'localhost', 'action': 'slow.action'}]
+
+        with mock.patch.object(platypush.backend.http.app.utils, 'responses', lambda: multiplexer), \
+                mock.patch.object(platypush.backend.http.app.utils, 'bus', lambda: Bus()):
+            responses = dict(asyncio.run(run()))
+
+        self.assertEqual([responses[i].output for i in range(5)], ['test.action_{}'.format(i) for i in range(5)])
+        self.assertEqual(responses[5].errors, ['Timeout while waiting for the response'])
+        self.assertFalse(multiplexer._waiters)
+
+    def test_async_batch_unsubscribed(self):
+        class Responses:
+            @staticmethod
+            def register(*_, **__):
+                # The subscription dropped before the request was registered
+                return None
+
+        class Bus:
+            @staticmethod
+            def post_many(_):
+                pass
+
+        async def run():
+            return [(i, response) async for i, response in
+                    platypush.backend.http.app.utils.async_iter_message_responses(msgs, timeout=1)]
+
+        msgs = [{'type': 'request', 'target': 'localhost', 'action': 'test.action'}]
+        with mock.patch.object(platypush.backend.http.app.utils, 'responses', lambda: Responses()), \
+                mock.patch.object(platypush.backend.http.app.utils, 'bus', lambda: Bus()), \
+                mock.patch.object(platypush.backend.http.app.utils, 'get_message_response',
+                                  lambda msg, timeout: Response(id=msg.id, output='queue')):
+            responses = asyncio.run(run())
+
+        self.assertEqual([(i, response.output) for i, response in responses], [(0, 'queue')])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et:
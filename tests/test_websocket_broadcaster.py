@@ -0,0 +1,155 @@
+from .context import platypush
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from platypush.message.event.music import MusicPlayEvent, VolumeChangeEvent
+from platypush.message.event.ping import PingEvent
+from platypush.message.event.sensor import SensorDataChangeEvent
+from platypush.utils.websocket import SlowClientPolicy, WebsocketBroadcaster
+
+
+class MockWebsocket:
+    def __init__(self, address, delay=0.0):
+        self.remote_address = (address, 1234)
+        self.delay = delay
+        self.received = []
+
+    async def send(self, data):
+        await asyncio.sleep(self.delay)
+        self.received.append(data)
+
+    async def close(self):
+        pass
+
+
+class TestWebsocketBroadcaster(unittest.TestCase):
+    """ Tests the fan-out of the events to fast and slow websocket clients """
+
+    def test_slow_client(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+
+        broadcaster = WebsocketBroadcaster(name='test', queue_size=5)
+        fast = MockWebsocket('fast')
+        slow = MockWebsocket('slow', delay=0.2)
+
+        async def add_clients():
+            broadcaster.add_client(fast)
+            broadcaster.add_client(slow)
+
+        async def remove_clients():
+            broadcaster.remove_client(fast)
+            broadcaster.remove_client(slow)
+            await asyncio.sleep(0.1)
+
+        asyncio.run_coroutine_threadsafe(add_clients(), loop).result()
+
+        for i in range(20):
+            start = time.time()
+            broadcaster.broadcast(PingEvent(message=str(i)))
+            # Broadcasting doesn't wait for the clients
+            self.assertLess(time.time() - start, 0.1)
+            time.sleep(0.01)
+
+        time.sleep(0.1)
+        stats = {s['address']: s for s in broadcaster.get_stats()}
+        gauges = broadcaster.collect_metrics()
+        asyncio.run_coroutine_threadsafe(remove_clients(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+        self.assertEqual(len(fast.received), 20)
+        self.assertEqual(stats['fast:1234']['dropped'], 0)
+        self.assertGreater(stats['slow:1234']['dropped'], 0)
+        self.assertLess(len(slow.received), 20)
+        self.assertGreater(stats['slow:1234']['lag'], stats['fast:1234']['lag'])
+        self.assertIn(('platypush_websocket_clients', {'server': 'test'}, 2), gauges)
+        self.assertIn({'server': 'test', 'client': 'slow:1234'},
+                      [labels for name, labels, _ in gauges if name == 'platypush_websocket_client_lag_seconds'])
+
+    def test_subscriptions(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+
+        broadcaster = WebsocketBroadcaster()
+        music = MockWebsocket('music')
+        sensor = MockWebsocket('sensor')
+        everything = MockWebsocket('everything')
+
+        async def add_clients():
+            for ws in (music, sensor, everything):
+                broadcaster.add_client(ws)
+
+            self.assertTrue(broadcaster.handle_subscription(music, {
+                'type': 'subscribe', 'events': ['platypush.message.event.music.*']}))
+            self.assertTrue(broadcaster.handle_subscription(sensor, {
+                'type': 'subscribe', 'events': [{'type': 'sensor.*', 'args': {'source': 'temp*'}}]}))
+            self.assertFalse(broadcaster.handle_subscription(sensor, {'type': 'request'}))
+
+        async def remove_clients():
+            for ws in (music, sensor, everything):
+                broadcaster.remove_client(ws)
+            await asyncio.sleep(0.1)
+
+        asyncio.run_coroutine_threadsafe(add_clients(), loop).result()
+
+        broadcaster.broadcast(MusicPlayEvent(status={}, track={}))
+        broadcaster.broadcast(VolumeChangeEvent(volume=50))
+        broadcaster.broadcast(SensorDataChangeEvent(data=21.5, source='temperature'))
+        broadcaster.broadcast(SensorDataChangeEvent(data=40, source='humidity'))
+        broadcaster.broadcast(PingEvent())
+
+        time.sleep(0.1)
+        asyncio.run_coroutine_threadsafe(remove_clients(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+        self.assertEqual(len(music.received), 2)
+        self.assertEqual(len(sensor.received), 1)
+        self.assertIn('temperature', sensor.received[0])
+        self.assertEqual(len(everything.received), 5)
+
+    def test_coalesce(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+
+        broadcaster = WebsocketBroadcaster(queue_size=2, policy=SlowClientPolicy.COALESCE)
+        slow = MockWebsocket('slow', delay=0.3)
+
+        async def add_client():
+            broadcaster.add_client(slow)
+
+        async def remove_client():
+            broadcaster.remove_client(slow)
+            await asyncio.sleep(0.1)
+
+        asyncio.run_coroutine_threadsafe(add_client(), loop).result()
+
+        # The first event is being sent, the new temperature only replaces the queued temperature
+        for data, source in [(21.5, 'temperature'), (40, 'humidity'), (22, 'temperature'), (22.5, 'temperature')]:
+            broadcaster.broadcast(SensorDataChangeEvent(data=data, source=source))
+            time.sleep(0.05)
+
+        time.sleep(1)
+        asyncio.run_coroutine_threadsafe(remove_client(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+        received = [(event['args']['source'], event['args']['data']) for event in map(json.loads, slow.received)]
+        self.assertEqual(received, [('temperature', 21.5), ('humidity', 40), ('temperature', 22.5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# vim:sw=4:ts=4:et: